@@ -0,0 +1,163 @@
+"""Memória do export CSV de eventos com um milhão de linhas.
+
+Uso:
+    python benchmarks/access_csv_export.py --rows 1000000 --rss-budget-mb 64
+
+Grava ``--rows`` eventos sintéticos num banco SQLite temporário (migrações
+atuais) e, em processos separados, consome o export inteiro pelo caminho atual
+(``StreamingHttpResponse`` lendo ``values_list`` em lotes do cursor, com e sem
+gzip) e pelo anterior (``StringIO`` com todas as linhas e um ``HttpResponse``).
+Mostra o tempo, o tamanho gerado e quanto o RSS máximo do processo subiu
+durante o export. Sai com código 1 se o export em streaming passar de
+``--rss-budget-mb``.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+INSERT_CHUNK = 50_000
+MODES = ("stream", "stream-gzip", "anterior")
+
+
+def setup_django(db_path: str) -> None:
+    import django
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = db_path
+    django.setup()
+
+
+def fill(db_path: str, rows: int) -> None:
+    setup_django(db_path)
+
+    from django.core.management import call_command
+    from django.db import connection
+
+    call_command("migrate", verbosity=0)
+    rng = random.Random(7)
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode=OFF")
+        cursor.execute("PRAGMA synchronous=OFF")
+        path_ids = []
+        for index in range(2000):
+            cursor.execute(
+                "INSERT INTO syshealth_accesspath (key, value) VALUES (%s, %s)",
+                [f"{index:032x}", f"/catalogo/produtos/{index}/detalhes/"],
+            )
+            path_ids.append(cursor.lastrowid)
+        sql = (
+            "INSERT INTO syshealth_accessevent (ip_address, path_ref_id, is_admin, created_date, created_at, "
+            "sample_weight, route_name) VALUES (%s, %s, %s, '2024-05-01', %s, 1.0, 'home')"
+        )
+        for start in range(0, rows, INSERT_CHUNK):
+            cursor.executemany(
+                sql,
+                [
+                    (
+                        f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                        rng.choice(path_ids),
+                        rng.random() < 0.1,
+                        f"2024-05-01 {index % 86400 // 3600:02d}:{index % 3600 // 60:02d}:{index % 60:02d}",
+                    )
+                    for index in range(start, min(start + INSERT_CHUNK, rows))
+                ],
+            )
+
+
+def current_rss_kb() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def run_export(db_path: str, mode: str) -> dict:
+    setup_django(db_path)
+
+    from django.utils import timezone
+
+    from syshealth.export import csv_export_response
+    from syshealth.models import AccessEvent
+
+    queryset = AccessEvent.objects.all()
+    AccessEvent.objects.exists()
+    baseline = current_rss_kb()
+    started = time.perf_counter()
+    if mode == "anterior":
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        for event in queryset.select_related("user").with_dimensions():
+            writer.writerow(
+                [
+                    timezone.localtime(event.created_at).isoformat(),
+                    event.user.get_username() if event.user else "Visitante",
+                    event.ip_address,
+                    event.path,
+                    "admin" if event.is_admin else "site",
+                    event.referrer,
+                ]
+            )
+        size = len(buffer.getvalue().encode("utf-8"))
+    else:
+        response = csv_export_response(queryset, timezone.now(), compress=mode == "stream-gzip")
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"seconds": elapsed, "bytes": size, "growth_kb": max(peak - baseline, 0)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--rss-budget-mb", type=float, default=64.0)
+    parser.add_argument("--skip-legacy", action="store_true", help="Não mede o export anterior (lento e pesado).")
+    parser.add_argument("--fill", metavar="DB", help=argparse.SUPPRESS)
+    parser.add_argument("--export-only", nargs=2, metavar=("DB", "MODO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.fill:
+        fill(args.fill, args.rows)
+        return
+
+    if args.export_only:
+        print(json.dumps(run_export(*args.export_only)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "export.sqlite3")
+        # Cada etapa num processo novo: o RSS máximo de um não contamina o outro.
+        subprocess.run([sys.executable, __file__, "--rows", str(args.rows), "--fill", db_path], check=True)
+        print(f"{args.rows} eventos")
+        print(f"{'modo':12} {'tempo':>8} {'tamanho':>10} {'RSS +':>10}")
+        over_budget = False
+        for mode in MODES:
+            if mode == "anterior" and args.skip_legacy:
+                continue
+            output = subprocess.run(
+                [sys.executable, __file__, "--export-only", db_path, mode], check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            growth_mb = result["growth_kb"] / 1024
+            print(f"{mode:12} {result['seconds']:7.1f}s {result['bytes'] / 1024 / 1024:8.1f} MB {growth_mb:7.1f} MB")
+            if mode != "anterior" and growth_mb > args.rss_budget_mb:
+                over_budget = True
+
+    if over_budget:
+        print(f"export em streaming acima do orçamento de {args.rss_budget_mb:.0f} MB de RSS")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Espaço em disco de AccessEvent com textos na linha x tabelas de dimensão.
+
+Uso:
+    python benchmarks/access_event_size.py --rows 1000000
+
+Grava o mesmo tráfego sintético (alguns milhares de caminhos, referers e user
+agents distintos) em dois bancos SQLite temporários: um com ``path``,
+``referrer`` e ``user_agent`` repetidos em cada evento, como antes, e outro com
+as migrações atuais (ids para ``AccessPath``, ``AccessReferrer`` e
+``AccessUserAgent``). Compara o tamanho de tabela e índices por evento usando
+``dbstat`` quando disponível, ou o tamanho do arquivo.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+INSERT_CHUNK = 50_000
+TABLE = "syshealth_accessevent"
+DIMENSION_TABLES = ("syshealth_accesspath", "syshealth_accessreferrer", "syshealth_accessuseragent")
+
+LEGACY_SCHEMA = f"""
+CREATE TABLE {TABLE} (
+    id integer NOT NULL PRIMARY KEY AUTOINCREMENT,
+    ip_address varchar(45) NOT NULL,
+    path varchar(512) NOT NULL,
+    referrer varchar(512) NOT NULL,
+    user_agent varchar(256) NOT NULL,
+    is_admin bool NOT NULL,
+    created_date date NOT NULL,
+    created_time time NULL,
+    created_at datetime NULL,
+    sample_weight real NOT NULL,
+    route_name varchar(200) NOT NULL,
+    status_code smallint unsigned NULL,
+    duration_ms real NULL,
+    response_bytes integer unsigned NULL,
+    user_id integer NULL
+);
+CREATE INDEX ops_access_date_idx ON {TABLE} (created_date);
+CREATE INDEX ops_access_created_at_idx ON {TABLE} (created_at);
+CREATE INDEX ops_access_user_idx ON {TABLE} (user_id);
+CREATE INDEX syshealth_accessevent_user_id_1550c8d7 ON {TABLE} (user_id);
+CREATE INDEX ops_access_ip_idx ON {TABLE} (ip_address);
+CREATE INDEX ops_access_admin_idx ON {TABLE} (is_admin);
+"""
+
+
+def build_values(rng: random.Random, distinct: int):
+    paths = [
+        f"/catalogo/produtos/{index}/detalhes/?utm_source=newsletter&ref={index % 97}"
+        for index in range(distinct)
+    ]
+    referrers = [""] * (distinct // 2) + [
+        f"https://www.example.com/busca?q=item+{index}" for index in range(distinct)
+    ]
+    user_agents = [
+        f"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        f"Chrome/{100 + index % 30}.0.{index}.0 Safari/537.36"
+        for index in range(distinct // 4)
+    ]
+    return paths, referrers, user_agents
+
+
+def traffic(rows: int, distinct: int):
+    rng = random.Random(5)
+    paths, referrers, user_agents = build_values(rng, distinct)
+    for _ in range(rows):
+        yield (
+            f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+            rng.choice(paths),
+            rng.choice(referrers),
+            rng.choice(user_agents),
+            rng.random() < 0.1,
+            "2024-05-01",
+            "12:00:00",
+            "2024-05-01 15:00:00",
+            rng.randint(200, 204),
+            rng.random() * 200,
+            rng.randint(500, 50_000),
+        )
+
+
+def chunks(iterable, size: int):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def fill_legacy(db_path: str, rows: int, distinct: int) -> None:
+    connection = sqlite3.connect(db_path)
+    connection.executescript("PRAGMA journal_mode=OFF; PRAGMA synchronous=OFF;" + LEGACY_SCHEMA)
+    sql = (
+        f"INSERT INTO {TABLE} (ip_address, path, referrer, user_agent, is_admin, created_date, created_time, "
+        "created_at, sample_weight, route_name, status_code, duration_ms, response_bytes) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1.0, 'home', ?, ?, ?)"
+    )
+    for chunk in chunks(traffic(rows, distinct), INSERT_CHUNK):
+        connection.executemany(sql, chunk)
+        connection.commit()
+    connection.execute("VACUUM")
+    connection.close()
+
+
+def fill_current(db_path: str, rows: int, distinct: int) -> None:
+    import django
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = db_path
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import connection
+
+    call_command("migrate", verbosity=0)
+
+    from syshealth.dimensions import value_key
+
+    ids = ({}, {}, {})
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode=OFF")
+        cursor.execute("PRAGMA synchronous=OFF")
+        sql = (
+            f"INSERT INTO {TABLE} (ip_address, path_ref_id, referrer_ref_id, user_agent_ref_id, is_admin, "
+            "created_date, created_time, created_at, sample_weight, route_name, status_code, duration_ms, "
+            "response_bytes) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 1.0, 'home', %s, %s, %s)"
+        )
+        for chunk in chunks(traffic(rows, distinct), INSERT_CHUNK):
+            batch = []
+            for row in chunk:
+                refs = []
+                for position, table in enumerate(DIMENSION_TABLES):
+                    value = row[1 + position]
+                    if not value:
+                        refs.append(None)
+                        continue
+                    known = ids[position]
+                    if value not in known:
+                        cursor.execute(
+                            f"INSERT INTO {table} (key, value) VALUES (%s, %s)", [value_key(value), value]
+                        )
+                        known[value] = cursor.lastrowid
+                    refs.append(known[value])
+                batch.append((row[0], *refs, *row[4:]))
+            cursor.executemany(sql, batch)
+        cursor.execute("VACUUM")
+
+
+def measure(db_path: str, tables, with_indexes: bool = True) -> int:
+    connection = sqlite3.connect(db_path)
+    try:
+        names = ",".join(f"'{name}'" for name in tables)
+        objects = f"(SELECT name FROM sqlite_master WHERE tbl_name IN ({names}))" if with_indexes else f"({names})"
+        total = connection.execute(f"SELECT SUM(pgsize) FROM dbstat WHERE name IN {objects}").fetchone()[0]
+    except sqlite3.OperationalError:
+        total = os.path.getsize(db_path)
+    finally:
+        connection.close()
+    return total or 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=4000, help="Caminhos distintos no tráfego.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = str(Path(tmp) / "legacy.sqlite3")
+        current_path = str(Path(tmp) / "current.sqlite3")
+        fill_legacy(legacy_path, args.rows, args.distinct)
+        fill_current(current_path, args.rows, args.distinct)
+
+        legacy = measure(legacy_path, [TABLE])
+        legacy_heap = measure(legacy_path, [TABLE], with_indexes=False)
+        events = measure(current_path, [TABLE])
+        events_heap = measure(current_path, [TABLE], with_indexes=False)
+        dimensions = measure(current_path, DIMENSION_TABLES)
+
+    mb = 1024 * 1024
+    print(f"{args.rows} eventos, {args.distinct} caminhos distintos")
+    print(f"{'':22} {'tabela+índices':>16} {'só tabela':>12}")
+    print(f"{'texto na linha':22} {legacy / args.rows:12.1f} B/ev {legacy_heap / args.rows:8.1f} B/ev")
+    print(f"{'ids de dimensão':22} {events / args.rows:12.1f} B/ev {events_heap / args.rows:8.1f} B/ev")
+    print(f"{'tabelas de dimensão':22} {dimensions / mb:13.1f} MB")
+    print(f"redução: {legacy / max(events + dimensions, 1):.1f}x (só tabela: {legacy_heap / max(events_heap, 1):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Planos e tempos das consultas por período: created_date/created_time x created_at.
+
+Uso:
+    python benchmarks/access_event_timestamp.py --rows 10000000
+
+Popula um banco SQLite temporário com ``--rows`` eventos espalhados por
+``--days`` dias, recria o índice antigo (``created_date``, ``created_time``) ao
+lado do novo e compara, para a janela de "online", a listagem ordenada do
+dashboard e a limpeza por retenção, o predicado anterior com o atual. Mostra
+o ``EXPLAIN QUERY PLAN`` de cada consulta e o melhor de três execuções.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+INSERT_CHUNK = 50_000
+
+
+def setup_django(db_path: str) -> None:
+    import django
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = db_path
+    django.setup()
+
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+
+
+def populate(rows: int, days: int) -> None:
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    table = "syshealth_accessevent"
+    local_tz = timezone.get_current_timezone()
+    now = timezone.now()
+    start = now - timedelta(days=days)
+    span = (now - start).total_seconds()
+    rng = random.Random(11)
+
+    with connection.cursor() as cursor:
+        # Banco descartável: sem journal nem fsync, e índices criados depois da carga.
+        cursor.execute("PRAGMA journal_mode=OFF")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name=%s AND sql IS NOT NULL",
+            [table],
+        )
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX "{name}"')
+
+        cursor.executemany(
+            "INSERT INTO syshealth_accesspath (key, value) VALUES (%s, %s)",
+            [(f"{index:032d}", f"/page/{index}/") for index in range(1, 501)],
+        )
+        sql = (
+            f"INSERT INTO {table} (ip_address, path_ref_id, is_admin, created_date, "
+            "created_time, created_at, sample_weight, route_name) "
+            "VALUES (%s, %s, %s, %s, %s, %s, 1.0, %s)"
+        )
+        inserted = 0
+        while inserted < rows:
+            batch = []
+            for _ in range(min(INSERT_CHUNK, rows - inserted)):
+                moment = start + timedelta(seconds=rng.random() * span)
+                local = moment.astimezone(local_tz)
+                utc = moment.astimezone(dt_timezone.utc).replace(tzinfo=None)
+                batch.append(
+                    (
+                        f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                        rng.randint(1, 500),
+                        rng.random() < 0.1,
+                        local.date().isoformat(),
+                        local.time().replace(microsecond=0).isoformat(),
+                        utc.isoformat(sep=" "),
+                        "page",
+                    )
+                )
+            with transaction.atomic():
+                cursor.executemany(sql, batch)
+            inserted += len(batch)
+            print(f"\r  {inserted}/{rows} eventos", end="", flush=True)
+        print()
+
+        for _, index_sql in indexes:
+            cursor.execute(index_sql)
+        # Índice removido junto com o predicado antigo; recriado só para comparar.
+        cursor.execute(f'CREATE INDEX "bench_datetime_idx" ON {table} ("created_date", "created_time")')
+        cursor.execute("ANALYZE")
+
+
+def legacy_since(moment: datetime):
+    """Predicado anterior de ``AccessEventQuerySet.since``."""
+    from django.db.models import Q
+    from django.utils import timezone
+
+    local_moment = timezone.localtime(moment)
+    return Q(created_date__gt=local_moment.date()) | (
+        Q(created_date=local_moment.date())
+        & (Q(created_time__gte=local_moment.time()) | Q(created_time__isnull=True))
+    )
+
+
+def best_of(callable_, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        callable_()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def report(label: str, queryset, run) -> None:
+    plan = queryset.explain()
+    elapsed = best_of(run)
+    print(f"  {label}: {elapsed * 1000:.2f} ms")
+    for line in plan.splitlines():
+        print(f"      {line}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--window-minutes", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(str(Path(tmp) / "bench.sqlite3"))
+
+        from django.utils import timezone
+
+        from syshealth.models import AccessEvent, event_timestamp
+
+        print(f"Populando {args.rows} eventos em {args.days} dias...")
+        started = time.perf_counter()
+        populate(args.rows, args.days)
+        print(f"  carga e índices: {time.perf_counter() - started:.1f}s")
+
+        events = AccessEvent.objects.order_by()
+        now = timezone.now()
+        window_start = now - timedelta(minutes=args.window_minutes)
+
+        print(f"\nJanela de {args.window_minutes} min (count)")
+        legacy = events.filter(legacy_since(window_start))
+        current = events.since(window_start)
+        report("antes (created_date/created_time)", legacy, legacy.count)
+        report("depois (created_at)", current, current.count)
+
+        print("\nÚltimos 50 eventos da janela (listagem do dashboard)")
+        legacy = legacy.order_by("-created_date", "-created_time", "-pk")[:50]
+        current = current.order_by("-created_at", "-pk")[:50]
+        report("antes", legacy, lambda: list(legacy.values_list("pk", flat=True)))
+        report("depois", current, lambda: list(current.values_list("pk", flat=True)))
+
+        cutoff_date = timezone.localdate() - timedelta(days=args.days // 2)
+        print(f"\nLimpeza por retenção (anteriores a {cutoff_date}, count)")
+        legacy = events.filter(created_date__lt=cutoff_date)
+        current = events.filter(created_at__lt=event_timestamp(cutoff_date))
+        report("antes", legacy, legacy.count)
+        report("depois", current, current.count)
+
+
+if __name__ == "__main__":
+    main()
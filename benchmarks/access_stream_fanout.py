@@ -0,0 +1,97 @@
+"""Custo do stream SSE do dashboard com muitas conexões num único worker.
+
+Uso:
+    python benchmarks/access_stream_fanout.py --connections 500 --seconds 10
+
+Abre ``--connections`` assinantes de um ``LiveFeed`` no mesmo event loop, como
+faria o uvicorn com vários dashboards abertos, e mede quantas vezes o produtor
+(a consulta ao banco) rodou, quantas mensagens foram entregues e o atraso entre
+a publicação e a leitura pelo último assinante. O produtor devolve uma
+mensagem do tamanho típico (contadores, 10 rotas e alguns eventos) sem tocar
+no banco, para isolar o custo do fan-out.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+
+def make_producer(calls):
+    def producer(cursor):
+        calls.append(time.perf_counter())
+        message = {
+            "online": {"total": 42, "authenticated": 10, "anonymous": 32, "window_minutes": 5},
+            "access_count": 12345,
+            "routes": [{"route": f"rota-{index}", "hits": 100, "p50_ms": 12.0, "p95_ms": 80.0} for index in range(10)],
+            "events": [{"id": len(calls) * 10 + index, "path": "/catalogo/produtos/1/"} for index in range(5)],
+            "delta": True,
+            "reset": False,
+            "latest": f"cursor-{len(calls)}",
+            "published_at": time.perf_counter(),
+        }
+        return message, message["latest"]
+
+    return producer
+
+
+async def consume(feed, seconds, delays, counters):
+    from syshealth.stream import stream_messages
+
+    async for chunk in stream_messages(feed, max_seconds=seconds):
+        counters["bytes"] += len(chunk)
+        if chunk.startswith(b"id:"):
+            counters["messages"] += 1
+            delays.append(time.perf_counter())
+
+
+async def run(connections: int, seconds: float, interval: float):
+    from syshealth.stream import LiveFeed
+
+    calls, delays = [], []
+    counters = {"messages": 0, "bytes": 0}
+    feed = LiveFeed(make_producer(calls), interval=interval)
+    tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(consume(feed, seconds, delays, counters) for _ in range(connections)))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return calls, delays, counters, elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    calls, delays, counters, elapsed, peak = asyncio.run(run(args.connections, args.seconds, args.interval))
+
+    # Atraso do fan-out: da publicação de cada tick até a última conexão recebê-lo.
+    ticks = sorted(calls)
+    fanout = []
+    for tick_start, tick_end in zip(ticks, ticks[1:] + [float("inf")]):
+        received = [moment for moment in delays if tick_start <= moment < tick_end]
+        if received:
+            fanout.append(max(received) - tick_start)
+
+    print(f"{args.connections} conexões por {elapsed:.1f}s, intervalo {args.interval}s")
+    print(f"consultas ao banco (produtor): {len(calls)}")
+    print(f"mensagens entregues: {counters['messages']} ({counters['bytes'] / 1024:.0f} KiB)")
+    if fanout:
+        print(f"fan-out até a última conexão: médio {sum(fanout) / len(fanout) * 1000:.1f} ms, "
+              f"máximo {max(fanout) * 1000:.1f} ms")
+    print(f"pico de memória Python: {peak / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
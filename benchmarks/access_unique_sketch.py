@@ -0,0 +1,75 @@
+"""Custo, erro e tamanho dos sketches HyperLogLog de visitantes distintos.
+
+Uso:
+    python benchmarks/access_unique_sketch.py --visitors 200000
+
+Gera sketches por minuto com tráfego sintético (cada visitante aparece em
+alguns minutos aleatórios) e mede, para janelas de 5 min, 1 h, 1 dia e 7 dias
+montadas a partir de sketches de minuto, hora ou dia: tempo de combinação,
+erro contra o ``set`` exato e bytes gravados por sketch. Não usa banco.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from syshealth.hll import HyperLogLog  # noqa: E402
+
+WINDOWS = (
+    ("5 min", 5, 1),
+    ("1 h", 60, 1),
+    ("1 dia (por hora)", 1440, 60),
+    ("7 dias (por dia)", 7 * 1440, 1440),
+)
+
+
+def build(visitors: int, minutes: int, visits: int, seed: int = 11):
+    rng = random.Random(seed)
+    buckets = [set() for _ in range(minutes)]
+    for visitor in range(visitors):
+        key = f"10.{visitor >> 16 & 255}.{visitor >> 8 & 255}.{visitor & 255}"
+        for _ in range(visits):
+            buckets[rng.randrange(minutes)].add(key)
+    return buckets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--visitors", type=int, default=200_000)
+    parser.add_argument("--visits", type=int, default=3, help="Minutos com acesso por visitante.")
+    args = parser.parse_args()
+
+    minutes = 7 * 1440
+    buckets = build(args.visitors, minutes, args.visits)
+    print(f"{args.visitors} visitantes em 7 dias, {args.visits} minutos com acesso cada")
+    print(f"{'janela':18} {'sketches':>8} {'exato':>9} {'hll':>9} {'erro':>7} {'combinar+contar':>15} {'bytes/sketch':>13}")
+
+    for label, span, step in WINDOWS:
+        window = buckets[minutes - span:]
+        exact = set().union(*window)
+        sketches = []
+        for offset in range(0, span, step):
+            sketch = HyperLogLog()
+            sketch.update(set().union(*window[offset:offset + step]))
+            sketches.append(HyperLogLog.from_bytes(sketch.to_bytes()))
+        stored = sum(len(sketch.to_bytes()) for sketch in sketches) / len(sketches)
+
+        started = time.perf_counter()
+        merged = HyperLogLog.union(sketches)
+        estimate = merged.count()
+        elapsed = time.perf_counter() - started
+
+        error = (estimate - len(exact)) / max(len(exact), 1) * 100
+        print(
+            f"{label:18} {len(sketches):8} {len(exact):9} {estimate:9} {error:6.2f}% "
+            f"{elapsed * 1e6:12.0f} µs {stored:13.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
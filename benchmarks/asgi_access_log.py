@@ -0,0 +1,149 @@
+"""Compara requisições/s sob ASGI com e sem o AccessLogMiddleware.
+
+Uso:
+    python benchmarks/asgi_access_log.py --requests 2000 --concurrency 50
+
+O aplicativo ASGI do Django é exercitado em processo (mesmo caminho que o
+uvicorn percorre a partir do ``scope``), contra uma view assíncrona mínima e
+um banco SQLite temporário. Com ``--uvicorn`` o script apenas sobe o servidor
+para um teste externo (ex.: ``wrk``/``hey``), se o uvicorn estiver instalado.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+WITHOUT = "sem middleware"
+WITH = "com middleware"
+
+
+async def ping(request):
+    from django.http import HttpResponse
+
+    return HttpResponse("pong")
+
+
+def _urlpatterns():
+    from django.urls import path
+
+    return [path("ping/", ping)]
+
+
+urlpatterns = []
+
+
+def setup_django(db_path: str, writer: str) -> None:
+    import django
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = db_path
+    settings.ROOT_URLCONF = __name__
+    settings.ALLOWED_HOSTS = ["*"]
+    settings.ACCESS_LOG_WRITER = writer
+    django.setup()
+    urlpatterns.extend(_urlpatterns())
+
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+
+
+def build_application(with_middleware: bool):
+    from django.conf import settings
+    from django.core.handlers.asgi import ASGIHandler
+
+    middleware = [
+        "django.contrib.sessions.middleware.SessionMiddleware",
+        "django.contrib.auth.middleware.AuthenticationMiddleware",
+    ]
+    if with_middleware:
+        middleware.append("syshealth.middleware.AccessLogMiddleware")
+    settings.MIDDLEWARE = middleware
+    return ASGIHandler()
+
+
+async def _request(application) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/ping/",
+        "raw_path": b"/ping/",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"127.0.0.1"), (b"user-agent", b"bench/1.0")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        return None
+
+    await application(scope, receive, send)
+
+
+async def run_load(application, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await _request(application)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--writer", default="thread", help="Modo do ACCESS_LOG_WRITER.")
+    parser.add_argument("--uvicorn", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, "bench.sqlite3"), args.writer)
+
+        if args.uvicorn:
+            import uvicorn
+
+            uvicorn.run(build_application(True), host="127.0.0.1", port=8000, log_level="warning")
+            return
+
+        results = {}
+        for label, enabled in ((WITHOUT, False), (WITH, True)):
+            application = build_application(enabled)
+            asyncio.run(run_load(application, min(args.requests, 100), args.concurrency))
+            elapsed = asyncio.run(run_load(application, args.requests, args.concurrency))
+            results[label] = args.requests / elapsed
+
+        from syshealth.writer import get_writer
+
+        get_writer().close()
+        for label, rps in results.items():
+            print(f"{label:>16}: {rps:10.1f} req/s")
+        print(f"{'overhead':>16}: {(1 - results[WITH] / results[WITHOUT]) * 100:9.1f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Custo por requisição de AccessSettings.should_ignore_path com 5, 50 e 500 padrões.
+
+Uso:
+    python benchmarks/ignore_paths_matcher.py
+
+Compara a varredura linear com ``startswith`` (reconstruindo a lista a cada
+chamada, como antes) com o ``PathMatcher`` compilado uma vez.
+"""
+from __future__ import annotations
+
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from syshealth.matching import PathMatcher, split_entries  # noqa: E402
+
+SIZES = (5, 50, 500)
+
+
+def legacy_should_ignore(raw, path: str) -> bool:
+    for prefix in [value.rstrip("*") for value in split_entries(raw)]:
+        if path.startswith(prefix):
+            return True
+    return False
+
+
+def build_patterns(count: int, rng: random.Random):
+    patterns = []
+    for index in range(count):
+        kind = index % 10
+        if kind == 8:
+            patterns.append(f"/files/{index}/*.pdf")
+        elif kind == 9:
+            patterns.append(f"re:/api/v[0-9]+/svc{index}/")
+        else:
+            patterns.append(f"/section{index}/{rng.choice(['a', 'b', 'c'])}/*")
+    return patterns
+
+
+def main() -> None:
+    rng = random.Random(42)
+    paths = [f"/catalog/{rng.randint(1, 10_000)}/item/" for _ in range(200)]
+    number = 20
+
+    print(f"{'padrões':>8} {'linear (µs)':>12} {'compilado (µs)':>15} {'ganho':>7}")
+    for size in SIZES:
+        patterns = build_patterns(size, rng)
+        # Só prefixos entram na versão linear: globs/regex não eram suportados.
+        literal = [pattern for pattern in patterns if not pattern.startswith("re:") and "*." not in pattern]
+        matcher = PathMatcher(patterns)
+
+        linear = timeit.timeit(
+            lambda: [legacy_should_ignore(literal, path) for path in paths], number=number
+        )
+        compiled = timeit.timeit(lambda: [matcher.matches(path) for path in paths], number=number)
+        calls = number * len(paths)
+        linear_us = linear / calls * 1e6
+        compiled_us = compiled / calls * 1e6
+        print(f"{size:>8} {linear_us:>12.2f} {compiled_us:>15.2f} {linear_us / compiled_us:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Escritores e leitores concorrentes no SQLite, com e sem os PRAGMAs do projeto.
+
+Uso:
+    python benchmarks/sqlite_concurrent_writers.py --writers 8 --readers 2 --seconds 10
+
+Para cada configuração cria um banco SQLite temporário (migrações atuais) e
+sobe ``--writers`` processos gravando ``AccessEvent`` um a um, como o writer
+``sync`` faz a cada requisição, e ``--readers`` processos consultando a janela
+do dashboard, todos ao mesmo tempo, como workers do gunicorn. Mostra gravações
+e leituras por segundo e quantas operações falharam com "database is locked".
+
+- ``padrão``: só o ``timeout`` do driver (``--driver-timeout``, 5s como no
+  sqlite3 do Python); journal de rollback e synchronous=FULL.
+- ``ajustado``: os PRAGMAs de ``core/settings.py`` (WAL, busy_timeout, synchronous=NORMAL, ...).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+PRAGMA_ENV = (
+    "SQLITE_BUSY_TIMEOUT_MS",
+    "SQLITE_JOURNAL_MODE",
+    "SQLITE_SYNCHRONOUS",
+    "SQLITE_MMAP_SIZE",
+    "SQLITE_CACHE_SIZE",
+    "SQLITE_TEMP_STORE",
+)
+MODES = ("padrão", "ajustado")
+
+
+def mode_env(mode: str) -> dict:
+    env = dict(os.environ)
+    for name in PRAGMA_ENV:
+        env.pop(name, None)
+        if mode == "padrão":
+            env[name] = ""
+    return env
+
+
+def setup_django(db_path: str, driver_timeout: float = 5.0) -> None:
+    import django
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = db_path
+    # Nos dois modos; no ajustado, PRAGMA busy_timeout substitui esta espera.
+    settings.DATABASES["default"].setdefault("OPTIONS", {})["timeout"] = driver_timeout
+    django.setup()
+
+
+def migrate(db_path: str) -> None:
+    setup_django(db_path)
+
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+
+
+def is_locked(exc: Exception) -> bool:
+    return "locked" in str(exc) or "busy" in str(exc)
+
+
+def run_worker(db_path: str, role: str, start_at: float, seconds: float, seed: int, driver_timeout: float) -> dict:
+    setup_django(db_path, driver_timeout)
+
+    from django.db import OperationalError, connection
+    from django.utils import timezone
+
+    from syshealth.models import AccessEvent
+
+    rng = random.Random(seed)
+    connection.ensure_connection()
+    time.sleep(max(start_at - time.time(), 0))
+    deadline = time.monotonic() + seconds
+    done = locked = 0
+    while time.monotonic() < deadline:
+        try:
+            if role == "writer":
+                now = timezone.now()
+                AccessEvent.objects.create(
+                    ip_address=f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                    path=f"/catalogo/{rng.randint(1, 200)}/",
+                    user_agent="Mozilla/5.0 (benchmark)",
+                    created_date=timezone.localdate(now),
+                    created_at=now,
+                    route_name="catalogo",
+                    status_code=200,
+                    duration_ms=rng.uniform(2, 80),
+                )
+            else:
+                window = AccessEvent.objects.since(timezone.now() - timedelta(minutes=5))
+                window.count()
+                list(window.with_dimensions()[:20])
+            done += 1
+        except OperationalError as exc:
+            if not is_locked(exc):
+                raise
+            locked += 1
+    return {"role": role, "done": done, "locked": locked}
+
+
+def run_mode(tmp: str, mode: str, args) -> dict:
+    db_path = str(Path(tmp) / f"{'ajustado' if mode == 'ajustado' else 'padrao'}.sqlite3")
+    env = mode_env(mode)
+    subprocess.run([sys.executable, __file__, "--migrate", db_path], check=True, env=env)
+    start_at = time.time() + 2.0
+    roles = ["writer"] * args.writers + ["reader"] * args.readers
+    processes = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                __file__,
+                "--worker",
+                db_path,
+                role,
+                str(start_at),
+                str(args.seconds),
+                str(index),
+                str(args.driver_timeout),
+            ],
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for index, role in enumerate(roles)
+    ]
+    totals = {"writer": [0, 0], "reader": [0, 0]}
+    for process in processes:
+        output, _ = process.communicate()
+        if process.returncode:
+            raise SystemExit(f"worker terminou com código {process.returncode}")
+        result = json.loads(output.strip().splitlines()[-1])
+        totals[result["role"]][0] += result["done"]
+        totals[result["role"]][1] += result["locked"]
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument(
+        "--driver-timeout",
+        type=float,
+        default=5.0,
+        help="Espera do driver por locks, em segundos (valores baixos reproduzem a disputa de produção).",
+    )
+    parser.add_argument("--migrate", metavar="DB", help=argparse.SUPPRESS)
+    parser.add_argument(
+        "--worker", nargs=6, metavar=("DB", "PAPEL", "INICIO", "SEGUNDOS", "SEMENTE", "TIMEOUT"), help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+
+    if args.migrate:
+        migrate(args.migrate)
+        return
+
+    if args.worker:
+        db_path, role, start_at, seconds, seed, driver_timeout = args.worker
+        print(json.dumps(run_worker(db_path, role, float(start_at), float(seconds), int(seed), float(driver_timeout))))
+        return
+
+    print(f"{args.writers} escritores, {args.readers} leitores, {args.seconds:.0f}s por configuração")
+    print(f"{'config':10} {'gravações/s':>12} {'leituras/s':>11} {'locked (grav.)':>15} {'locked (leit.)':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in MODES:
+            totals = run_mode(tmp, mode, args)
+            writes, write_locks = totals["writer"]
+            reads, read_locks = totals["reader"]
+            print(
+                f"{mode:10} {writes / args.seconds:12.0f} {reads / args.seconds:11.0f} "
+                f"{write_locks:15} {read_locks:15}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Custo por requisição de AccessSettings.should_ignore_user_agent.
+
+Uso:
+    python benchmarks/user_agent_matcher.py
+
+Compara a busca anterior (normaliza a lista e testa um trecho por vez a cada
+chamada) com o ``UserAgentMatcher`` compilado, com e sem o LRU de veredictos,
+usando a lista embutida de crawlers somada a trechos extras.
+"""
+from __future__ import annotations
+
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from syshealth.crawlers import DEFAULT_CRAWLER_USER_AGENTS  # noqa: E402
+from syshealth.matching import UserAgentMatcher  # noqa: E402
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0",
+    "Mozilla/5.0 (Linux; Android 14; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+    "Mozilla/5.0 (compatible; AhrefsBot/7.0; +http://ahrefs.com/robot/)",
+]
+
+
+def legacy_should_ignore(raw, user_agent: str) -> bool:
+    normalized = [str(value).strip().lower() for value in raw if str(value).strip()]
+    user_agent_lower = user_agent.lower()
+    for entry in normalized:
+        if entry and entry in user_agent_lower:
+            return True
+    return False
+
+
+def main() -> None:
+    rng = random.Random(7)
+    traffic = [rng.choice(USER_AGENTS) for _ in range(500)]
+    number = 10
+    calls = number * len(traffic)
+
+    print(f"{'trechos':>8} {'anterior (µs)':>14} {'compilado (µs)':>15} {'com LRU (µs)':>13}")
+    for extra in (0, 500, 2000):
+        patterns = list(DEFAULT_CRAWLER_USER_AGENTS) + [f"custom-agent-{index}" for index in range(extra)]
+        matcher = UserAgentMatcher(patterns)
+        uncached = UserAgentMatcher(patterns, cache_size=0)
+
+        legacy = timeit.timeit(
+            lambda: [legacy_should_ignore(patterns, ua) for ua in traffic], number=number
+        )
+        compiled = timeit.timeit(lambda: [uncached.matches(ua) for ua in traffic], number=number)
+        cached = timeit.timeit(lambda: [matcher.matches(ua) for ua in traffic], number=number)
+        print(
+            f"{len(patterns):>8} {legacy / calls * 1e6:>14.2f} "
+            f"{compiled / calls * 1e6:>15.2f} {cached / calls * 1e6:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
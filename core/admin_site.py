@@ -39,6 +39,17 @@ class CustomAdminSite(AdminSite):
                 self.admin_view(syshealth_views.access_dashboard_data),
                 name="ops_access_dashboard_data",
             ),
+            path(
+                "ops/access-dashboard/users.json",
+                self.admin_view(syshealth_views.access_dashboard_users),
+                name="ops_access_dashboard_users",
+            ),
+            # View assíncrona: faz a própria checagem de permissão (admin_view é síncrono).
+            path(
+                "ops/access-dashboard/stream/",
+                syshealth_views.access_dashboard_stream,
+                name="ops_access_dashboard_stream",
+            ),
         ]
         return custom_urls + urls
 
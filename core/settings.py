@@ -114,6 +114,100 @@ DATABASES = {
     }
 }
 
+# Banco separado para a telemetria de acessos (eventos, dimensões, rollups, sketches
+# e configurações do monitoramento), num arquivo próprio que pode ir para outro
+# disco e ter vacuum e backup independentes. Vazio: tudo fica no banco default.
+# Depois de configurar: `manage.py migrate --database telemetry`.
+ACCESS_TELEMETRY_DB_NAME = os.getenv('ACCESS_TELEMETRY_DB_NAME', '')
+if ACCESS_TELEMETRY_DB_NAME:
+    DATABASES['telemetry'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f"{ACCESS_TELEMETRY_DB_NAME}.sqlite3",
+    }
+DATABASE_ROUTERS = ['syshealth.routers.TelemetryRouter']
+
+# Cache compartilhado entre os workers (contadores do dashboard e seus locks de
+# recálculo, presença online). Vazio: LocMemCache do Django, um por processo.
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', '')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+
+# PRAGMAs aplicados a cada conexão SQLite nova (syshealth.sqlite_tuning): WAL deixa
+# leitores e o writer dos eventos de acesso trabalharem ao mesmo tempo e
+# busy_timeout espera o lock em vez de falhar com "database is locked". Valor vazio
+# mantém o padrão do SQLite; confira com `manage.py ops_sqlite_pragmas`.
+SQLITE_BUSY_TIMEOUT_MS = os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_MMAP_SIZE = os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))
+# Negativo: tamanho em KiB (-20000 = ~20 MB por conexão).
+SQLITE_CACHE_SIZE = os.getenv('SQLITE_CACHE_SIZE', '-20000')
+SQLITE_TEMP_STORE = os.getenv('SQLITE_TEMP_STORE', 'MEMORY')
+
+# Monitoramento de acessos (syshealth)
+# Modo de gravação dos eventos de acesso: "sync" grava a cada requisição,
+# "buffered" acumula em memória e grava em lote, "thread" grava em uma
+# thread dedicada por worker a partir de uma fila limitada; "none" não grava
+# eventos (online e visitantes distintos continuam funcionando).
+ACCESS_LOG_WRITER = os.getenv('ACCESS_LOG_WRITER', 'sync')
+ACCESS_LOG_BATCH_SIZE = int(os.getenv('ACCESS_LOG_BATCH_SIZE', '50'))
+ACCESS_LOG_BATCH_MAX_AGE = float(os.getenv('ACCESS_LOG_BATCH_MAX_AGE', '2'))
+ACCESS_LOG_BUFFER_LIMIT = int(os.getenv('ACCESS_LOG_BUFFER_LIMIT', '1000'))
+ACCESS_LOG_QUEUE_SIZE = int(os.getenv('ACCESS_LOG_QUEUE_SIZE', '5000'))
+# Fila cheia: "drop_newest", "drop_oldest" ou "block" (aguarda ACCESS_LOG_BLOCK_TIMEOUT s).
+ACCESS_LOG_OVERFLOW = os.getenv('ACCESS_LOG_OVERFLOW', 'drop_newest')
+ACCESS_LOG_BLOCK_TIMEOUT = float(os.getenv('ACCESS_LOG_BLOCK_TIMEOUT', '0.05'))
+# Journal local: quando definido, lotes que falham no banco vão para segmentos em
+# disco (carregados depois por "replay_access_journal"); ACCESS_LOG_WRITER=journal
+# grava todos os eventos apenas no journal.
+ACCESS_LOG_JOURNAL_DIR = os.getenv('ACCESS_LOG_JOURNAL_DIR', '')
+ACCESS_LOG_JOURNAL_SEGMENT_BYTES = int(os.getenv('ACCESS_LOG_JOURNAL_SEGMENT_BYTES', str(8 * 1024 * 1024)))
+ACCESS_LOG_JOURNAL_SEGMENT_MAX_AGE = float(os.getenv('ACCESS_LOG_JOURNAL_SEGMENT_MAX_AGE', '300'))
+ACCESS_LOG_JOURNAL_FSYNC = strtobool(os.getenv('ACCESS_LOG_JOURNAL_FSYNC', 'False'))
+# Arquivo com a versão da configuração de acessos, verificado pelos workers a cada
+# segundo; vazio usa o cache padrão do Django (precisa ser compartilhado).
+ACCESS_SETTINGS_STAMP_PATH = os.getenv(
+    'ACCESS_SETTINGS_STAMP_PATH', str(BASE_DIR / '.access_settings.stamp')
+)
+# Nos testes o arquivo acima vai para um diretório temporário.
+TEST_RUNNER = 'core.test_runner.TestRunner'
+# Dias mantidos nas consolidações por minuto ("rollup_access_events"); hora e dia ficam.
+ACCESS_ROLLUP_MINUTE_RETENTION_DAYS = int(os.getenv('ACCESS_ROLLUP_MINUTE_RETENTION_DAYS', '2'))
+# Ids de caminhos, referers e user agents mantidos em memória por processo (LRU).
+ACCESS_DIMENSION_CACHE_SIZE = int(os.getenv('ACCESS_DIMENSION_CACHE_SIZE', '10000'))
+# Stream SSE do dashboard (ASGI): intervalo da consulta única por worker e duração
+# máxima de cada conexão antes de o navegador reconectar.
+ACCESS_STREAM_INTERVAL_SECONDS = float(os.getenv('ACCESS_STREAM_INTERVAL_SECONDS', '2'))
+ACCESS_STREAM_MAX_SECONDS = float(os.getenv('ACCESS_STREAM_MAX_SECONDS', '300'))
+# Contadores do dashboard compartilhados pelo cache do Django: segundos de validade,
+# segundos extras servindo o valor antigo enquanto um worker recalcula (0 desliga) e
+# alias do cache (use um cache compartilhado, ex.: Redis, com vários workers).
+ACCESS_COUNTERS_CACHE_TTL = float(os.getenv('ACCESS_COUNTERS_CACHE_TTL', '5'))
+ACCESS_COUNTERS_CACHE_STALE = float(os.getenv('ACCESS_COUNTERS_CACHE_STALE', '30'))
+ACCESS_COUNTERS_CACHE_ALIAS = os.getenv('ACCESS_COUNTERS_CACHE_ALIAS', 'default')
+# Usuários/IPs distintos: "hll" (sketches HyperLogLog por minuto, hora e dia, gravados a
+# cada ACCESS_SKETCH_FLUSH_SECONDS) ou "exact" (COUNT DISTINCT sobre os eventos).
+ACCESS_UNIQUE_COUNT_MODE = os.getenv('ACCESS_UNIQUE_COUNT_MODE', 'hll')
+ACCESS_SKETCH_FLUSH_SECONDS = float(os.getenv('ACCESS_SKETCH_FLUSH_SECONDS', '5'))
+# Origem do contador "Online": "presence" (último acesso de cada usuário/IP no cache,
+# ACCESS_PRESENCE_CACHE_ALIAS, compartilhado entre workers) ou "events" (sketches/eventos).
+# Vazio: "presence" se o cache do alias for compartilhado (não LocMem), senão "events".
+ACCESS_ONLINE_SOURCE = os.getenv('ACCESS_ONLINE_SOURCE', '')
+ACCESS_PRESENCE_CACHE_ALIAS = os.getenv('ACCESS_PRESENCE_CACHE_ALIAS', 'default')
+ACCESS_PRESENCE_LOCAL_SIZE = int(os.getenv('ACCESS_PRESENCE_LOCAL_SIZE', '10000'))
+# Índice de usuários vistos (filtro do dashboard): de quantos em quantos segundos o
+# último acesso de um mesmo usuário é regravado, e quantos usuários cada worker lembra.
+ACCESS_SEEN_USERS_REFRESH_SECONDS = float(os.getenv('ACCESS_SEEN_USERS_REFRESH_SECONDS', '300'))
+ACCESS_SEEN_USERS_LOCAL_SIZE = int(os.getenv('ACCESS_SEEN_USERS_LOCAL_SIZE', '10000'))
+# Particionamento de AccessEvent (somente SQLite): "day" ou "month" grava cada
+# período numa tabela própria; vazio mantém a tabela única.
+ACCESS_EVENT_PARTITIONING = os.getenv('ACCESS_EVENT_PARTITIONING', '')
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
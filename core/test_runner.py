@@ -0,0 +1,22 @@
+import tempfile
+from pathlib import Path
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """Runner padrão com os arquivos que o projeto grava em disco num diretório temporário."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._tmp_dir = tempfile.TemporaryDirectory(prefix="syshealth-tests-")
+        self._settings_override = override_settings(
+            ACCESS_SETTINGS_STAMP_PATH=str(Path(self._tmp_dir.name) / "access_settings.stamp"),
+        )
+        self._settings_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._settings_override.disable()
+        self._tmp_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
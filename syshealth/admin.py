@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 from django.contrib import admin
+from django.contrib.auth import get_user_model
 from django.core.exceptions import PermissionDenied
+from django.db.models import Q
 from django.http import HttpResponseRedirect
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.html import format_html
 from django.utils.text import Truncator
 
@@ -14,6 +17,12 @@ from .models import (
     SystemHealthConfig,
     SystemHealthPanel,
 )
+from .seen_users import suggest_users
+
+# Os eventos podem estar no banco de telemetria, sem join com auth_user: filtro,
+# busca e exibição do usuário consultam os usuários à parte.
+USER_FILTER_CHOICES = 50
+USER_SEARCH_LIMIT = 1000
 
 
 def _has_ops_permission(user, codename: str) -> bool:
@@ -49,6 +58,19 @@ class AccessDashboardAdmin(admin.ModelAdmin):
         return HttpResponseRedirect(url)
 
 
+class SeenUserListFilter(admin.SimpleListFilter):
+    title = "usuário"
+    parameter_name = "user"
+
+    def lookups(self, request, model_admin):
+        return [(str(row["id"]), row["username"]) for row in suggest_users("", limit=USER_FILTER_CHOICES)]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(user_id=self.value())
+        return queryset
+
+
 @admin.register(AccessEvent)
 class AccessEventAdmin(admin.ModelAdmin):
     actions = None
@@ -57,14 +79,17 @@ class AccessEventAdmin(admin.ModelAdmin):
         "user_display",
         "ip_address",
         "path_short",
+        "status_code",
+        "duration_ms",
         "origin_display",
     )
     list_filter = (
         "is_admin",
+        "status_code",
         "created_date",
-        ("user", admin.RelatedOnlyFieldListFilter),
+        SeenUserListFilter,
     )
-    search_fields = ("path", "referrer", "ip_address", "user__username", "user__email")
+    search_fields = ("path_ref__value", "referrer_ref__value", "ip_address")
     readonly_fields = (
         "user",
         "ip_address",
@@ -74,6 +99,12 @@ class AccessEventAdmin(admin.ModelAdmin):
         "is_admin",
         "created_date",
         "created_time",
+        "created_at",
+        "sample_weight",
+        "route_name",
+        "status_code",
+        "duration_ms",
+        "response_bytes",
     )
     list_per_page = 50
     date_hierarchy = "created_date"
@@ -94,15 +125,30 @@ class AccessEventAdmin(admin.ModelAdmin):
         return False
 
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related("user")
-
-    @admin.display(description="Data/Hora", ordering=("created_date", "created_time"))
+        return super().get_queryset(request).prefetch_related("user").with_dimensions()
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        term = search_term.strip()
+        if term:
+            User = get_user_model()
+            lookup = Q(**{f"{User.USERNAME_FIELD}__icontains": term})
+            if User.get_email_field_name():
+                lookup |= Q(**{f"{User.get_email_field_name()}__icontains": term})
+            user_ids = list(User.objects.filter(lookup).values_list("pk", flat=True)[:USER_SEARCH_LIMIT])
+            if user_ids:
+                results |= queryset.filter(user_id__in=user_ids)
+        return results, may_have_duplicates
+
+    @admin.display(description="Data/Hora", ordering="created_at")
     def created_at_display(self, obj):
+        if obj.created_at:
+            return f"{timezone.localtime(obj.created_at):%Y-%m-%d %H:%M:%S}"
         if obj.created_time:
             return f"{obj.created_date} {obj.created_time}"
         return str(obj.created_date)
 
-    @admin.display(description="Usuário", ordering="user__username")
+    @admin.display(description="Usuário")
     def user_display(self, obj):
         if obj.user:
             return obj.user.get_username()
@@ -174,9 +220,12 @@ class AccessSettingsAdmin(admin.ModelAdmin):
         "online_window_minutes",
         "auto_refresh_seconds",
         "sampling_ratio",
+        "adaptive_sampling",
         "log_anonymous",
         "log_non_get_requests",
+        "version",
     )
+    readonly_fields = ("version",)
 
     def has_module_permission(self, request):
         return bool(request.user and request.user.is_superuser)
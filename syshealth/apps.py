@@ -5,3 +5,21 @@ class SysHealthConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "syshealth"
     verbose_name = "Saúde do servidor"
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_migrate, pre_migrate
+
+        from . import partitions, sqlite_tuning
+        from .models import detach_deleted_user
+
+        mode = partitions.partitioning_mode()
+        if mode:
+            partitions.activate(mode)
+        # Os PRAGMAs entram antes de qualquer outra consulta da conexão.
+        connection_created.connect(sqlite_tuning._on_connection_created, dispatch_uid="syshealth_sqlite_pragmas")
+        connection_created.connect(partitions._on_connection_created, dispatch_uid="syshealth_partitions_view")
+        pre_migrate.connect(partitions._on_pre_migrate, sender=self, dispatch_uid="syshealth_partitions_premigrate")
+        post_migrate.connect(partitions._on_post_migrate, sender=self, dispatch_uid="syshealth_partitions_migrate")
+        post_delete.connect(detach_deleted_user, sender=settings.AUTH_USER_MODEL, dispatch_uid="syshealth_detach_user")
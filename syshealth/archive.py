@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import date, datetime, timezone as dt_timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_time
+
+from .models import AccessEvent, event_timestamp
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+DEFAULT_CHUNK_SIZE = 2000
+
+# Coluna do arquivo -> campo lido do banco. Textos das dimensões vão por valor,
+# para que o arquivo seja legível (e reimportável) sem as tabelas de dimensão.
+COLUMNS = (
+    ("id", "pk"),
+    ("created_at", "created_at"),
+    ("created_date", "created_date"),
+    ("created_time", "created_time"),
+    ("user_id", "user_id"),
+    ("ip_address", "ip_address"),
+    ("path", "path_ref__value"),
+    ("referrer", "referrer_ref__value"),
+    ("user_agent", "user_agent_ref__value"),
+    ("is_admin", "is_admin"),
+    ("sample_weight", "sample_weight"),
+    ("route_name", "route_name"),
+    ("status_code", "status_code"),
+    ("duration_ms", "duration_ms"),
+    ("response_bytes", "response_bytes"),
+)
+COLUMN_NAMES = tuple(name for name, _ in COLUMNS)
+
+
+def day_filter(day: date) -> Q:
+    """Eventos de um dia local: por ``created_at`` ou, sem ele, por ``created_date``."""
+    start = event_timestamp(day)
+    end = event_timestamp(date.fromordinal(day.toordinal() + 1))
+    return Q(created_at__gte=start, created_at__lt=end) | Q(created_at__isnull=True, created_date=day)
+
+
+def _encode(value) -> str:
+    if isinstance(value, datetime):
+        value = value.astimezone(dt_timezone.utc).isoformat()
+    elif hasattr(value, "isoformat"):
+        value = value.isoformat()
+    return json.dumps(value, ensure_ascii=False)
+
+
+@dataclass(frozen=True)
+class ArchivePart:
+    """Um lote arquivado de um dia: um arquivo gzip por coluna e o manifesto."""
+
+    path: Path
+    manifest: dict
+
+    @property
+    def rows(self) -> int:
+        return self.manifest["rows"]
+
+    @property
+    def max_pk(self) -> int:
+        return self.manifest["max_pk"]
+
+    def column(self, name: str) -> Iterator:
+        if name not in self.manifest["columns"]:
+            raise KeyError(f"Coluna desconhecida no arquivo: {name}")
+        with gzip.open(self.path / f"{name}.gz", "rt", encoding="utf-8") as handle:
+            for line in handle:
+                yield json.loads(line)
+
+    def read(self, columns: Optional[Sequence[str]] = None) -> Iterator[dict]:
+        """Linhas como dicionários; só os arquivos de ``columns`` são abertos."""
+        names = list(columns or self.manifest["columns"])
+        for values in zip(*(self.column(name) for name in names)):
+            yield dict(zip(names, values))
+
+
+class AccessArchive:
+    """Diretório de arquivos de eventos: ``<dir>/<AAAA-MM-DD>/part-NNNN/<coluna>.gz``.
+
+    Cada parte é gravada num diretório temporário e renomeada só quando completa,
+    então partes visíveis estão sempre inteiras. O manifesto guarda o maior id
+    arquivado, o que permite retomar uma limpeza interrompida sem duplicar linhas.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def days(self) -> List[date]:
+        if not self.directory.is_dir():
+            return []
+        found = []
+        for entry in self.directory.iterdir():
+            try:
+                day = date.fromisoformat(entry.name)
+            except ValueError:
+                continue
+            if self.parts(day):
+                found.append(day)
+        return sorted(found)
+
+    def parts(self, day: date) -> List[ArchivePart]:
+        day_dir = self.directory / day.isoformat()
+        if not day_dir.is_dir():
+            return []
+        parts = []
+        for entry in sorted(day_dir.glob("part-*")):
+            manifest_path = entry / MANIFEST
+            if entry.suffix == ".tmp" or not manifest_path.exists():
+                continue
+            parts.append(ArchivePart(entry, json.loads(manifest_path.read_text(encoding="utf-8"))))
+        return parts
+
+    def covered_pk(self, day: date) -> int:
+        """Maior id já arquivado do dia (0 se nenhum)."""
+        return max((part.max_pk for part in self.parts(day)), default=0)
+
+    def rows(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Iterator[dict]:
+        """Linhas dos dias entre ``start`` e ``end`` (inclusive), em ordem de dia e parte."""
+        for day in self.days():
+            if (start and day < start) or (end and day > end):
+                continue
+            for part in self.parts(day):
+                yield from part.read(columns)
+
+    def write_part(
+        self, day: date, queryset: QuerySet, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Optional[ArchivePart]:
+        """Grava as linhas de ``queryset`` como uma nova parte do dia, lendo o cursor em lotes."""
+        day_dir = self.directory / day.isoformat()
+        day_dir.mkdir(parents=True, exist_ok=True)
+        for stale in day_dir.glob("part-*.tmp"):
+            shutil.rmtree(stale, ignore_errors=True)
+        final = day_dir / f"part-{len(self.parts(day)) + 1:04d}"
+        tmp = final.with_suffix(".tmp")
+        tmp.mkdir()
+
+        rows = 0
+        min_pk = max_pk = None
+        handles = [gzip.open(tmp / f"{name}.gz", "wt", encoding="utf-8") for name in COLUMN_NAMES]
+        try:
+            values = queryset.order_by("pk").values_list(*(field for _, field in COLUMNS))
+            for row in values.iterator(chunk_size=chunk_size):
+                for handle, value in zip(handles, row):
+                    handle.write(_encode(value))
+                    handle.write("\n")
+                rows += 1
+                min_pk = row[0] if min_pk is None else min_pk
+                max_pk = row[0]
+        finally:
+            for handle in handles:
+                handle.close()
+
+        if not rows:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return None
+        manifest = {
+            "format": FORMAT_VERSION,
+            "day": day.isoformat(),
+            "rows": rows,
+            "min_pk": min_pk,
+            "max_pk": max_pk,
+            "columns": list(COLUMN_NAMES),
+            "archived_at": timezone.now().isoformat(),
+        }
+        (tmp / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        os.replace(tmp, final)
+        return ArchivePart(final, manifest)
+
+
+def _event_from_row(row: Dict[str, object], user_ids: set) -> AccessEvent:
+    created_at = parse_datetime(row["created_at"]) if row["created_at"] else None
+    return AccessEvent(
+        pk=row["id"],
+        created_at=created_at,
+        created_date=date.fromisoformat(row["created_date"]),
+        created_time=parse_time(row["created_time"]) if row["created_time"] else None,
+        # Usuários removidos depois do arquivamento voltam como anônimos.
+        user_id=row["user_id"] if row["user_id"] in user_ids else None,
+        ip_address=row["ip_address"],
+        path=row["path"] or "",
+        referrer=row["referrer"] or "",
+        user_agent=row["user_agent"] or "",
+        is_admin=row["is_admin"],
+        sample_weight=row["sample_weight"],
+        route_name=row["route_name"],
+        status_code=row["status_code"],
+        duration_ms=row["duration_ms"],
+        response_bytes=row["response_bytes"],
+    )
+
+
+def restore_events(rows: Iterable[dict], batch_size: int = 1000) -> int:
+    """Regrava linhas arquivadas em ``AccessEvent`` com os ids originais (idempotente)."""
+    restored = 0
+    batch: List[dict] = []
+
+    def flush() -> int:
+        wanted = {row["user_id"] for row in batch if row["user_id"] is not None}
+        existing = set(get_user_model().objects.filter(pk__in=wanted).values_list("pk", flat=True))
+        AccessEvent.objects.bulk_create([_event_from_row(row, existing) for row in batch], ignore_conflicts=True)
+        return len(batch)
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            restored += flush()
+            batch = []
+    if batch:
+        restored += flush()
+    return restored
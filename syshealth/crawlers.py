@@ -0,0 +1,133 @@
+"""Trechos de user agent de crawlers e ferramentas automatizadas conhecidos.
+
+Usados quando ``AccessSettings.ignore_known_crawlers`` está ativo, além da lista
+configurada em ``ignored_user_agents``. Os valores são comparados em minúsculas
+como substrings do user agent, então só entram trechos que navegadores e apps
+reais não enviam (nada de ``okhttp``, ``java/`` ou ``+http``).
+"""
+
+DEFAULT_CRAWLER_USER_AGENTS = (
+    # Buscadores
+    "googlebot",
+    "google-inspectiontool",
+    "googleother",
+    "adsbot-google",
+    "mediapartners-google",
+    "apis-google",
+    "feedfetcher-google",
+    "storebot-google",
+    "bingbot",
+    "bingpreview",
+    "msnbot",
+    "adidxbot",
+    "slurp",
+    "duckduckbot",
+    "duckassistbot",
+    "baiduspider",
+    "yandexbot",
+    "yandeximages",
+    "yandexmetrika",
+    "sogou web spider",
+    "exabot",
+    "seznambot",
+    "yeti/",
+    "coccocbot",
+    "qwantify",
+    "mojeekbot",
+    "petalbot",
+    "applebot",
+    # SEO e marketing
+    "ahrefsbot",
+    "ahrefssiteaudit",
+    "semrushbot",
+    "siteauditbot",
+    "mj12bot",
+    "dotbot",
+    "rogerbot",
+    "blexbot",
+    "serpstatbot",
+    "dataforseobot",
+    "seokicks",
+    "linkdexbot",
+    "barkrowler",
+    "screaming frog",
+    "sitebulb",
+    "megaindex",
+    # Redes sociais e prévias de links
+    "facebookexternalhit",
+    "facebookcatalog",
+    "meta-externalagent",
+    "twitterbot",
+    "linkedinbot",
+    "pinterestbot",
+    "slackbot",
+    "slack-imgproxy",
+    "discordbot",
+    "telegrambot",
+    "skypeuripreview",
+    "redditbot",
+    "embedly",
+    "vkshare",
+    # IA e coleta de dados
+    "gptbot",
+    "chatgpt-user",
+    "oai-searchbot",
+    "claudebot",
+    "claude-web",
+    "anthropic-ai",
+    "perplexitybot",
+    "ccbot",
+    "bytespider",
+    "amazonbot",
+    "cohere-ai",
+    "diffbot",
+    "omgili",
+    "imagesiftbot",
+    "youbot",
+    "timpibot",
+    # Monitoramento e uptime
+    "uptimerobot",
+    "pingdom",
+    "statuscake",
+    "site24x7",
+    "newrelicpinger",
+    "datadog agent",
+    "better uptime bot",
+    "freshping",
+    "nagios",
+    "zabbix",
+    "kube-probe",
+    "elb-healthchecker",
+    "googlehc",
+    "gtmetrix",
+    "chrome-lighthouse",
+    # Ferramentas e bibliotecas HTTP
+    "curl/",
+    "wget/",
+    "python-requests",
+    "python-urllib",
+    "python-httpx",
+    "aiohttp",
+    "go-http-client",
+    "apache-httpclient",
+    "libwww-perl",
+    "node-fetch",
+    "axios/",
+    "scrapy",
+    "headlesschrome",
+    "phantomjs",
+    # Varredores de segurança
+    "nmap",
+    "masscan",
+    "zgrab",
+    "nikto",
+    "sqlmap",
+    "wpscan",
+    "censysinspect",
+    "expanse",
+    "internet-measurement",
+    "paloaltonetworks",
+    # Genéricos
+    "crawler",
+    "spider",
+)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Sequence, Tuple, Type
+
+from django.conf import settings
+from django.db import connections, models, transaction
+
+from .routers import telemetry_db
+
+DEFAULT_CACHE_SIZE = 10_000
+
+
+def value_key(value: str) -> str:
+    """Chave fixa de 32 caracteres para o índice único, independente do tamanho do texto."""
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class DimensionCache:
+    """LRU em processo de texto -> id para uma tabela de dimensão.
+
+    Os valores que faltam num lote são resolvidos juntos: uma consulta para os
+    que já existem e um ``bulk_create`` (ignorando conflitos de outros workers)
+    para os novos.
+    """
+
+    def __init__(self, model: Type[models.Model], max_size: int = DEFAULT_CACHE_SIZE):
+        self.model = model
+        self.max_size = max(max_size, 1)
+        self.hits = 0
+        self.misses = 0
+        self._ids: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def get(self, value: str) -> Optional[int]:
+        with self._lock:
+            pk = self._ids.get(value)
+            if pk is not None:
+                self._ids.move_to_end(value)
+                self.hits += 1
+            return pk
+
+    def resolve(self, values: Iterable[str]) -> Dict[str, int]:
+        resolved: Dict[str, int] = {}
+        missing = set()
+        for value in values:
+            if value in resolved or value in missing:
+                continue
+            pk = self.get(value)
+            if pk is None:
+                missing.add(value)
+            else:
+                resolved[value] = pk
+        if missing:
+            with self._lock:
+                self.misses += len(missing)
+            loaded = self._load(missing)
+            resolved.update(loaded)
+            # Só guarda após o commit: se a transação externa for desfeita, os
+            # ids recém-criados deixam de existir e não podem ficar no cache.
+            transaction.on_commit(lambda: self._remember(loaded), using=telemetry_db())
+        return resolved
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids.clear()
+
+    def _load(self, values: Iterable[str]) -> Dict[str, int]:
+        by_key = {value_key(value): value for value in values}
+        found = dict(self.model.objects.filter(key__in=by_key).values_list("key", "pk"))
+        new = [self.model(key=key, value=value) for key, value in by_key.items() if key not in found]
+        if new:
+            self.model.objects.bulk_create(new, ignore_conflicts=True)
+            found.update(
+                self.model.objects.filter(key__in=[row.key for row in new]).values_list("key", "pk")
+            )
+        return {value: found[key] for key, value in by_key.items() if key in found}
+
+    def _remember(self, ids: Dict[str, int]) -> None:
+        with self._lock:
+            for value, pk in ids.items():
+                self._ids[value] = pk
+                self._ids.move_to_end(value)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+
+_caches: Dict[str, DimensionCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(model: Type[models.Model]) -> DimensionCache:
+    label = model._meta.label
+    cache = _caches.get(label)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(label)
+            if cache is None:
+                size = getattr(settings, "ACCESS_DIMENSION_CACHE_SIZE", DEFAULT_CACHE_SIZE)
+                cache = _caches[label] = DimensionCache(model, max_size=size)
+    return cache
+
+
+def clear_caches() -> None:
+    """Esquece os ids em memória (ex.: testes que descartam as tabelas)."""
+    for cache in list(_caches.values()):
+        cache.clear()
+
+
+def sweep_orphans(
+    dimensions: Iterable[Tuple[str, Type[models.Model]]],
+    tables: Sequence[str],
+    batch_size: int,
+    using: Optional[str] = None,
+) -> int:
+    """Apaga valores de dimensão que nenhum evento de ``tables`` referencia mais.
+
+    Cada lote é um único ``DELETE`` que volta a conferir as referências, então um
+    valor usado por um evento gravado durante a varredura não é removido. Os ids
+    não são reaproveitados (``AUTOINCREMENT``) e os caches do processo são
+    esvaziados; um worker com id removido em cache falha o lote e o resolve de novo.
+    """
+    using = using or telemetry_db()
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    removed = 0
+    for field_name, model in dimensions:
+        column = qn(f"{field_name}_ref_id")
+        referenced = " UNION ALL ".join(
+            f"SELECT {column} FROM {qn(table)} WHERE {column} IS NOT NULL" for table in tables
+        )
+        dimension_table = qn(model._meta.db_table)
+        pk = qn(model._meta.pk.column)
+        sql = (
+            f"DELETE FROM {dimension_table} WHERE {pk} IN ("
+            f"SELECT {pk} FROM {dimension_table} WHERE {pk} NOT IN ({referenced}) LIMIT %s)"
+        )
+        while True:
+            with transaction.atomic(using=using), connection.cursor() as cursor:
+                cursor.execute(sql, [batch_size])
+                deleted = cursor.rowcount
+            removed += deleted
+            if deleted < batch_size:
+                break
+        get_cache(model).clear()
+    return removed
+
+
+def intern_events(events: Sequence[models.Model]) -> None:
+    """Troca os textos pendentes de cada evento pelos ids das dimensões."""
+    for field_name, model in events[0].DIMENSIONS if events else ():
+        pending = [event for event in events if event.pending_dimension(field_name) is not None]
+        if not pending:
+            continue
+        values = {event.pending_dimension(field_name) for event in pending}
+        values.discard("")
+        ids = get_cache(model).resolve(values) if values else {}
+        for event in pending:
+            value = event.pending_dimension(field_name)
+            setattr(event, f"{field_name}_ref_id", ids.get(value) if value else None)
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import csv
+import zlib
+from datetime import datetime
+from io import StringIO
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Optional
+
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import event_timestamp
+
+CSV_HEADER = ("timestamp", "usuario", "ip", "path", "origem", "referrer")
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def export_rows(queryset: QuerySet, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[tuple]:
+    """Tuplas do CSV lidas em lotes do cursor, sem instanciar ``AccessEvent``."""
+    columns = queryset.select_related(None).values_list(
+        "created_at",
+        "created_date",
+        "created_time",
+        "user_id",
+        "ip_address",
+        "path_ref__value",
+        "is_admin",
+        "referrer_ref__value",
+    )
+    rows = columns.iterator(chunk_size=chunk_size)
+    usernames = UsernameCache()
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        # Os usuários podem estar em outro banco: nomes resolvidos por lote, sem join.
+        usernames.load(row[3] for row in chunk)
+        for created_at, created_date, created_time, user_id, ip_address, path, is_admin, referrer in chunk:
+            if created_at is not None:
+                moment = timezone.localtime(created_at)
+            else:
+                moment = event_timestamp(created_date, created_time)
+            yield (
+                moment.isoformat(),
+                usernames.get(user_id) or "Visitante",
+                ip_address,
+                path or "",
+                "admin" if is_admin else "site",
+                referrer or "",
+            )
+
+
+class UsernameCache:
+    """Nomes de usuário por id, buscados em lote e limitados a ``max_size`` entradas."""
+
+    def __init__(self, max_size: int = 10_000):
+        self.max_size = max_size
+        self._names: Dict[int, str] = {}
+
+    def load(self, user_ids: Iterable[Optional[int]]) -> None:
+        missing = {user_id for user_id in user_ids if user_id is not None and user_id not in self._names}
+        if not missing:
+            return
+        if len(self._names) + len(missing) > self.max_size:
+            self._names.clear()
+        User = get_user_model()
+        found = dict(User.objects.filter(pk__in=missing).values_list("pk", User.USERNAME_FIELD))
+        # Usuários removidos ficam como "" e não são buscados de novo.
+        self._names.update({user_id: found.get(user_id, "") for user_id in missing})
+
+    def get(self, user_id: Optional[int]) -> str:
+        return self._names.get(user_id, "") if user_id is not None else ""
+
+
+def csv_chunks(rows: Iterable[tuple], rows_per_chunk: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """CSV em pedaços de ``rows_per_chunk`` linhas; só um pedaço fica em memória."""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compacta em formato gzip à medida que os pedaços chegam."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def csv_export_response(
+    queryset: QuerySet,
+    now: datetime,
+    compress: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> StreamingHttpResponse:
+    chunks = csv_chunks(export_rows(queryset, chunk_size), chunk_size)
+    filename = f"access-events-{now:%Y%m%d%H%M%S}.csv"
+    if compress:
+        response = StreamingHttpResponse(gzip_chunks(chunks), content_type="application/gzip")
+        filename += ".gz"
+    else:
+        response = StreamingHttpResponse(chunks, content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f"attachment; filename={filename}"
+    return response
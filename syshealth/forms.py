@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+from datetime import timedelta
+
 from django import forms
 from django.contrib.auth import get_user_model
 
+from .models import event_timestamp
+
 
 class AccessEventFilterForm(forms.Form):
     SOURCE_ALL = "all"
@@ -21,10 +25,17 @@ class AccessEventFilterForm(forms.Form):
         choices=SOURCE_CHOICES,
         initial=SOURCE_ALL,
     )
+    # Campo de texto com sugestões (autocomplete) em vez de um <select> com
+    # todos os usuários: valida só o login digitado, sem listar a tabela.
     user = forms.ModelChoiceField(
         label="Usuário",
         required=False,
-        queryset=get_user_model().objects.none(),
+        queryset=get_user_model().objects.all(),
+        to_field_name=get_user_model().USERNAME_FIELD,
+        widget=forms.TextInput(
+            attrs={"placeholder": "Todos", "autocomplete": "off", "list": "access-user-options"}
+        ),
+        error_messages={"invalid_choice": "Usuário não encontrado."},
     )
     query = forms.CharField(
         label="Path contém",
@@ -32,14 +43,6 @@ class AccessEventFilterForm(forms.Form):
         widget=forms.TextInput(attrs={"placeholder": "/minha/url"}),
     )
 
-    def __init__(self, *args, **kwargs):
-        user_queryset = kwargs.pop("user_queryset", None)
-        super().__init__(*args, **kwargs)
-        if user_queryset is None:
-            user_queryset = get_user_model().objects.none()
-        self.fields["user"].queryset = user_queryset.order_by("username")
-        self.fields["user"].empty_label = "Todos"
-
     def cleaned_filters(self) -> dict:
         if not self.is_valid():
             return {}
@@ -55,5 +58,32 @@ class AccessEventFilterForm(forms.Form):
             filters["user_id"] = data["user"].pk
 
         if data.get("query"):
-            filters["path__icontains"] = data["query"]
+            filters["path_ref__value__icontains"] = data["query"]
+        return filters
+
+
+class AccessEventExportForm(forms.Form):
+    """Período do CSV, independente da janela de online do dashboard."""
+
+    start = forms.DateField(label="De", required=False, widget=forms.DateInput(attrs={"type": "date"}))
+    end = forms.DateField(label="Até", required=False, widget=forms.DateInput(attrs={"type": "date"}))
+    gzip = forms.BooleanField(label="Compactar (gzip)", required=False)
+
+    def clean(self):
+        data = super().clean()
+        start, end = data.get("start"), data.get("end")
+        if start and end and start > end:
+            raise forms.ValidationError("A data inicial deve ser anterior à final.")
+        return data
+
+    def has_range(self) -> bool:
+        return bool(self.cleaned_data.get("start") or self.cleaned_data.get("end"))
+
+    def range_filters(self) -> dict:
+        """Limites em ``created_at`` cobrindo os dias inteiros, no fuso local."""
+        filters = {}
+        if self.cleaned_data.get("start"):
+            filters["created_at__gte"] = event_timestamp(self.cleaned_data["start"])
+        if self.cleaned_data.get("end"):
+            filters["created_at__lt"] = event_timestamp(self.cleaned_data["end"] + timedelta(days=1))
         return filters
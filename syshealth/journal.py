@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import date, datetime, time as time_cls
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from django.conf import settings
+
+from .models import AccessEvent
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+OPEN_SUFFIX = ".open"
+PENDING_SUFFIX = ".new"
+SEALED_SUFFIX = ".seg"
+SEGMENT_PREFIX = "access-"
+
+DEFAULT_SEGMENT_BYTES = 8 * 1024 * 1024
+DEFAULT_SEGMENT_MAX_AGE = 300.0
+
+# Cada registro: tamanho do payload e CRC32 (big-endian) seguidos do JSON.
+HEADER = struct.Struct(">II")
+
+
+def serialize_event(event: AccessEvent) -> Dict[str, object]:
+    return {
+        "user_id": event.user_id,
+        "ip_address": event.ip_address,
+        "path": event.path,
+        "referrer": event.referrer,
+        "user_agent": event.user_agent,
+        "is_admin": event.is_admin,
+        "created_date": event.created_date.isoformat(),
+        "created_time": event.created_time.isoformat() if event.created_time else None,
+        "created_at": event.created_at.isoformat() if event.created_at else None,
+        "sample_weight": event.sample_weight,
+        "route_name": event.route_name,
+        "status_code": event.status_code,
+        "duration_ms": event.duration_ms,
+        "response_bytes": event.response_bytes,
+    }
+
+
+def deserialize_event(data: Dict[str, object]) -> AccessEvent:
+    created_time = data.get("created_time")
+    created_at = data.get("created_at")
+    return AccessEvent(
+        user_id=data.get("user_id"),
+        ip_address=data.get("ip_address") or "",
+        path=data.get("path") or "",
+        referrer=data.get("referrer") or "",
+        user_agent=data.get("user_agent") or "",
+        is_admin=bool(data.get("is_admin")),
+        created_date=date.fromisoformat(data["created_date"]),
+        created_time=time_cls.fromisoformat(created_time) if created_time else None,
+        created_at=datetime.fromisoformat(created_at) if created_at else None,
+        sample_weight=data.get("sample_weight") or 1.0,
+        route_name=data.get("route_name") or "",
+        status_code=data.get("status_code"),
+        duration_ms=data.get("duration_ms"),
+        response_bytes=data.get("response_bytes"),
+    )
+
+
+def encode_record(data: Dict[str, object]) -> bytes:
+    payload = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_segment(path: Path) -> Iterator[Dict[str, object]]:
+    """Lê os registros de um segmento, parando no primeiro registro incompleto
+    ou corrompido (ex.: escrita interrompida por queda do processo)."""
+    with open(path, "rb") as handle:
+        while True:
+            header = handle.read(HEADER.size)
+            if not header:
+                return
+            if len(header) < HEADER.size:
+                logger.warning("Registro truncado no fim de %s", path.name)
+                return
+            length, checksum = HEADER.unpack(header)
+            payload = handle.read(length)
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                logger.warning("Registro inválido em %s; ignorando o restante", path.name)
+                return
+            yield json.loads(payload)
+
+
+def _segment_pid(path: Path) -> Optional[int]:
+    try:
+        return int(path.name[len(SEGMENT_PREFIX):].split("-", 1)[0])
+    except ValueError:
+        return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _segment_in_use(path: Path, pid: int) -> bool:
+    """Diz se o processo dono ainda escreve no segmento.
+
+    O dono segura um ``flock`` exclusivo no arquivo enquanto ele está aberto, e o
+    kernel solta o lock quando o processo morre: um PID reaproveitado por outro
+    processo não prende o segmento. Sem ``fcntl`` resta conferir o PID.
+    """
+    if fcntl is None:  # pragma: no cover - Windows
+        return _pid_alive(pid)
+    try:
+        with open(path, "rb") as handle:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    except FileNotFoundError:
+        # Outro replay já o fechou.
+        return True
+    return False
+
+
+def seal_stale_segments(directory: Path) -> List[Path]:
+    """Fecha segmentos abertos de processos que já não existem."""
+    sealed = []
+    for path in sorted(directory.glob(f"{SEGMENT_PREFIX}*{OPEN_SUFFIX}")):
+        pid = _segment_pid(path)
+        if pid is None or pid == os.getpid() or _segment_in_use(path, pid):
+            continue
+        target = path.with_suffix(SEALED_SUFFIX)
+        try:
+            os.replace(path, target)
+        except FileNotFoundError:
+            continue
+        sealed.append(target)
+    return sealed
+
+
+def sealed_segments(directory: Path) -> List[Path]:
+    return sorted(directory.glob(f"{SEGMENT_PREFIX}*{SEALED_SUFFIX}"))
+
+
+class AccessJournal:
+    """Journal local, apenas de acréscimo, para eventos que não chegaram ao banco.
+
+    Cada processo escreve no próprio segmento ``.open``; ao atingir
+    ``segment_bytes`` ou ``segment_max_age`` segundos o segmento vira ``.seg`` e
+    fica disponível para o comando ``replay_access_journal``.
+    """
+
+    def __init__(
+        self,
+        directory,
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        segment_max_age: float = DEFAULT_SEGMENT_MAX_AGE,
+        fsync: bool = False,
+    ):
+        self.directory = Path(directory)
+        self.segment_bytes = max(segment_bytes, 1024)
+        self.segment_max_age = max(segment_max_age, 1.0)
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._handle = None
+        self._path: Optional[Path] = None
+        self._opened_at = 0.0
+        self._pid: Optional[int] = None
+
+    def append(self, events: Sequence[AccessEvent]) -> None:
+        self.append_records(serialize_event(event) for event in events)
+
+    def append_records(self, records: Iterable[Dict[str, object]]) -> None:
+        data = b"".join(encode_record(record) for record in records)
+        if not data:
+            return
+        with self._lock:
+            handle = self._current_handle()
+            handle.write(data)
+            handle.flush()
+            if self.fsync:
+                os.fsync(handle.fileno())
+            if handle.tell() >= self.segment_bytes:
+                self._seal_locked()
+
+    def seal(self) -> None:
+        with self._lock:
+            self._seal_locked()
+
+    def _current_handle(self):
+        pid = os.getpid()
+        if self._handle is not None and self._pid != pid:
+            # Herdado do processo pai após fork; o pai continua dono do arquivo e
+            # do lock. Fechar a cópia evita que o filho prenda o segmento do pai.
+            self._handle.close()
+            self._handle = None
+            self._path = None
+        if self._handle is not None and time.monotonic() - self._opened_at >= self.segment_max_age:
+            self._seal_locked()
+        if self._handle is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._pid = pid
+            self._path = self.directory / f"{SEGMENT_PREFIX}{pid}-{time.time_ns()}{OPEN_SUFFIX}"
+            # O arquivo só ganha o nome ``.open`` depois do lock, para o replay
+            # nunca tomá-lo como abandonado antes da primeira escrita.
+            pending = self._path.with_suffix(PENDING_SUFFIX)
+            self._handle = open(pending, "ab")
+            if fcntl is not None:
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_EX)
+            os.replace(pending, self._path)
+            self._opened_at = time.monotonic()
+        return self._handle
+
+    def _seal_locked(self) -> None:
+        if self._handle is None or self._path is None:
+            return
+        self._handle.close()
+        try:
+            # Com o lock solto, um replay concorrente pode ter fechado o segmento.
+            if self._path.stat().st_size:
+                os.replace(self._path, self._path.with_suffix(SEALED_SUFFIX))
+            else:
+                self._path.unlink()
+        except FileNotFoundError:
+            pass
+        self._handle = None
+        self._path = None
+
+
+_journal: Optional[AccessJournal] = None
+_journal_lock = threading.Lock()
+
+
+def get_journal() -> Optional[AccessJournal]:
+    global _journal
+    directory = getattr(settings, "ACCESS_LOG_JOURNAL_DIR", "")
+    if not directory:
+        return None
+    if _journal is not None:
+        return _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = AccessJournal(
+                directory,
+                segment_bytes=getattr(
+                    settings, "ACCESS_LOG_JOURNAL_SEGMENT_BYTES", DEFAULT_SEGMENT_BYTES
+                ),
+                segment_max_age=getattr(
+                    settings, "ACCESS_LOG_JOURNAL_SEGMENT_MAX_AGE", DEFAULT_SEGMENT_MAX_AGE
+                ),
+                fsync=getattr(settings, "ACCESS_LOG_JOURNAL_FSYNC", False),
+            )
+    return _journal
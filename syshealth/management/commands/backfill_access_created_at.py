@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...models import event_timestamp
+from ...partitions import base_event_model
+
+
+class Command(BaseCommand):
+    help = "Preenche AccessEvent.created_at a partir de created_date/created_time, em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Eventos atualizados por transação.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.0,
+            help="Pausa em segundos entre lotes, para não disputar o banco com os workers.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options["batch_size"], 1)
+        pause = max(options["sleep"], 0.0)
+        # Partições sempre recebem created_at; só a tabela original tem pendências.
+        model = base_event_model()
+        pending = model.objects.filter(created_at__isnull=True)
+        total = pending.count()
+        if not total:
+            self.stdout.write("Nenhum evento sem created_at.")
+            return
+
+        updated = 0
+        last_pk = 0
+        started = time.monotonic()
+        while True:
+            # Avança pela chave primária: cada lote começa de onde o anterior parou.
+            rows = list(
+                pending.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", "created_date", "created_time")[:batch_size]
+            )
+            if not rows:
+                break
+            events = [
+                model(pk=pk, created_at=event_timestamp(created_date, created_time))
+                for pk, created_date, created_time in rows
+            ]
+            model.objects.bulk_update(events, ["created_at"], batch_size=500)
+            updated += len(events)
+            last_pk = rows[-1][0]
+
+            elapsed = time.monotonic() - started
+            rate = updated / elapsed if elapsed else 0.0
+            self.stdout.write(f"{updated}/{total} eventos ({rate:.0f}/s)")
+            if pause:
+                time.sleep(pause)
+
+        self.stdout.write(self.style.SUCCESS(f"created_at preenchido em {updated} eventos."))
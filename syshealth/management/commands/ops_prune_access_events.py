@@ -1,16 +1,23 @@
 from __future__ import annotations
 
-from datetime import timedelta
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
 
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import QuerySet
 from django.utils import timezone
 
-from ...models import AccessEvent, AccessSettings
+from ...archive import AccessArchive, day_filter
+from ...dimensions import sweep_orphans
+from ...models import AccessEvent, AccessSettings, event_timestamp
+from ...partitions import Partition, base_event_model, drop_partition, existing_partitions, partitioning_active
+from ...routers import telemetry_db
 
 
 class Command(BaseCommand):
-    help = "Remove eventos de acesso antigos conforme a retenção configurada."
+    help = "Remove eventos de acesso antigos conforme a retenção configurada, em lotes."
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -18,28 +25,168 @@ class Command(BaseCommand):
             action="store_true",
             help="Somente calcula quantos registros seriam removidos.",
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Eventos removidos por transação.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.0,
+            help="Pausa em segundos entre lotes, para não disputar o banco com os workers.",
+        )
+        parser.add_argument(
+            "--archive",
+            metavar="DIR",
+            help="Grava os eventos expirados, por dia e em colunas compactadas, em DIR antes de removê-los.",
+        )
 
     def handle(self, *args, **options):
         settings = AccessSettings.get_cached(force=True)
         retention_days = max(settings.retention_days, 1)
         cutoff_date = timezone.localdate() - timedelta(days=retention_days)
+        cutoff = event_timestamp(cutoff_date)
 
-        queryset = AccessEvent.objects.filter(created_date__lt=cutoff_date)
-        count = queryset.count()
+        # Com particionamento, a tabela original guarda só eventos anteriores a ele;
+        # partições inteiramente expiradas saem com DROP TABLE, sem apagar linha a linha.
+        self.model = base_event_model()
+        partitions = (
+            [partition for partition in existing_partitions() if partition.end <= cutoff_date]
+            if partitioning_active()
+            else []
+        )
+        # Do mais antigo para o mais novo pelo índice de created_at; eventos ainda
+        # sem created_at (antes do backfill) saem pela data local.
+        expired = (
+            self.model.objects.filter(created_at__lt=cutoff).order_by("created_at", "pk"),
+            self.model.objects.filter(created_at__isnull=True, created_date__lt=cutoff_date).order_by(
+                "created_date", "pk"
+            ),
+        )
+        total = sum(queryset.count() for queryset in expired)
+        total += sum(partition.model.objects.count() for partition in partitions)
 
         if options["dry_run"]:
             self.stdout.write(
                 self.style.WARNING(
-                    f"Dry-run: {count} eventos anteriores a {cutoff_date} seriam removidos."
+                    f"Dry-run: {total} eventos anteriores a {cutoff_date} seriam removidos."
                 )
             )
             return
+        self.batch_size = max(options["batch_size"], 1)
+        if not total and not partitions:
+            self.stdout.write(f"Nenhum evento anterior a {cutoff_date}.")
+            self._sweep_dimensions()
+            return
 
-        with transaction.atomic():
-            deleted, _ = queryset.delete()
+        self.pause = max(options["sleep"], 0.0)
+        self.total = total
+        self.deleted = 0
+        self.started = time.monotonic()
+        archive = AccessArchive(options["archive"]) if options["archive"] else None
+        try:
+            if archive is not None:
+                self._archive_and_delete(archive, cutoff, cutoff_date)
+            else:
+                for queryset in expired:
+                    self._delete_in_batches(queryset)
+            for partition in partitions:
+                self._drop_partition(partition, archive)
+        except KeyboardInterrupt:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Interrompido após {self.deleted} eventos; rode o comando de novo para continuar."
+                )
+            )
+            return
 
         self.stdout.write(
             self.style.SUCCESS(
-                f"Removidos {deleted} eventos anteriores a {cutoff_date} (retenção {retention_days} dias)."
+                f"Removidos {self.deleted} eventos anteriores a {cutoff_date} "
+                f"(retenção {retention_days} dias, {self._rate():.0f} eventos/s)."
             )
         )
+        self._sweep_dimensions()
+
+    def _sweep_dimensions(self) -> None:
+        # Caminhos, origens e user agents só usados por eventos removidos não
+        # ficam para sempre nas tabelas de dimensão.
+        tables = [self.model._meta.db_table]
+        if connections[telemetry_db()].vendor == "sqlite":
+            tables.extend(partition.table for partition in existing_partitions())
+        removed = sweep_orphans(AccessEvent.DIMENSIONS, tables, self.batch_size)
+        if removed:
+            self.stdout.write(f"{removed} valores sem eventos removidos das dimensões.")
+
+    def _rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.deleted / elapsed if elapsed else 0.0
+
+    def _delete_in_batches(self, queryset: QuerySet) -> int:
+        removed = 0
+        while True:
+            # Cada lote é uma transação curta: o lock de escrita é liberado
+            # entre lotes e uma interrupção perde no máximo o lote atual.
+            pks = list(queryset.values_list("pk", flat=True)[: self.batch_size])
+            if not pks:
+                return removed
+            with transaction.atomic(using=telemetry_db()):
+                batch_deleted, _ = self.model.objects.filter(pk__in=pks).delete()
+            removed += batch_deleted
+            self.deleted += batch_deleted
+            self.stdout.write(f"{self.deleted}/{self.total} eventos removidos ({self._rate():.0f}/s)")
+            if self.pause:
+                time.sleep(self.pause)
+
+    def _archive_and_delete(self, archive: AccessArchive, cutoff: datetime, cutoff_date: date) -> None:
+        while True:
+            day = self._oldest_expired_day(cutoff, cutoff_date)
+            if day is None:
+                return
+            events = self.model.objects.filter(day_filter(day))
+            # O que já está no arquivo (execução interrompida) não é gravado de novo.
+            covered = archive.covered_pk(day)
+            part = archive.write_part(day, events.filter(pk__gt=covered))
+            if part is not None:
+                covered = part.max_pk
+                self.stdout.write(f"{day}: {part.rows} eventos arquivados em {part.path}")
+            removed = self._delete_in_batches(events.filter(pk__lte=covered).order_by("pk"))
+            if part is None and not removed:
+                raise CommandError(f"Eventos de {day} não puderam ser arquivados nem removidos.")
+
+    def _oldest_expired_day(self, cutoff: datetime, cutoff_date: date) -> Optional[date]:
+        days = []
+        oldest = (
+            self.model.objects.filter(created_at__lt=cutoff)
+            .order_by("created_at")
+            .values_list("created_at", flat=True)
+            .first()
+        )
+        if oldest is not None:
+            days.append(timezone.localdate(oldest))
+        legacy = (
+            self.model.objects.filter(created_at__isnull=True, created_date__lt=cutoff_date)
+            .order_by("created_date")
+            .values_list("created_date", flat=True)
+            .first()
+        )
+        if legacy is not None:
+            days.append(legacy)
+        return min(days, default=None)
+
+    def _drop_partition(self, partition: Partition, archive: Optional[AccessArchive]) -> None:
+        events = partition.model.objects.all()
+        if archive is not None:
+            for day in partition.days():
+                part = archive.write_part(day, events.filter(day_filter(day), pk__gt=archive.covered_pk(day)))
+                if part is not None:
+                    self.stdout.write(f"{day}: {part.rows} eventos arquivados em {part.path}")
+        count = events.count()
+        drop_partition(partition)
+        self.deleted += count
+        self.stdout.write(
+            f"{partition.table}: {count} eventos removidos com DROP TABLE "
+            f"({self.deleted}/{self.total}, {self._rate():.0f}/s)"
+        )
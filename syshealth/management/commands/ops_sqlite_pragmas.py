@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from ...sqlite_tuning import PRAGMA_SETTINGS, configured_pragmas, effective_pragmas, normalize
+
+
+class Command(BaseCommand):
+    help = "Mostra os PRAGMAs do SQLite em vigor e os configurados em settings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Alias do banco (padrão: default).",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Sai com erro se algum valor em vigor for diferente do configurado.",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if connection.vendor != "sqlite":
+            raise CommandError(f"O banco {options['database']} não é SQLite ({connection.vendor}).")
+
+        configured = {name: normalize(name, value) for name, value in configured_pragmas()}
+        effective = effective_pragmas(connection)
+        settings_by_pragma = dict(PRAGMA_SETTINGS)
+        self.stdout.write(f"Banco: {connection.settings_dict['NAME']}")
+        self.stdout.write(f"{'PRAGMA':14} {'em vigor':>12} {'configurado':>12}  setting")
+        mismatched = []
+        for name, value in effective.items():
+            wanted = configured.get(name)
+            line = f"{name:14} {value:>12} {wanted or '(padrão)':>12}  {settings_by_pragma[name]}"
+            if wanted is not None and wanted != value:
+                mismatched.append(name)
+                line = self.style.WARNING(line + "  <- diferente")
+            self.stdout.write(line)
+
+        if mismatched and options["check"]:
+            raise CommandError(f"PRAGMAs diferentes do configurado: {', '.join(mismatched)}.")
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...journal import deserialize_event, read_segment, seal_stale_segments, sealed_segments
+from ...models import AccessEvent, AccessJournalSegment
+from ...routers import telemetry_db
+
+
+class Command(BaseCommand):
+    help = "Carrega no banco os segmentos pendentes do journal de eventos de acesso."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dir",
+            dest="directory",
+            default=None,
+            help="Diretório do journal (padrão: ACCESS_LOG_JOURNAL_DIR).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Quantidade de eventos por INSERT.",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Mantém os arquivos dos segmentos após o carregamento.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Somente lista os segmentos e registros pendentes.",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["directory"] or getattr(settings, "ACCESS_LOG_JOURNAL_DIR", "")
+        if not directory:
+            raise CommandError("Informe --dir ou configure ACCESS_LOG_JOURNAL_DIR.")
+        directory = Path(directory)
+        if not directory.is_dir():
+            self.stdout.write(self.style.WARNING(f"Diretório {directory} não existe."))
+            return
+
+        if not options["dry_run"]:
+            for path in seal_stale_segments(directory):
+                self.stdout.write(f"Segmento órfão fechado: {path.name}")
+
+        batch_size = max(options["batch_size"], 1)
+        loaded = skipped = 0
+        for path in sealed_segments(directory):
+            if options["dry_run"]:
+                records = sum(1 for _ in read_segment(path))
+                self.stdout.write(f"{path.name}: {records} eventos pendentes")
+                continue
+
+            count = self._replay_segment(path, batch_size)
+            if count is None:
+                skipped += 1
+                self.stdout.write(f"{path.name}: já carregado anteriormente")
+            else:
+                loaded += count
+                self.stdout.write(f"{path.name}: {count} eventos carregados")
+            if not options["keep"]:
+                path.unlink()
+
+        if options["dry_run"]:
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Journal reprocessado: {loaded} eventos carregados, {skipped} segmentos ignorados."
+            )
+        )
+
+    def _replay_segment(self, path: Path, batch_size: int):
+        # O registro do segmento é criado na mesma transação dos eventos; um
+        # segmento já registrado nunca é carregado de novo.
+        with transaction.atomic(using=telemetry_db()):
+            segment, created = AccessJournalSegment.objects.select_for_update().get_or_create(
+                name=path.name
+            )
+            if not created:
+                return None
+
+            records = list(read_segment(path))
+            user_ids = {record["user_id"] for record in records if record.get("user_id")}
+            existing_users = set(
+                get_user_model().objects.filter(pk__in=user_ids).values_list("pk", flat=True)
+            )
+            events = []
+            for record in records:
+                if record.get("user_id") not in existing_users:
+                    record["user_id"] = None
+                events.append(deserialize_event(record))
+            AccessEvent.objects.bulk_create(events, batch_size=batch_size)
+
+            segment.records = len(events)
+            segment.save(update_fields=["records"])
+        return len(events)
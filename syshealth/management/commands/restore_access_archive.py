@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...archive import AccessArchive, restore_events
+
+
+def _parse_day(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError as exc:
+        raise CommandError(f"Data inválida: {value} (use AAAA-MM-DD).") from exc
+
+
+class Command(BaseCommand):
+    help = "Reimporta eventos arquivados por ops_prune_access_events --archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Diretório passado a --archive.")
+        parser.add_argument("--start", help="Primeiro dia (AAAA-MM-DD).")
+        parser.add_argument("--end", help="Último dia (AAAA-MM-DD).")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Eventos gravados por bulk_create.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Somente lista os dias e quantos eventos seriam reimportados.",
+        )
+
+    def handle(self, *args, **options):
+        archive = AccessArchive(options["directory"])
+        start = _parse_day(options["start"]) if options["start"] else None
+        end = _parse_day(options["end"]) if options["end"] else None
+        days = [day for day in archive.days() if (not start or day >= start) and (not end or day <= end)]
+        if not days:
+            self.stdout.write("Nenhum dia arquivado no intervalo.")
+            return
+
+        if options["dry_run"]:
+            for day in days:
+                rows = sum(part.rows for part in archive.parts(day))
+                self.stdout.write(f"{day}: {rows} eventos")
+            return
+
+        restored = 0
+        for day in days:
+            # Ids originais e ignore_conflicts: reimportar o mesmo dia não duplica eventos.
+            count = restore_events(archive.rows(day, day), batch_size=max(options["batch_size"], 1))
+            restored += count
+            self.stdout.write(f"{day}: {count} eventos")
+        self.stdout.write(self.style.SUCCESS(f"Reimportados {restored} eventos de {len(days)} dias."))
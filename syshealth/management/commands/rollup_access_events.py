@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from datetime import datetime, time as time_cls, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from ...models import AccessEvent, AccessRollup
+from ...rollups import (
+    DEFAULT_LAG_SECONDS,
+    GRANULARITIES,
+    minute_retention_days,
+    prune_minute_rollups,
+    rolled_until,
+    rollup_range,
+)
+from ...sketches import prune_minute_sketches
+
+
+class Command(BaseCommand):
+    help = "Consolida eventos de acesso em buckets de minuto, hora e dia (AccessRollup)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help=(
+                "Recalcula a partir desta data/hora (ISO), mesmo já consolidada; útil após "
+                "carregar o journal. Por padrão continua de onde a última execução parou."
+            ),
+        )
+        parser.add_argument(
+            "--granularity",
+            action="append",
+            choices=GRANULARITIES,
+            help="Limita a consolidação a uma granularidade (pode repetir).",
+        )
+        parser.add_argument(
+            "--lag",
+            type=int,
+            default=DEFAULT_LAG_SECONDS,
+            help="Segundos de folga antes de fechar um bucket, para eventos ainda em fila.",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        end = now - timedelta(seconds=max(options["lag"], 0))
+        granularities = options["granularity"] or list(GRANULARITIES)
+        forced_start = self._parse_since(options["since"]) if options["since"] else None
+
+        first_event = self._first_event_moment()
+        if first_event is None and forced_start is None:
+            self.stdout.write("Nenhum evento de acesso para consolidar.")
+            return
+
+        written = 0
+        for granularity in granularities:
+            start = forced_start or rolled_until(granularity) or first_event
+            if granularity == AccessRollup.GRANULARITY_MINUTE:
+                start = max(start, now - timedelta(days=minute_retention_days()))
+            if start >= end:
+                continue
+            count = rollup_range(start, end, granularities=[granularity])
+            written += count
+            self.stdout.write(f"{granularity}: {count} linhas a partir de {timezone.localtime(start):%Y-%m-%d %H:%M}.")
+
+        pruned = prune_minute_rollups(now) + prune_minute_sketches(now)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Consolidação concluída: {written} linhas gravadas, {pruned} buckets de minuto expirados."
+            )
+        )
+
+    def _parse_since(self, value: str) -> datetime:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f"Data inválida para --since: {value}")
+            moment = datetime.combine(day, time_cls(0, 0))
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+    def _first_event_moment(self):
+        return AccessEvent.objects.aggregate(first=Min("created_at"))["first"]
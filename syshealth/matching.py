@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import fnmatch
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+REGEX_PREFIX = "re:"
+GLOB_CHARS = frozenset("*?[")
+USER_AGENT_CACHE_SIZE = 1024
+
+
+def split_entries(raw) -> List[str]:
+    if not raw:
+        return []
+    if isinstance(raw, str):
+        return [value.strip() for value in raw.split(",") if value.strip()]
+    return [str(value).strip() for value in raw if str(value).strip()]
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Monta uma expressão em forma de trie para um conjunto de prefixos literais,
+    de modo que o custo do match dependa do tamanho do caminho e não da
+    quantidade de prefixos."""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> Optional[str]:
+        # Um prefixo terminando aqui já basta: não é preciso olhar os mais longos.
+        if "" in node:
+            return None
+        branches = []
+        for char in sorted(node):
+            rest = build(node[char])
+            branches.append(re.escape(char) + (rest or ""))
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return build(trie) or ""
+
+
+class PathMatcher:
+    """Casamento de caminhos ignorados compilado uma única vez.
+
+    Cada entrada pode ser um prefixo literal (o ``*`` final é opcional), um glob
+    (``/media/*.jpg``, casando o caminho inteiro) ou uma expressão regular com o
+    prefixo ``re:`` (ancorada no início do caminho).
+    """
+
+    def __init__(self, entries: Iterable[str]):
+        self.prefixes: List[str] = []
+        self.globs: List[str] = []
+        self.regexes: List[str] = []
+        self._compiled_regexes: List[re.Pattern] = []
+        self.invalid: List[str] = []
+
+        for entry in entries:
+            if entry.startswith(REGEX_PREFIX):
+                pattern = entry[len(REGEX_PREFIX):]
+                try:
+                    compiled = re.compile(pattern)
+                except re.error:
+                    self.invalid.append(entry)
+                    continue
+                self.regexes.append(pattern)
+                self._compiled_regexes.append(compiled)
+                continue
+            literal = entry.rstrip("*")
+            if GLOB_CHARS.intersection(literal):
+                self.globs.append(entry)
+            elif literal:
+                self.prefixes.append(literal)
+            else:
+                # "*" sozinho: ignora tudo, como o prefixo vazio fazia antes.
+                self.prefixes.append("")
+
+        if self.invalid:
+            logger.warning("Expressões inválidas em caminhos ignorados: %s", self.invalid)
+
+        alternatives = []
+        if "" in self.prefixes:
+            alternatives.append("")
+        elif self.prefixes:
+            alternatives.append(_trie_pattern(self.prefixes))
+        alternatives.extend(fnmatch.translate(glob) for glob in self.globs)
+        # Expressões do usuário ficam separadas: unidas, flags inline como ``(?i)``
+        # deixariam de estar no início e os grupos de ``\1`` mudariam de número.
+
+        self._regex = re.compile("|".join(alternatives)) if alternatives else None
+
+    def __len__(self) -> int:
+        return len(self.prefixes) + len(self.globs) + len(self.regexes)
+
+    def matches(self, path: str) -> bool:
+        if self._regex is not None and self._regex.match(path) is not None:
+            return True
+        return any(regex.match(path) is not None for regex in self._compiled_regexes)
+
+
+class UserAgentMatcher:
+    """Procura, numa única passada, qualquer um dos trechos de user agent.
+
+    Os trechos viram uma trie compilada pelo ``re`` (em C), e os veredictos dos
+    user agents mais recentes ficam num LRU, já que o tráfego real repete
+    poucos valores distintos.
+    """
+
+    def __init__(self, patterns: Iterable[str], cache_size: int = USER_AGENT_CACHE_SIZE):
+        self.patterns = sorted({pattern.lower() for pattern in patterns if pattern})
+        self._regex = re.compile(_trie_pattern(self.patterns)) if self.patterns else None
+        self._cached_match = lru_cache(maxsize=cache_size)(self._match)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def matches(self, user_agent: str) -> bool:
+        if not user_agent or self._regex is None:
+            return False
+        return self._cached_match(user_agent)
+
+    def cache_info(self):
+        return self._cached_match.cache_info()
+
+    def _match(self, user_agent: str) -> bool:
+        return self._regex.search(user_agent.lower()) is not None
@@ -1,71 +1,211 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-import random
-from typing import Optional
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Optional, Set
 
-from django.db import DatabaseError, IntegrityError
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings as django_settings
+from django.contrib import auth
+from django.db import close_old_connections
 from django.urls import NoReverseMatch, reverse
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject, empty
 
 from .models import AccessEvent, AccessSettings
+from .presence import touch_presence
+from .sampling import AdaptiveSampler, resolve_route_name, route_key, session_fraction
+from .sketches import record_visitor
+from .writer import DEFAULT_QUEUE_SIZE, AccessEventWriter, get_writer
 
 logger = logging.getLogger(__name__)
 
+ASYNC_BATCH_LIMIT = 200
+
+
+@dataclass
+class RequestRecord:
+    """O que o registro usa da requisição e da resposta, sem os objetos (e corpos) delas."""
+
+    method: str
+    path: str
+    user_agent: str
+    referrer: str
+    forwarded_for: str
+    remote_addr: str
+    user: Any
+    is_admin: bool
+    route_name: str
+    session_key: Optional[str]
+    status_code: Optional[int]
+    response_bytes: Optional[int]
+    duration_ms: Optional[float]
+
 
 class AccessLogMiddleware:
-    """Registra eventos de acesso com o menor impacto possível."""
+    """Registra eventos de acesso com o menor impacto possível.
+
+    Sob ASGI a requisição vai para uma fila do event loop após a resposta e é
+    registrada em lote numa thread do executor, sem bloquear o loop.
+    """
 
-    def __init__(self, get_response):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response, writer: Optional[AccessEventWriter] = None):
         self.get_response = get_response
+        self.writer = writer or get_writer()
         self._error_count = 0
         self._admin_prefix: Optional[str] = None
+        self._pending_tasks: Set[asyncio.Task] = set()
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_queue: Optional[asyncio.Queue] = None
+        self.async_queue_size = max(getattr(django_settings, "ACCESS_LOG_QUEUE_SIZE", DEFAULT_QUEUE_SIZE), 1)
+        self.sampler = AdaptiveSampler()
+        self._async_mode = iscoroutinefunction(get_response)
+        if self._async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self._async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
         response = self.get_response(request)
-        self._log_request_safe(request)
+        duration_ms = (time.perf_counter() - started) * 1000
+        self._log_request_safe(request, response, duration_ms)
         return response
 
-    def _log_request_safe(self, request) -> None:
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        duration_ms = (time.perf_counter() - started) * 1000
+        try:
+            record = self._build_record(request, response, duration_ms, detach_user=True)
+        except Exception:  # pragma: no cover - proteção extra
+            self._count_error()
+            return response
+        try:
+            self._get_async_queue().put_nowait(record)
+        except asyncio.QueueFull:
+            # Banco parado: a fila não cresce sem limite; conta como os writers fazem.
+            self.writer.count_drop("dropped_newest")
+        return response
+
+    def _get_async_queue(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            self._async_loop = loop
+            self._async_queue = asyncio.Queue(maxsize=self.async_queue_size)
+            task = loop.create_task(self._consume_async_queue(self._async_queue))
+            self._pending_tasks.add(task)
+            task.add_done_callback(self._pending_tasks.discard)
+        return self._async_queue
+
+    async def _consume_async_queue(self, pending: asyncio.Queue) -> None:
+        # Um único consumidor por event loop: cada salto para thread processa
+        # todas as requisições acumuladas desde o anterior.
+        while True:
+            items = [await pending.get()]
+            while len(items) < ASYNC_BATCH_LIMIT and not pending.empty():
+                items.append(pending.get_nowait())
+            await sync_to_async(self._log_requests_detached, thread_sensitive=False)(items)
+            for _ in items:
+                pending.task_done()
+
+    def _log_requests_detached(self, records) -> None:
+        try:
+            for record in records:
+                self._log_record_safe(record)
+        finally:
+            # Fora do ciclo de requisição ninguém fecha a conexão desta thread.
+            close_old_connections()
+
+    def _log_request_safe(self, request, response=None, duration_ms=None) -> None:
+        try:
+            self._log_record(self._build_record(request, response, duration_ms))
+        except Exception:  # pragma: no cover - proteção extra
+            self._count_error()
+
+    def _log_record_safe(self, record: RequestRecord) -> None:
         try:
-            self._log_request(request)
+            self._log_record(record)
         except Exception:  # pragma: no cover - proteção extra
-            self._error_count += 1
-            if self._error_count <= 3:
-                logger.exception("Falha ao registrar evento de acesso")
+            self._count_error()
+
+    def _count_error(self) -> None:
+        self._error_count += 1
+        if self._error_count <= 3:
+            logger.exception("Falha ao registrar evento de acesso")
 
-    def _log_request(self, request) -> None:
+    def _build_record(self, request, response=None, duration_ms=None, detach_user: bool = False) -> RequestRecord:
+        meta = request.META
+        session = getattr(request, "session", None)
+        return RequestRecord(
+            method=getattr(request, "method", "GET") or "GET",
+            path=getattr(request, "path", "") or "",
+            user_agent=meta.get("HTTP_USER_AGENT", "")[:256],
+            referrer=meta.get("HTTP_REFERER", "")[:512],
+            forwarded_for=meta.get("HTTP_X_FORWARDED_FOR", ""),
+            remote_addr=meta.get("REMOTE_ADDR", ""),
+            user=self._detached_user(request) if detach_user else getattr(request, "user", None),
+            is_admin=self._is_admin_request(request),
+            route_name=resolve_route_name(request)[:200],
+            session_key=getattr(session, "session_key", None),
+            status_code=getattr(response, "status_code", None),
+            response_bytes=self._response_size(response),
+            duration_ms=duration_ms,
+        )
+
+    def _detached_user(self, request):
+        user = getattr(request, "user", None)
+        if not isinstance(user, SimpleLazyObject) or user._wrapped is not empty:
+            return user
+        # Ainda não resolvido: no event loop isso consultaria o banco. Resolve na
+        # thread a partir só da sessão, sem manter a requisição viva na fila.
+        session = getattr(request, "session", None)
+        if session is None:
+            return None
+        holder = SimpleNamespace(session=session)
+        return SimpleLazyObject(lambda: auth.get_user(holder))
+
+    def _log_record(self, record: RequestRecord) -> None:
         settings = AccessSettings.get_cached()
-        method = getattr(request, "method", "GET")
-        if not settings.should_log_method(method):
+        if not settings.should_log_method(record.method):
             return
 
-        path = getattr(request, "path", "") or ""
+        path = record.path
         if not path:
             return
 
         if settings.should_ignore_path(path):
             return
 
-        user_agent = request.META.get("HTTP_USER_AGENT", "")[:256]
+        user_agent = record.user_agent
         if settings.should_ignore_user_agent(user_agent):
             return
 
-        user = getattr(request, "user", None)
+        user = record.user
         user_instance = user if getattr(user, "is_authenticated", False) else None
 
         if user_instance is None and not settings.log_anonymous:
             return
 
-        ip_address = self._get_ip(request)
+        ip_address = self._get_ip(record)
         if user_instance is None and not ip_address:
             return
 
-        sampling_ratio = max(settings.sampling_ratio or 1, 1)
-        if sampling_ratio > 1 and random.randint(1, sampling_ratio) != 1:
+        # Antes da amostragem: online e distintos contam todos os acessos, não só os gravados.
+        user_id = getattr(user_instance, "pk", None)
+        touch_presence(user_id, ip_address, settings.online_window_minutes)
+        record_visitor(user_id, ip_address)
+
+        sample_weight = self._sample_weight(record, settings, user_instance, ip_address)
+        if sample_weight is None:
             return
 
-        is_admin = self._is_admin_request(request)
         now = timezone.localtime()
         created_time = now.time().replace(microsecond=0)
 
@@ -73,27 +213,67 @@ class AccessLogMiddleware:
             user=user_instance,
             ip_address=(ip_address or "")[:45],
             path=path[:512],
-            referrer=request.META.get("HTTP_REFERER", "")[:512],
+            referrer=record.referrer,
             user_agent=user_agent,
-            is_admin=is_admin,
+            is_admin=record.is_admin,
             created_date=now.date(),
             created_time=created_time,
+            created_at=now,
+            sample_weight=sample_weight,
+            route_name=record.route_name,
+            status_code=record.status_code,
+            duration_ms=round(record.duration_ms, 3) if record.duration_ms is not None else None,
+            response_bytes=record.response_bytes,
         )
 
-        try:
-            event.save(force_insert=True)
-        except (DatabaseError, IntegrityError):
-            self._error_count += 1
-            if self._error_count <= 3:
-                logger.exception("Erro ao salvar evento de acesso")
-
-    def _get_ip(self, request) -> str:
-        header = request.META.get("HTTP_X_FORWARDED_FOR")
+        self.writer.write(event)
+
+    def _sample_weight(self, record: RequestRecord, settings, user, ip_address) -> Optional[float]:
+        """Peso do evento ou ``None`` quando ele fica fora da amostra.
+
+        A decisão compara a probabilidade de registro com a posição estável da
+        sessão, então o rastro de uma sessão é mantido ou descartado por inteiro
+        em cada rota; sessões mantidas nas rotas mais amostradas também são
+        mantidas em todas as outras.
+        """
+        sampling_ratio = max(settings.sampling_ratio or 1, 1)
+        probability = 1.0 / sampling_ratio
+        if settings.adaptive_sampling:
+            probability *= self.sampler.probability(
+                route_key(record.route_name, record.path), settings.sampling_max_events_per_second
+            )
+        if probability >= 1.0:
+            return 1.0
+
+        if session_fraction(self._session_identity(record, user, ip_address)) >= probability:
+            return None
+        return 1.0 / probability
+
+    def _session_identity(self, record: RequestRecord, user, ip_address) -> str:
+        if record.session_key:
+            return f"s:{record.session_key}"
+        if user is not None:
+            return f"u:{user.pk}"
+        return f"ip:{ip_address}"
+
+    def _response_size(self, response) -> Optional[int]:
+        if response is None:
+            return None
+        length = response.get("Content-Length") if hasattr(response, "get") else None
+        if length and length.isdigit():
+            return int(length)
+        if getattr(response, "streaming", False):
+            return None
+        content = getattr(response, "content", None)
+        return len(content) if content is not None else None
+
+    def _get_ip(self, record: RequestRecord) -> str:
+        header = record.forwarded_for
         if header:
             ip = header.split(",")[0].strip()
             if ip:
                 return ip
-        return request.META.get("REMOTE_ADDR", "")
+        return record.remote_addr
 
     def _is_admin_request(self, request) -> bool:
         match = getattr(request, "resolver_match", None)
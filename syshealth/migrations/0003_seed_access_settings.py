@@ -1,11 +1,21 @@
 # Generated by Django 4.2.16 on 2025-11-03 20:47
 
-from django.db import migrations
+from django.db import migrations, router
 
 
 def create_settings_and_permissions(apps, schema_editor):
+    # Com o banco de telemetria, a configuração e as permissões ficam em bancos diferentes.
+    db_alias = schema_editor.connection.alias
     AccessSettings = apps.get_model("syshealth", "AccessSettings")
-    AccessSettings.objects.get_or_create(
+    if router.allow_migrate_model(db_alias, AccessSettings):
+        _create_settings(AccessSettings.objects.using(db_alias))
+    Permission = apps.get_model("auth", "Permission")
+    if router.allow_migrate_model(db_alias, Permission):
+        _create_permissions(apps, db_alias)
+
+
+def _create_settings(manager):
+    manager.get_or_create(
         defaults={
             "ignore_paths": [
                 "/static/",
@@ -23,28 +33,30 @@ def create_settings_and_permissions(apps, schema_editor):
         }
     )
 
+
+def _create_permissions(apps, db_alias):
     ContentType = apps.get_model("contenttypes", "ContentType")
     Permission = apps.get_model("auth", "Permission")
     Group = apps.get_model("auth", "Group")
 
-    dashboard_ct, _ = ContentType.objects.get_or_create(
+    dashboard_ct, _ = ContentType.objects.using(db_alias).get_or_create(
         app_label="ops", model="access_dashboard"
     )
-    event_ct, _ = ContentType.objects.get_or_create(app_label="ops", model="access_event")
+    event_ct, _ = ContentType.objects.using(db_alias).get_or_create(app_label="ops", model="access_event")
 
-    Permission.objects.get_or_create(
+    Permission.objects.using(db_alias).get_or_create(
         content_type=dashboard_ct,
         codename="view_access_dashboard",
         defaults={"name": "Pode visualizar o dashboard de acessos"},
     )
-    Permission.objects.get_or_create(
+    Permission.objects.using(db_alias).get_or_create(
         content_type=event_ct,
         codename="view_access_event",
         defaults={"name": "Pode visualizar eventos de acesso"},
     )
 
-    group, _ = Group.objects.get_or_create(name="system_dashboard_viewers")
-    perms = Permission.objects.filter(
+    group, _ = Group.objects.using(db_alias).get_or_create(name="system_dashboard_viewers")
+    perms = Permission.objects.using(db_alias).filter(
         content_type__app_label="ops",
         codename__in=["view_access_dashboard", "view_access_event"],
     )
@@ -58,6 +70,8 @@ def remove_settings_and_permissions(apps, schema_editor):
     ContentType = apps.get_model("contenttypes", "ContentType")
     Permission = apps.get_model("auth", "Permission")
     Group = apps.get_model("auth", "Group")
+    if not router.allow_migrate_model(schema_editor.connection.alias, Permission):
+        return
 
     try:
         group = Group.objects.get(name="system_dashboard_viewers")
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("syshealth", "0003_seed_access_settings"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccessJournalSegment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="Segmento"
+                    ),
+                ),
+                (
+                    "records",
+                    models.PositiveIntegerField(default=0, verbose_name="Registros"),
+                ),
+                (
+                    "replayed_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Reprocessado em"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Segmento do journal de acessos",
+                "verbose_name_plural": "Segmentos do journal de acessos",
+                "default_permissions": (),
+            },
+        ),
+    ]
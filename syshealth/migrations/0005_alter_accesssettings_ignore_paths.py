@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("syshealth", "0004_accessjournalsegment"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="accesssettings",
+            name="ignore_paths",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="Lista de caminhos a ignorar: prefixos (ex.: /static/), globs (ex.: /media/*.jpg) ou expressões regulares com o prefixo re: (ex.: re:/api/v[0-9]+/health).",
+                verbose_name="Caminhos ignorados",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("syshealth", "0005_alter_accesssettings_ignore_paths"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="accesssettings",
+            name="ignore_known_crawlers",
+            field=models.BooleanField(
+                default=False,
+                help_text="Inclui a lista embutida de buscadores, bots e ferramentas automatizadas.",
+                verbose_name="Ignorar crawlers conhecidos",
+            ),
+        ),
+    ]
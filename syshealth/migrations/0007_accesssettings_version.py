@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("syshealth", "0006_accesssettings_ignore_known_crawlers"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="accesssettings",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=1,
+                editable=False,
+                help_text="Incrementada a cada alteração; os workers recarregam ao notar a mudança.",
+                verbose_name="Versão",
+            ),
+        ),
+    ]
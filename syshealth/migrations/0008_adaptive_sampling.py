@@ -0,0 +1,49 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("syshealth", "0007_accesssettings_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="accessevent",
+            name="sample_weight",
+            field=models.FloatField(
+                default=1.0,
+                help_text="Quantos acessos reais este evento representa (1 / probabilidade de registro).",
+                verbose_name="Peso da amostra",
+            ),
+        ),
+        migrations.AddField(
+            model_name="accesssettings",
+            name="adaptive_sampling",
+            field=models.BooleanField(
+                default=False,
+                help_text="Limita cada rota ao máximo de eventos por segundo abaixo; rotas raras continuam sendo registradas integralmente.",
+                verbose_name="Amostragem adaptativa por rota",
+            ),
+        ),
+        migrations.AddField(
+            model_name="accesssettings",
+            name="sampling_max_events_per_second",
+            field=models.PositiveIntegerField(
+                default=5,
+                help_text="Usado pela amostragem adaptativa.",
+                verbose_name="Máximo de eventos/s por rota",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="accesssettings",
+            name="sampling_ratio",
+            field=models.PositiveIntegerField(
+                default=1,
+                help_text="1 registra todos os acessos; valores maiores registram 1 a cada N sessões.",
+                verbose_name="Amostragem",
+            ),
+        ),
+    ]
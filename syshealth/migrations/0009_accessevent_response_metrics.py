@@ -0,0 +1,37 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("syshealth", "0008_adaptive_sampling"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="accessevent",
+            name="duration_ms",
+            field=models.FloatField(blank=True, null=True, verbose_name="Duração (ms)"),
+        ),
+        migrations.AddField(
+            model_name="accessevent",
+            name="response_bytes",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="Tamanho da resposta (bytes)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="accessevent",
+            name="route_name",
+            field=models.CharField(blank=True, max_length=200, verbose_name="Rota"),
+        ),
+        migrations.AddField(
+            model_name="accessevent",
+            name="status_code",
+            field=models.PositiveSmallIntegerField(
+                blank=True, null=True, verbose_name="Status HTTP"
+            ),
+        ),
+    ]
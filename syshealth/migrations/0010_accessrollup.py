@@ -0,0 +1,93 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("syshealth", "0009_accessevent_response_metrics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccessRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[
+                            ("minute", "Minuto"),
+                            ("hour", "Hora"),
+                            ("day", "Dia"),
+                        ],
+                        max_length=6,
+                        verbose_name="Granularidade",
+                    ),
+                ),
+                (
+                    "bucket_start",
+                    models.DateTimeField(verbose_name="Início do intervalo"),
+                ),
+                (
+                    "route_name",
+                    models.CharField(
+                        blank=True,
+                        help_text="Vazio para o total do intervalo (todas as rotas).",
+                        max_length=200,
+                        verbose_name="Rota",
+                    ),
+                ),
+                (
+                    "hits",
+                    models.FloatField(default=0.0, verbose_name="Acessos estimados"),
+                ),
+                (
+                    "events",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Eventos gravados"
+                    ),
+                ),
+                (
+                    "admin_hits",
+                    models.FloatField(default=0.0, verbose_name="Acessos ao admin"),
+                ),
+                (
+                    "site_hits",
+                    models.FloatField(default=0.0, verbose_name="Acessos ao site"),
+                ),
+                (
+                    "unique_users",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Usuários únicos"
+                    ),
+                ),
+                (
+                    "unique_ips",
+                    models.PositiveIntegerField(default=0, verbose_name="IPs únicos"),
+                ),
+            ],
+            options={
+                "verbose_name": "Consolidação de acessos",
+                "verbose_name_plural": "Consolidações de acessos",
+                "ordering": ("granularity", "-bucket_start", "route_name"),
+                "default_permissions": (),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="accessrollup",
+            constraint=models.UniqueConstraint(
+                fields=("granularity", "bucket_start", "route_name"),
+                name="ops_rollup_bucket_uniq",
+            ),
+        ),
+    ]
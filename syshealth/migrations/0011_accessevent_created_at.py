@@ -0,0 +1,43 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("syshealth", "0010_accessrollup"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="accessevent",
+            options={
+                "default_permissions": (),
+                "ordering": ("-created_at", "-pk"),
+                "permissions": (
+                    ("view_access_event", "Pode visualizar eventos de acesso"),
+                ),
+                "verbose_name": "Evento de acesso",
+                "verbose_name_plural": "Eventos de acesso",
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name="accessevent",
+            name="ops_access_datetime_idx",
+        ),
+        migrations.AddField(
+            model_name="accessevent",
+            name="created_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Preenchido pelo middleware; eventos antigos via backfill_access_created_at.",
+                null=True,
+                verbose_name="Momento do acesso",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="accessevent",
+            index=models.Index(fields=["created_at"], name="ops_access_created_at_idx"),
+        ),
+    ]
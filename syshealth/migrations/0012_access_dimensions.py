@@ -0,0 +1,296 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:27
+
+import hashlib
+
+from django.conf import settings
+from django.db import migrations, models, router
+import django.db.models.deletion
+
+BATCH_SIZE = 2000
+DIMENSIONS = (
+    ("path", "AccessPath"),
+    ("referrer", "AccessReferrer"),
+    ("user_agent", "AccessUserAgent"),
+)
+
+
+def _value_key(value):
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def intern_event_values(apps, schema_editor):
+    """Move os textos de cada evento para as tabelas de dimensão, em lotes."""
+    AccessEvent = apps.get_model("syshealth", "AccessEvent")
+    db_alias = schema_editor.connection.alias
+    if not router.allow_migrate_model(db_alias, AccessEvent):
+        return
+    models_by_field = {
+        field: apps.get_model("syshealth", name) for field, name in DIMENSIONS
+    }
+    ids = {field: {} for field, _ in DIMENSIONS}
+
+    last_pk = 0
+    while True:
+        rows = list(
+            AccessEvent.objects.using(db_alias)
+            .filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "path", "referrer", "user_agent")[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        for index, (field, _) in enumerate(DIMENSIONS, start=1):
+            model = models_by_field[field]
+            known = ids[field]
+            missing = {
+                row[index] for row in rows if row[index] and row[index] not in known
+            }
+            if missing:
+                model.objects.using(db_alias).bulk_create(
+                    [model(key=_value_key(value), value=value) for value in missing],
+                    ignore_conflicts=True,
+                )
+                keys = {_value_key(value): value for value in missing}
+                for key, pk in (
+                    model.objects.using(db_alias)
+                    .filter(key__in=keys)
+                    .values_list("key", "pk")
+                ):
+                    known[keys[key]] = pk
+
+        events = [
+            AccessEvent(
+                pk=pk,
+                path_ref_id=ids["path"].get(path),
+                referrer_ref_id=ids["referrer"].get(referrer),
+                user_agent_ref_id=ids["user_agent"].get(user_agent),
+            )
+            for pk, path, referrer, user_agent in rows
+        ]
+        AccessEvent.objects.using(db_alias).bulk_update(
+            events, ["path_ref", "referrer_ref", "user_agent_ref"], batch_size=500
+        )
+        last_pk = rows[-1][0]
+
+
+def restore_event_values(apps, schema_editor):
+    """Desfaz ``intern_event_values``: copia os textos das dimensões de volta para o evento."""
+    AccessEvent = apps.get_model("syshealth", "AccessEvent")
+    db_alias = schema_editor.connection.alias
+    if not router.allow_migrate_model(db_alias, AccessEvent):
+        return
+
+    last_pk = 0
+    while True:
+        rows = list(
+            AccessEvent.objects.using(db_alias)
+            .filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list(
+                "pk", "path_ref__value", "referrer_ref__value", "user_agent_ref__value"
+            )[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        events = [
+            AccessEvent(
+                pk=pk,
+                path=path or "",
+                referrer=referrer or "",
+                user_agent=user_agent or "",
+            )
+            for pk, path, referrer, user_agent in rows
+        ]
+        AccessEvent.objects.using(db_alias).bulk_update(
+            events, ["path", "referrer", "user_agent"], batch_size=500
+        )
+        last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("syshealth", "0011_accessevent_created_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccessPath",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        editable=False, max_length=32, unique=True, verbose_name="Chave"
+                    ),
+                ),
+                ("value", models.CharField(max_length=512, verbose_name="Caminho")),
+            ],
+            options={
+                "verbose_name": "Caminho acessado",
+                "verbose_name_plural": "Caminhos acessados",
+                "abstract": False,
+                "default_permissions": (),
+            },
+        ),
+        migrations.CreateModel(
+            name="AccessReferrer",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        editable=False, max_length=32, unique=True, verbose_name="Chave"
+                    ),
+                ),
+                (
+                    "value",
+                    models.CharField(max_length=512, verbose_name="Origem (referer)"),
+                ),
+            ],
+            options={
+                "verbose_name": "Origem de acesso",
+                "verbose_name_plural": "Origens de acesso",
+                "abstract": False,
+                "default_permissions": (),
+            },
+        ),
+        migrations.CreateModel(
+            name="AccessUserAgent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        editable=False, max_length=32, unique=True, verbose_name="Chave"
+                    ),
+                ),
+                ("value", models.CharField(max_length=256, verbose_name="User agent")),
+            ],
+            options={
+                "verbose_name": "User agent",
+                "verbose_name_plural": "User agents",
+                "abstract": False,
+                "default_permissions": (),
+            },
+        ),
+        migrations.AddField(
+            model_name="accessevent",
+            name="path_ref",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="syshealth.accesspath",
+                verbose_name="Caminho",
+            ),
+        ),
+        migrations.AddField(
+            model_name="accessevent",
+            name="referrer_ref",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="syshealth.accessreferrer",
+                verbose_name="Origem (referer)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="accessevent",
+            name="user_agent_ref",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="syshealth.accessuseragent",
+                verbose_name="User agent",
+            ),
+        ),
+        migrations.RunPython(intern_event_values, restore_event_values),
+        # Só no estado: ao desfazer, as colunas voltam com "" nas linhas existentes
+        # (sem default o SQLite recusaria o NOT NULL) e restore_event_values as preenche.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="accessevent",
+                    name="path",
+                    field=models.CharField(
+                        default="", max_length=512, verbose_name="Caminho"
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="accessevent",
+                    name="referrer",
+                    field=models.CharField(
+                        blank=True,
+                        default="",
+                        max_length=512,
+                        verbose_name="Origem (referer)",
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="accessevent",
+                    name="user_agent",
+                    field=models.CharField(
+                        blank=True, default="", max_length=256, verbose_name="User agent"
+                    ),
+                ),
+            ],
+        ),
+        migrations.RemoveField(
+            model_name="accessevent",
+            name="path",
+        ),
+        migrations.RemoveField(
+            model_name="accessevent",
+            name="referrer",
+        ),
+        migrations.RemoveField(
+            model_name="accessevent",
+            name="user_agent",
+        ),
+        migrations.AlterField(
+            model_name="accessevent",
+            name="user",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="access_events",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Usuário",
+            ),
+        ),
+    ]
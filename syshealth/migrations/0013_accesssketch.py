@@ -0,0 +1,64 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("syshealth", "0012_access_dimensions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccessSketch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[
+                            ("minute", "Minuto"),
+                            ("hour", "Hora"),
+                            ("day", "Dia"),
+                        ],
+                        max_length=6,
+                        verbose_name="Granularidade",
+                    ),
+                ),
+                (
+                    "bucket_start",
+                    models.DateTimeField(verbose_name="Início do intervalo"),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("user", "Usuários"), ("ip", "IPs anônimos")],
+                        max_length=4,
+                        verbose_name="Tipo",
+                    ),
+                ),
+                ("registers", models.BinaryField(verbose_name="Registradores")),
+            ],
+            options={
+                "verbose_name": "Sketch de distintos",
+                "verbose_name_plural": "Sketches de distintos",
+                "default_permissions": (),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="accesssketch",
+            constraint=models.UniqueConstraint(
+                fields=("granularity", "kind", "bucket_start"),
+                name="ops_sketch_bucket_uniq",
+            ),
+        ),
+    ]
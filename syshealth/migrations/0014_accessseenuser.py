@@ -0,0 +1,82 @@
+# Generated by Django 4.2.16 on 2026-10-17 19:51
+
+from django.conf import settings
+from django.db import migrations, models, router
+import django.db.models.deletion
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def backfill_seen_users(apps, schema_editor):
+    # Única varredura agrupada dos eventos; daí em diante o gravador mantém a tabela.
+    AccessEvent = apps.get_model("syshealth", "AccessEvent")
+    AccessSeenUser = apps.get_model("syshealth", "AccessSeenUser")
+    db_alias = schema_editor.connection.alias
+    if not (
+        router.allow_migrate_model(db_alias, AccessEvent)
+        and router.allow_migrate_model(db_alias, AccessSeenUser)
+    ):
+        # Eventos no banco de telemetria: o gravador preenche a tabela daqui em diante.
+        return
+    now = timezone.now()
+    rows = (
+        AccessEvent.objects.using(db_alias)
+        .exclude(user_id__isnull=True)
+        .values("user_id")
+        .annotate(first=models.Min("created_at"), last=models.Max("created_at"))
+        .order_by()
+    )
+    batch = []
+    for row in rows.iterator():
+        batch.append(
+            AccessSeenUser(
+                user_id=row["user_id"],
+                first_seen_at=row["first"] or now,
+                last_seen_at=row["last"] or now,
+            )
+        )
+        if len(batch) >= BATCH_SIZE:
+            AccessSeenUser.objects.using(db_alias).bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        AccessSeenUser.objects.using(db_alias).bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("syshealth", "0013_accesssketch"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccessSeenUser",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Usuário",
+                    ),
+                ),
+                ("first_seen_at", models.DateTimeField(verbose_name="Primeiro acesso")),
+                (
+                    "last_seen_at",
+                    models.DateTimeField(db_index=True, verbose_name="Último acesso"),
+                ),
+            ],
+            options={
+                "verbose_name": "Usuário visto",
+                "verbose_name_plural": "Usuários vistos",
+                "ordering": ("-last_seen_at",),
+                "default_permissions": (),
+            },
+        ),
+        migrations.RunPython(backfill_seen_users, migrations.RunPython.noop),
+    ]
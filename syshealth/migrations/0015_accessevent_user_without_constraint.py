@@ -0,0 +1,30 @@
+# Generated by Django 4.2.16 on 2026-10-17 20:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("syshealth", "0014_accessseenuser"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="accessevent",
+            name="user",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="access_events",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Usuário",
+            ),
+        ),
+    ]
@@ -1,34 +1,108 @@
 from __future__ import annotations
 
 import time
-from datetime import datetime
-from typing import Iterable, List
+from datetime import datetime, time as time_cls
+from functools import cached_property
+from typing import List, Optional
 
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from .crawlers import DEFAULT_CRAWLER_USER_AGENTS
+from .matching import PathMatcher, UserAgentMatcher, split_entries
+from .settings_stamp import publish_settings_stamp, read_settings_stamp
+
+
+def event_timestamp(created_date, created_time=None) -> datetime:
+    """Momento de um evento gravado só com data e hora locais (eventos antigos)."""
+    naive = datetime.combine(created_date, created_time or time_cls(0, 0))
+    return timezone.make_aware(naive, timezone.get_current_timezone())
+
 
 class AccessEventQuerySet(models.QuerySet):
     def since(self, moment: datetime) -> "AccessEventQuerySet":
         if moment is None:
             return self
+        return self.filter(created_at__gte=moment)
 
-        local_moment = timezone.localtime(moment)
-        moment_date = local_moment.date()
-        moment_time = local_moment.time()
-
-        return self.filter(
-            models.Q(created_date__gt=moment_date)
-            | (
-                models.Q(created_date=moment_date)
-                & (
-                    models.Q(created_time__gte=moment_time)
-                    | models.Q(created_time__isnull=True)
-                )
-            )
-        )
+    def with_dimensions(self) -> "AccessEventQuerySet":
+        return self.select_related("path_ref", "referrer_ref", "user_agent_ref")
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .partitions import insert_events, partitioning_active
+
+        objs = list(objs)
+        if self.model is AccessEvent and partitioning_active():
+            return insert_events(objs, *args, **kwargs)
+        prepare_events(objs)
+        created = super().bulk_create(objs, *args, **kwargs)
+        record_seen_users(objs)
+        return created
+
+
+def prepare_events(events) -> None:
+    """Completa ``created_at`` e troca textos pendentes pelos ids das dimensões."""
+    from .dimensions import intern_events
+
+    for event in events:
+        event.fill_created_at()
+    intern_events(events)
+
+
+def record_seen_users(events) -> None:
+    """Mantém o índice de usuários vistos (filtro do dashboard) após a gravação."""
+    from .seen_users import get_seen_users_index
+
+    get_seen_users_index().record(events)
+
+
+def detach_deleted_user(sender, instance, **kwargs) -> None:
+    """Eventos de um usuário removido passam a anônimos (``post_delete`` do usuário)."""
+    AccessEvent.objects.filter(user_id=instance.pk).update(user=None)
+
+
+class AccessDimension(models.Model):
+    """Texto repetido em muitos eventos, gravado uma única vez.
+
+    ``key`` é um hash de tamanho fixo do valor, usado no índice único no lugar
+    do texto (que pode ter centenas de caracteres).
+    """
+
+    key = models.CharField("Chave", max_length=32, unique=True, editable=False)
+
+    class Meta:
+        abstract = True
+        default_permissions = ()
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class AccessPath(AccessDimension):
+    value = models.CharField("Caminho", max_length=512)
+
+    class Meta(AccessDimension.Meta):
+        verbose_name = "Caminho acessado"
+        verbose_name_plural = "Caminhos acessados"
+
+
+class AccessReferrer(AccessDimension):
+    value = models.CharField("Origem (referer)", max_length=512)
+
+    class Meta(AccessDimension.Meta):
+        verbose_name = "Origem de acesso"
+        verbose_name_plural = "Origens de acesso"
+
+
+class AccessUserAgent(AccessDimension):
+    value = models.CharField("User agent", max_length=256)
+
+    class Meta(AccessDimension.Meta):
+        verbose_name = "User agent"
+        verbose_name_plural = "User agents"
 
 
 class AccessDashboard(models.Model):
@@ -44,45 +118,264 @@ class AccessDashboard(models.Model):
         return "Dashboard de acessos"
 
 
-class AccessEvent(models.Model):
+class AccessEventBase(models.Model):
+    """Campos e comportamento de um evento, compartilhados com as partições."""
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.SET_NULL,
+        on_delete=models.DO_NOTHING,
         null=True,
         blank=True,
-        related_name="access_events",
+        related_name="+",
         verbose_name="Usuário",
+        db_index=False,
+        db_constraint=False,
     )
     ip_address = models.CharField("Endereço IP", max_length=45, blank=True)
-    path = models.CharField("Caminho", max_length=512)
-    referrer = models.CharField("Origem (referer)", max_length=512, blank=True)
-    user_agent = models.CharField("User agent", max_length=256, blank=True)
+    path_ref = models.ForeignKey(
+        AccessPath,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Caminho",
+    )
+    referrer_ref = models.ForeignKey(
+        AccessReferrer,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name="+",
+        verbose_name="Origem (referer)",
+    )
+    user_agent_ref = models.ForeignKey(
+        AccessUserAgent,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name="+",
+        verbose_name="User agent",
+    )
     is_admin = models.BooleanField("Origem: admin?", default=False)
     created_date = models.DateField("Data do acesso")
     created_time = models.TimeField("Hora do acesso", null=True, blank=True)
+    created_at = models.DateTimeField(
+        "Momento do acesso",
+        null=True,
+        blank=True,
+        help_text="Preenchido pelo middleware; eventos antigos via backfill_access_created_at.",
+    )
+    sample_weight = models.FloatField(
+        "Peso da amostra",
+        default=1.0,
+        help_text="Quantos acessos reais este evento representa (1 / probabilidade de registro).",
+    )
+    route_name = models.CharField("Rota", max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField("Status HTTP", null=True, blank=True)
+    duration_ms = models.FloatField("Duração (ms)", null=True, blank=True)
+    response_bytes = models.PositiveIntegerField("Tamanho da resposta (bytes)", null=True, blank=True)
 
     objects = AccessEventQuerySet.as_manager()
 
+    class Meta:
+        abstract = True
+
+    def __str__(self) -> str:
+        target = self.user.get_username() if self.user_id else self.ip_address
+        return f"Acesso {target or 'desconhecido'} em {self.path}"
+
+    # Campo de texto -> tabela de dimensão; ``path``, ``referrer`` e
+    # ``user_agent`` continuam acessíveis como texto pelas propriedades abaixo.
+    DIMENSIONS = (("path", AccessPath), ("referrer", AccessReferrer), ("user_agent", AccessUserAgent))
+
+    def pending_dimension(self, field_name: str) -> Optional[str]:
+        return self.__dict__.get("_pending_dimensions", {}).get(field_name)
+
+    def _get_dimension(self, field_name: str) -> str:
+        pending = self.pending_dimension(field_name)
+        if pending is not None:
+            return pending
+        if getattr(self, f"{field_name}_ref_id") is None:
+            return ""
+        return getattr(self, f"{field_name}_ref").value
+
+    def _set_dimension(self, field_name: str, value: str) -> None:
+        self.__dict__.setdefault("_pending_dimensions", {})[field_name] = value or ""
+
+    path = property(
+        lambda self: self._get_dimension("path"),
+        lambda self, value: self._set_dimension("path", value),
+    )
+    referrer = property(
+        lambda self: self._get_dimension("referrer"),
+        lambda self, value: self._set_dimension("referrer", value),
+    )
+    user_agent = property(
+        lambda self: self._get_dimension("user_agent"),
+        lambda self, value: self._set_dimension("user_agent", value),
+    )
+
+    def fill_created_at(self) -> None:
+        if self.created_at is None and self.created_date is not None:
+            self.created_at = event_timestamp(self.created_date, self.created_time)
+
+    def save(self, *args, **kwargs):
+        prepare_events([self])
+        super().save(*args, **kwargs)
+        record_seen_users([self])
+
+
+class AccessEvent(AccessEventBase):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        # Os eventos podem ficar em outro banco (alias "telemetry"): sem chave
+        # estrangeira no banco, e detach_deleted_user faz o papel do SET_NULL.
+        on_delete=models.DO_NOTHING,
+        null=True,
+        blank=True,
+        related_name="access_events",
+        verbose_name="Usuário",
+        # Já coberto por ops_access_user_idx.
+        db_index=False,
+        db_constraint=False,
+    )
+
     class Meta:
         verbose_name = "Evento de acesso"
         verbose_name_plural = "Eventos de acesso"
         default_permissions = ()
         indexes = [
             models.Index(fields=["created_date"], name="ops_access_date_idx"),
-            models.Index(
-                fields=["created_date", "created_time"],
-                name="ops_access_datetime_idx",
-            ),
+            models.Index(fields=["created_at"], name="ops_access_created_at_idx"),
             models.Index(fields=["user"], name="ops_access_user_idx"),
             models.Index(fields=["ip_address"], name="ops_access_ip_idx"),
             models.Index(fields=["is_admin"], name="ops_access_admin_idx"),
         ]
-        ordering = ("-created_date", "-created_time", "-pk")
+        ordering = ("-created_at", "-pk")
         permissions = (("view_access_event", "Pode visualizar eventos de acesso"),)
 
+    def save(self, *args, **kwargs):
+        from .partitions import insert_events, partitioning_active
+
+        # Com partições, eventos novos vão para a tabela do dia (ou mês).
+        if partitioning_active() and self._state.adding:
+            insert_events([self])
+            return
+        super().save(*args, **kwargs)
+
+
+class AccessRollup(models.Model):
+    GRANULARITY_MINUTE = "minute"
+    GRANULARITY_HOUR = "hour"
+    GRANULARITY_DAY = "day"
+    GRANULARITY_CHOICES = (
+        (GRANULARITY_MINUTE, "Minuto"),
+        (GRANULARITY_HOUR, "Hora"),
+        (GRANULARITY_DAY, "Dia"),
+    )
+
+    granularity = models.CharField("Granularidade", max_length=6, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField("Início do intervalo")
+    route_name = models.CharField(
+        "Rota",
+        max_length=200,
+        blank=True,
+        help_text="Vazio para o total do intervalo (todas as rotas).",
+    )
+    hits = models.FloatField("Acessos estimados", default=0.0)
+    events = models.PositiveIntegerField("Eventos gravados", default=0)
+    admin_hits = models.FloatField("Acessos ao admin", default=0.0)
+    site_hits = models.FloatField("Acessos ao site", default=0.0)
+    unique_users = models.PositiveIntegerField("Usuários únicos", default=0)
+    unique_ips = models.PositiveIntegerField("IPs únicos", default=0)
+
+    class Meta:
+        verbose_name = "Consolidação de acessos"
+        verbose_name_plural = "Consolidações de acessos"
+        default_permissions = ()
+        constraints = [
+            models.UniqueConstraint(
+                fields=["granularity", "bucket_start", "route_name"],
+                name="ops_rollup_bucket_uniq",
+            ),
+        ]
+        ordering = ("granularity", "-bucket_start", "route_name")
+
     def __str__(self) -> str:
-        target = self.user.get_username() if self.user_id else self.ip_address
-        return f"Acesso {target or 'desconhecido'} em {self.path}"
+        return f"{self.get_granularity_display()} {self.bucket_start:%Y-%m-%d %H:%M} {self.route_name or 'total'}"
+
+
+class AccessSketch(models.Model):
+    """Sketch HyperLogLog de usuários ou IPs anônimos distintos num intervalo."""
+
+    KIND_USER = "user"
+    KIND_IP = "ip"
+    KIND_CHOICES = (
+        (KIND_USER, "Usuários"),
+        (KIND_IP, "IPs anônimos"),
+    )
+
+    granularity = models.CharField("Granularidade", max_length=6, choices=AccessRollup.GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField("Início do intervalo")
+    kind = models.CharField("Tipo", max_length=4, choices=KIND_CHOICES)
+    registers = models.BinaryField("Registradores")
+
+    class Meta:
+        verbose_name = "Sketch de distintos"
+        verbose_name_plural = "Sketches de distintos"
+        default_permissions = ()
+        constraints = [
+            models.UniqueConstraint(
+                fields=["granularity", "kind", "bucket_start"],
+                name="ops_sketch_bucket_uniq",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_granularity_display()} {self.bucket_start:%Y-%m-%d %H:%M} {self.kind}"
+
+
+class AccessSeenUser(models.Model):
+    """Usuários que já aparecem em algum evento, para o filtro do dashboard.
+
+    Mantido pelo gravador a cada lote, evita o ``DISTINCT`` sobre todos os
+    eventos só para montar a lista de usuários.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="+",
+        verbose_name="Usuário",
+    )
+    first_seen_at = models.DateTimeField("Primeiro acesso")
+    last_seen_at = models.DateTimeField("Último acesso", db_index=True)
+
+    class Meta:
+        verbose_name = "Usuário visto"
+        verbose_name_plural = "Usuários vistos"
+        default_permissions = ()
+        ordering = ("-last_seen_at",)
+
+    def __str__(self) -> str:
+        return f"{self.user} visto em {self.last_seen_at:%Y-%m-%d %H:%M}"
+
+
+class AccessJournalSegment(models.Model):
+    name = models.CharField("Segmento", max_length=255, unique=True)
+    records = models.PositiveIntegerField("Registros", default=0)
+    replayed_at = models.DateTimeField("Reprocessado em", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Segmento do journal de acessos"
+        verbose_name_plural = "Segmentos do journal de acessos"
+        default_permissions = ()
+
+    def __str__(self) -> str:
+        return self.name
 
 
 class AccessSettings(models.Model):
@@ -110,12 +403,29 @@ class AccessSettings(models.Model):
         default=list,
         blank=True,
         verbose_name="Caminhos ignorados",
-        help_text="Lista de prefixes de caminhos a ignorar (ex.: /static/).",
+        help_text=(
+            "Lista de caminhos a ignorar: prefixos (ex.: /static/), globs "
+            "(ex.: /media/*.jpg) ou expressões regulares com o prefixo re: "
+            "(ex.: re:/api/v[0-9]+/health)."
+        ),
     )
     sampling_ratio = models.PositiveIntegerField(
         default=1,
         verbose_name="Amostragem",
-        help_text="1 registra todos os acessos; valores maiores registram 1 a cada N acessos.",
+        help_text="1 registra todos os acessos; valores maiores registram 1 a cada N sessões.",
+    )
+    adaptive_sampling = models.BooleanField(
+        default=False,
+        verbose_name="Amostragem adaptativa por rota",
+        help_text=(
+            "Limita cada rota ao máximo de eventos por segundo abaixo; rotas raras "
+            "continuam sendo registradas integralmente."
+        ),
+    )
+    sampling_max_events_per_second = models.PositiveIntegerField(
+        default=5,
+        verbose_name="Máximo de eventos/s por rota",
+        help_text="Usado pela amostragem adaptativa.",
     )
     retention_days = models.PositiveIntegerField(
         default=90,
@@ -128,14 +438,28 @@ class AccessSettings(models.Model):
         verbose_name="User agents ignorados",
         help_text="Substrings simples para identificar crawlers a ignorar.",
     )
+    ignore_known_crawlers = models.BooleanField(
+        default=False,
+        verbose_name="Ignorar crawlers conhecidos",
+        help_text="Inclui a lista embutida de buscadores, bots e ferramentas automatizadas.",
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name="Versão",
+        help_text="Incrementada a cada alteração; os workers recarregam ao notar a mudança.",
+    )
 
     class Meta:
         verbose_name = "Configuração de monitoramento de acesso"
         verbose_name_plural = "Configurações de monitoramento de acesso"
 
     _CACHE_SECONDS = 60
+    _STAMP_CHECK_SECONDS = 1.0
     _cached_instance: "AccessSettings | None" = None
     _cached_at: float | None = None
+    _cached_stamp: str | None = None
+    _stamp_checked_at: float | None = None
 
     def __str__(self) -> str:
         return "Configuração de monitoramento de acessos"
@@ -147,29 +471,58 @@ class AccessSettings(models.Model):
             not force
             and cls._cached_instance is not None
             and cls._cached_at is not None
-            and now - cls._cached_at < cls._CACHE_SECONDS
+            and cls._cache_is_current(now)
         ):
             return cls._cached_instance
 
+        # Lê a versão publicada antes do banco para não perder uma alteração
+        # que aconteça entre as duas leituras.
+        stamp = read_settings_stamp()
         instance = cls.objects.first()
         if instance is None:
             instance = cls.objects.create(
                 ignore_paths=["/static/", "/media/", "/health/"],
             )
 
+        instance.compile_matchers()
         cls._cached_instance = instance
         cls._cached_at = now
+        cls._cached_stamp = stamp
+        cls._stamp_checked_at = now
         return instance
 
+    @classmethod
+    def _cache_is_current(cls, now: float) -> bool:
+        if cls._stamp_checked_at is not None and now - cls._stamp_checked_at < cls._STAMP_CHECK_SECONDS:
+            return True
+        cls._stamp_checked_at = now
+        stamp = read_settings_stamp()
+        if stamp is None:
+            # Nenhuma versão publicada: volta ao tempo de vida fixo.
+            return now - cls._cached_at < cls._CACHE_SECONDS
+        return stamp == cls._cached_stamp
+
     @property
     def normalized_ignore_paths(self) -> List[str]:
-        values: Iterable[str]
-        raw = self.ignore_paths or []
-        if isinstance(raw, str):
-            values = [value.strip() for value in raw.split(",") if value.strip()]
-        else:
-            values = [str(value).strip() for value in raw if str(value).strip()]
-        return [value.rstrip("*") for value in values]
+        return [value.rstrip("*") for value in split_entries(self.ignore_paths)]
+
+    @cached_property
+    def path_matcher(self) -> PathMatcher:
+        return PathMatcher(split_entries(self.ignore_paths))
+
+    @cached_property
+    def user_agent_matcher(self) -> UserAgentMatcher:
+        patterns = list(self.normalized_user_agents)
+        if self.ignore_known_crawlers:
+            patterns.extend(DEFAULT_CRAWLER_USER_AGENTS)
+        return UserAgentMatcher(patterns)
+
+    def compile_matchers(self) -> None:
+        # Compila agora, fora do caminho da requisição.
+        self.__dict__.pop("path_matcher", None)
+        self.__dict__.pop("user_agent_matcher", None)
+        self.path_matcher
+        self.user_agent_matcher
 
     @property
     def normalized_user_agents(self) -> List[str]:
@@ -184,24 +537,39 @@ class AccessSettings(models.Model):
         return method.upper() == "GET"
 
     def should_ignore_path(self, path: str) -> bool:
-        for prefix in self.normalized_ignore_paths:
-            if path.startswith(prefix):
-                return True
-        return False
+        return self.path_matcher.matches(path)
 
     def should_ignore_user_agent(self, user_agent: str) -> bool:
-        if not user_agent:
-            return False
-        user_agent_lower = user_agent.lower()
-        for entry in self.normalized_user_agents:
-            if entry and entry in user_agent_lower:
-                return True
-        return False
+        return self.user_agent_matcher.matches(user_agent)
+
+    def clean(self) -> None:
+        super().clean()
+        # Valida com o mesmo PathMatcher que get_cached() monta.
+        invalid = PathMatcher(split_entries(self.ignore_paths)).invalid
+        if invalid:
+            raise ValidationError(
+                {"ignore_paths": f"Expressões regulares inválidas: {', '.join(invalid)}"}
+            )
 
     def save(self, *args, **kwargs):
+        bump = self.pk is not None and not self._state.adding
+        if bump:
+            # Incremento no próprio UPDATE: dois saves simultâneos não gravam a mesma versão.
+            self.version = models.F("version") + 1
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "version"}
         super().save(*args, **kwargs)
-        self.__class__._cached_instance = self
-        self.__class__._cached_at = time.monotonic()
+        if bump:
+            self.refresh_from_db(fields=["version"])
+        self.compile_matchers()
+        stamp = f"{self.pk}:{self.version}"
+        publish_settings_stamp(stamp)
+        now = time.monotonic()
+        cls = self.__class__
+        cls._cached_instance = self
+        cls._cached_at = now
+        cls._cached_stamp = stamp
+        cls._stamp_checked_at = now
 
 
 class SystemHealthPanel(models.Model):
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import List, Optional, Tuple
+
+from django.db.models import Q, QuerySet
+
+PAGE_SIZE = 50
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+Cursor = Tuple[datetime, int]
+
+
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    """Token opaco para a posição (``created_at``, ``pk``) de um evento."""
+    micros = (created_at - _EPOCH) // timedelta(microseconds=1)
+    raw = f"{micros}:{pk}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: Optional[str]) -> Optional[Cursor]:
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode("ascii")
+        micros, pk = raw.split(":", 1)
+        return _EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError, OverflowError):
+        return None
+
+
+@dataclass
+class KeysetPage:
+    """Página de eventos do mais novo para o mais antigo.
+
+    ``before`` aponta para os eventos mais antigos que o último da página e
+    ``after`` para os mais novos que o primeiro.
+    """
+
+    object_list: List[object]
+    has_older: bool
+    has_newer: bool
+    before: Optional[str]
+    after: Optional[str]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    @property
+    def head(self) -> Optional[str]:
+        """Cursor do maior id da página (ponto de partida do feed incremental)."""
+        if not self.object_list:
+            return None
+        return latest_cursor(self.object_list)
+
+
+def _older_than(cursor: Cursor) -> Q:
+    created_at, pk = cursor
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+
+
+def _newer_than(cursor: Cursor) -> Q:
+    created_at, pk = cursor
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+
+
+def keyset_page(
+    qs: QuerySet,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    size: int = PAGE_SIZE,
+) -> KeysetPage:
+    """Busca uma página por (``created_at``, ``pk``), sem ``COUNT`` nem ``OFFSET``.
+
+    Cada página é uma busca no índice a partir do cursor, então a milésima
+    página custa o mesmo que a primeira.
+    """
+    before_cursor = decode_cursor(before)
+    after_cursor = None if before_cursor else decode_cursor(after)
+
+    if after_cursor is not None:
+        rows = list(qs.filter(_newer_than(after_cursor)).order_by("created_at", "pk")[: size + 1])
+        has_newer = len(rows) > size
+        events = list(reversed(rows[:size]))
+        has_older = True
+    else:
+        if before_cursor is not None:
+            qs = qs.filter(_older_than(before_cursor))
+        rows = list(qs.order_by("-created_at", "-pk")[: size + 1])
+        has_older = len(rows) > size
+        events = rows[:size]
+        has_newer = before_cursor is not None
+
+    if not events:
+        # Cursor além do fim (ex.: eventos removidos): mantém só o caminho de volta.
+        if after_cursor is not None:
+            return KeysetPage([], has_older=True, has_newer=False, before=after, after=None)
+        return KeysetPage([], has_older=False, has_newer=has_newer, before=None, after=before)
+
+    return KeysetPage(
+        object_list=events,
+        has_older=has_older,
+        has_newer=has_newer,
+        before=encode_cursor(events[-1].created_at, events[-1].pk) if has_older else None,
+        after=encode_cursor(events[0].created_at, events[0].pk) if has_newer else None,
+    )
+
+
+def latest_cursor(events: List[object]) -> str:
+    newest = max(events, key=lambda event: event.pk)
+    return encode_cursor(newest.created_at, newest.pk)
+
+
+def events_since(
+    qs: QuerySet, token: Optional[str], size: int = PAGE_SIZE
+) -> Optional[Tuple[List[object], bool, Optional[str]]]:
+    """Eventos gravados depois de ``token``, do mais novo para o mais antigo.
+
+    Ao contrário da navegação por páginas, compara só o ``pk``: os writers em
+    lote ou em thread podem gravar um evento depois de outros mais novos, e
+    ele ficaria para trás de um cursor por ``created_at``. Retorna ``None``
+    para token inválido; senão a lista, se havia mais de ``size`` eventos novos
+    (o cliente deve então substituir a lista inteira) e o próximo token.
+    """
+    cursor = decode_cursor(token)
+    if cursor is None:
+        return None
+    rows = list(qs.filter(pk__gt=cursor[1]).order_by("-pk")[: size + 1])
+    events = sorted(rows[:size], key=lambda event: (event.created_at, event.pk), reverse=True)
+    return events, len(rows) > size, latest_cursor(events) if events else token
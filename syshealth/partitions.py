@@ -0,0 +1,426 @@
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Type
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, models, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .models import AccessEvent, AccessEventBase, event_timestamp, prepare_events
+from .routers import telemetry_db
+
+MODE_DAY = "day"
+MODE_MONTH = "month"
+BASE_TABLE = "syshealth_accessevent"
+VIEW_NAME = "syshealth_accessevent_all"
+PARTITION_PREFIX = "syshealth_accessevent_p"
+
+# Cada partição começa os ids em ``ordinal do primeiro dia << 32``: ids únicos
+# entre tabelas, crescentes no tempo e abaixo de 2**53 (seguros no JavaScript).
+_ID_SHIFT = 32
+
+_CREATE_TABLE = re.compile(r'^CREATE TABLE\s+"?%s"?\s*\(' % BASE_TABLE)
+_CREATE_INDEX = re.compile(r'^CREATE (UNIQUE )?INDEX\s+"?([^"\s]+)"?\s+ON\s+"?%s"?' % BASE_TABLE)
+
+_mode: Optional[str] = None
+_models: Dict[str, Type[AccessEventBase]] = {}
+_known: Set[Tuple[str, str]] = set()
+_views_checked: Set[str] = set()
+_lock = threading.RLock()
+
+
+def partitioning_mode() -> str:
+    mode = getattr(settings, "ACCESS_EVENT_PARTITIONING", "") or ""
+    return mode if mode in (MODE_DAY, MODE_MONTH) else ""
+
+
+def partitioning_active() -> bool:
+    return _mode is not None
+
+
+def activate(mode: Optional[str] = None, using: Optional[str] = None) -> None:
+    """Passa ``AccessEvent`` a ler da view que une a tabela base e as partições."""
+    global _mode
+    mode = mode or partitioning_mode()
+    if mode not in (MODE_DAY, MODE_MONTH):
+        raise ImproperlyConfigured("ACCESS_EVENT_PARTITIONING deve ser 'day' ou 'month'.")
+    if connections[using or telemetry_db()].vendor != "sqlite":
+        raise ImproperlyConfigured("O particionamento de AccessEvent só está disponível no SQLite.")
+    with _lock:
+        _mode = mode
+        _set_table(VIEW_NAME)
+
+
+def deactivate() -> None:
+    global _mode
+    with _lock:
+        _mode = None
+        _set_table(BASE_TABLE)
+
+
+def _set_table(table: str) -> None:
+    AccessEvent._meta.db_table = table
+    # ``Field.cached_col`` guarda o nome da tabela da primeira consulta.
+    for field in AccessEvent._meta.concrete_fields:
+        field.__dict__.pop("cached_col", None)
+    _known.clear()
+    _views_checked.clear()
+
+
+@dataclass(frozen=True)
+class Partition:
+    start: date
+    mode: str
+
+    @property
+    def end(self) -> date:
+        if self.mode == MODE_DAY:
+            return date.fromordinal(self.start.toordinal() + 1)
+        if self.start.month == 12:
+            return date(self.start.year + 1, 1, 1)
+        return date(self.start.year, self.start.month + 1, 1)
+
+    @property
+    def table(self) -> str:
+        return PARTITION_PREFIX + self.start.strftime("%Y%m%d" if self.mode == MODE_DAY else "%Y%m")
+
+    @property
+    def start_at(self) -> datetime:
+        return event_timestamp(self.start)
+
+    @property
+    def end_at(self) -> datetime:
+        return event_timestamp(self.end)
+
+    @property
+    def first_id(self) -> int:
+        return self.start.toordinal() << _ID_SHIFT
+
+    @property
+    def model(self) -> Type[AccessEventBase]:
+        return table_model(self.table)
+
+    def days(self) -> List[date]:
+        return [date.fromordinal(ordinal) for ordinal in range(self.start.toordinal(), self.end.toordinal())]
+
+
+def partition_for(moment, mode: Optional[str] = None) -> Partition:
+    mode = mode or _mode or MODE_DAY
+    day = timezone.localdate(moment) if isinstance(moment, datetime) else moment
+    return Partition(day if mode == MODE_DAY else day.replace(day=1), mode)
+
+
+def _partition_from_table(table: str) -> Optional[Partition]:
+    suffix = table[len(PARTITION_PREFIX):]
+    try:
+        if len(suffix) == 8:
+            return Partition(datetime.strptime(suffix, "%Y%m%d").date(), MODE_DAY)
+        if len(suffix) == 6:
+            return Partition(datetime.strptime(suffix, "%Y%m").date(), MODE_MONTH)
+    except ValueError:
+        pass
+    return None
+
+
+def table_model(table: str) -> Type[AccessEventBase]:
+    """Modelo não gerenciado com os campos de ``AccessEvent`` sobre outra tabela."""
+    model = _models.get(table)
+    if model is None:
+        with _lock:
+            model = _models.get(table)
+            if model is None:
+                meta = type(
+                    "Meta",
+                    (),
+                    {
+                        "db_table": table,
+                        "managed": False,
+                        "app_label": "syshealth",
+                        "default_permissions": (),
+                        "ordering": ("-created_at", "-pk"),
+                    },
+                )
+                name = "AccessEventTable" + "".join(part.title() for part in table[len(BASE_TABLE):].split("_"))
+                model = type(name, (AccessEventBase,), {"__module__": __name__, "Meta": meta})
+                # SET_NULL e PROTECT já valem pela view de AccessEvent, que cobre todas
+                # as tabelas; o coletor de exclusões não deve visitar cada partição.
+                for field in model._meta.concrete_fields:
+                    if field.remote_field is not None:
+                        field.remote_field.on_delete = models.DO_NOTHING
+                _models[table] = model
+    return model
+
+
+def base_event_model() -> Type[models.Model]:
+    """A tabela original (eventos gravados antes do particionamento), para escrita."""
+    return table_model(BASE_TABLE) if partitioning_active() else AccessEvent
+
+
+def _db_key(connection) -> str:
+    return f"{connection.alias}:{connection.settings_dict['NAME']}"
+
+
+def _table_exists(cursor, name: str, kind: str = "table") -> bool:
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = %s AND name = %s", [kind, name])
+    return cursor.fetchone() is not None
+
+
+def existing_partitions(using: Optional[str] = None) -> List[Partition]:
+    with connections[using or telemetry_db()].cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE %s ESCAPE '\\'",
+            [PARTITION_PREFIX.replace("_", "\\_") + "%"],
+        )
+        found = [_partition_from_table(row[0]) for row in cursor.fetchall()]
+    return sorted((partition for partition in found if partition is not None), key=lambda item: item.start)
+
+
+def ensure_partition(partition: Partition, using: Optional[str] = None) -> None:
+    using = using or telemetry_db()
+    connection = connections[using]
+    key = (_db_key(connection), partition.table)
+    if key in _known:
+        return
+    with _lock, transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            if not _table_exists(cursor, partition.table):
+                _create_partition_table(cursor, partition)
+                rebuild_view(using)
+            else:
+                # insert_events grava todos os campos: a partição precisa das colunas atuais.
+                _check_partition(cursor, partition.table)
+        # Se a transação externa for desfeita, a tabela deixa de existir.
+        transaction.on_commit(lambda: _known.add(key), using=using)
+
+
+def _base_statements(cursor) -> List[Tuple[str, str]]:
+    cursor.execute(
+        "SELECT type, sql FROM sqlite_master WHERE tbl_name = %s AND sql IS NOT NULL ORDER BY type DESC",
+        [BASE_TABLE],
+    )
+    return cursor.fetchall()
+
+
+def _copy_table(cursor, statements, table: str) -> None:
+    # Copia o DDL da tabela base já migrada: mesmas colunas, tipos e restrições.
+    for kind, sql in statements:
+        if kind == "table":
+            cursor.execute(_CREATE_TABLE.sub(f'CREATE TABLE IF NOT EXISTS "{table}" (', sql, count=1))
+
+
+def _copy_indexes(cursor, statements, table: str) -> None:
+    for kind, sql in statements:
+        if kind == "index":
+            cursor.execute(
+                _CREATE_INDEX.sub(
+                    lambda match: f'CREATE {match.group(1) or ""}INDEX IF NOT EXISTS "{table}__{match.group(2)}" '
+                    f'ON "{table}"',
+                    sql,
+                    count=1,
+                )
+            )
+
+
+def _create_partition_table(cursor, partition: Partition) -> None:
+    statements = _base_statements(cursor)
+    table = partition.table
+    _copy_table(cursor, statements, table)
+    _copy_indexes(cursor, statements, table)
+    cursor.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s "
+        "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)",
+        [table, partition.first_id, table],
+    )
+
+
+def _table_shape(cursor, table: str) -> Tuple[tuple, tuple]:
+    """Colunas e chaves estrangeiras da tabela, para comparar partições com a base."""
+    cursor.execute(f'PRAGMA table_info("{table}")')
+    columns = tuple(tuple(row[1:]) for row in cursor.fetchall())
+    cursor.execute(f'PRAGMA foreign_key_list("{table}")')
+    foreign_keys = tuple(sorted(tuple(row[2:5]) for row in cursor.fetchall()))
+    return columns, foreign_keys
+
+
+def _check_partition(cursor, table: str) -> None:
+    if _table_shape(cursor, table) != _table_shape(cursor, BASE_TABLE):
+        raise ImproperlyConfigured(
+            f"A partição {table} não tem o mesmo esquema de {BASE_TABLE}; rode 'python manage.py migrate'."
+        )
+
+
+def _rebuild_partition(cursor, statements, table: str) -> None:
+    """Refaz a partição com o DDL atual da base e copia as linhas (como o migrate do SQLite)."""
+    cursor.execute(f'PRAGMA table_info("{table}")')
+    old_columns = {row[1] for row in cursor.fetchall()}
+    cursor.execute(f'PRAGMA table_info("{BASE_TABLE}")')
+    new_columns = [(row[1], row[3], row[4]) for row in cursor.fetchall()]
+    fields = {field.column: field for field in AccessEvent._meta.concrete_fields}
+    names, values, params = [], [], []
+    for column, notnull, default in new_columns:
+        if column in old_columns:
+            names.append(f'"{column}"')
+            values.append(f'"{column}"')
+        elif notnull and default is None:
+            field = fields.get(column)
+            if field is None or not field.has_default():
+                raise ImproperlyConfigured(
+                    f"Não há valor para a coluna {column} nas linhas de {table}; migre ou remova a partição."
+                )
+            names.append(f'"{column}"')
+            values.append("%s")
+            params.append(field.get_db_prep_save(field.get_default(), cursor.db))
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [table])
+    row = cursor.fetchone()
+    temporary = f"{table}__new"
+    cursor.execute(f'DROP TABLE IF EXISTS "{temporary}"')
+    _copy_table(cursor, statements, temporary)
+    cursor.execute(
+        f'INSERT INTO "{temporary}" ({", ".join(names)}) SELECT {", ".join(values)} FROM "{table}"', params
+    )
+    cursor.execute(f'DROP TABLE "{table}"')
+    cursor.execute(f'ALTER TABLE "{temporary}" RENAME TO "{table}"')
+    _copy_indexes(cursor, statements, table)
+    if row is not None:
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = %s", [table])
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", [table, row[0]])
+
+
+def sync_partitions(using: Optional[str] = None) -> List[str]:
+    """Leva às partições as mudanças de esquema que as migrações fizeram na tabela base.
+
+    Partições refeitas tiram a view do ar; quem chama recria com ``rebuild_view``.
+    """
+    using = using or telemetry_db()
+    changed = []
+    with _lock, transaction.atomic(using=using), connections[using].cursor() as cursor:
+        if not _table_exists(cursor, BASE_TABLE):
+            return changed
+        statements = _base_statements(cursor)
+        base_shape = _table_shape(cursor, BASE_TABLE)
+        for partition in existing_partitions(using):
+            if _table_shape(cursor, partition.table) != base_shape:
+                if not changed:
+                    drop_view(using)
+                _rebuild_partition(cursor, statements, partition.table)
+                changed.append(partition.table)
+            # Índices novos da base; os existentes ficam (IF NOT EXISTS).
+            _copy_indexes(cursor, statements, partition.table)
+    return changed
+
+
+def drop_view(using: Optional[str] = None) -> None:
+    # Os gatilhos INSTEAD OF saem junto com a view.
+    with connections[using or telemetry_db()].cursor() as cursor:
+        cursor.execute(f'DROP VIEW IF EXISTS "{VIEW_NAME}"')
+    _views_checked.clear()
+
+
+def rebuild_view(using: Optional[str] = None, exclude: Sequence[str] = ()) -> None:
+    """Recria a view ``UNION ALL`` da tabela base com as partições existentes."""
+    using = using or telemetry_db()
+    columns = [field.column for field in AccessEvent._meta.concrete_fields]
+    tables = [BASE_TABLE] + [p.table for p in existing_partitions(using) if p.table not in exclude]
+    selects, updates, deletes = [], [], []
+    with connections[using].cursor() as cursor:
+        if not _table_exists(cursor, BASE_TABLE):
+            return
+        for table in tables:
+            cursor.execute(f'PRAGMA table_info("{table}")')
+            existing = {row[1] for row in cursor.fetchall()}
+            present = [column for column in columns if column in existing]
+            # Partições criadas antes de uma migração não têm as colunas novas.
+            values = ", ".join(f'"{column}"' if column in present else f'NULL AS "{column}"' for column in columns)
+            selects.append(f'SELECT {values} FROM "{table}"')
+            assignments = ", ".join(f'"{column}" = NEW."{column}"' for column in present if column != "id")
+            updates.append(f'UPDATE "{table}" SET {assignments} WHERE "id" = OLD."id";')
+            deletes.append(f'DELETE FROM "{table}" WHERE "id" = OLD."id";')
+        cursor.execute(f'DROP VIEW IF EXISTS "{VIEW_NAME}"')
+        cursor.execute(f'CREATE VIEW "{VIEW_NAME}" AS ' + " UNION ALL ".join(selects))
+        # UPDATE e DELETE pelo modelo (admin, SET_NULL ao remover usuários) chegam
+        # à tabela certa pelos gatilhos; inserções passam por insert_events().
+        cursor.execute(
+            f'CREATE TRIGGER "{VIEW_NAME}_update" INSTEAD OF UPDATE ON "{VIEW_NAME}" '
+            f'BEGIN {" ".join(updates)} END'
+        )
+        cursor.execute(
+            f'CREATE TRIGGER "{VIEW_NAME}_delete" INSTEAD OF DELETE ON "{VIEW_NAME}" '
+            f'BEGIN {" ".join(deletes)} END'
+        )
+
+
+def ensure_view(connection) -> None:
+    key = _db_key(connection)
+    if not partitioning_active() or key in _views_checked:
+        return
+    with connection.cursor() as cursor:
+        missing = _table_exists(cursor, BASE_TABLE) and not _table_exists(cursor, VIEW_NAME, kind="view")
+    if missing:
+        rebuild_view(connection.alias)
+    _views_checked.add(key)
+
+
+def drop_partition(partition: Partition, using: Optional[str] = None) -> None:
+    """``DROP TABLE`` da partição: a retenção não apaga linha por linha."""
+    using = using or telemetry_db()
+    with _lock, transaction.atomic(using=using):
+        rebuild_view(using, exclude=[partition.table])
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS "{partition.table}"')
+            cursor.execute("DELETE FROM sqlite_sequence WHERE name = %s", [partition.table])
+        _known.discard((_db_key(connections[using]), partition.table))
+
+
+def insert_events(events: List[AccessEvent], *args, **kwargs) -> List[AccessEvent]:
+    """Grava cada evento na partição do seu dia (ou mês) com ``bulk_create``."""
+    prepare_events(events)
+    groups: Dict[Partition, List[AccessEvent]] = {}
+    for event in events:
+        groups.setdefault(partition_for(event.created_at), []).append(event)
+    for partition, group in groups.items():
+        ensure_partition(partition)
+        model = partition.model
+        fields = [field.attname for field in model._meta.concrete_fields]
+        rows = [model(**{name: getattr(event, name) for name in fields}) for event in group]
+        model.objects.bulk_create(rows, *args, **kwargs)
+        for event, row in zip(group, rows):
+            event.pk = row.pk
+            event._state.adding = False
+            event._state.db = row._state.db
+    return events
+
+
+def window_queryset(start: datetime) -> QuerySet:
+    """Eventos a partir de ``start``; dentro da partição atual, só ela é consultada."""
+    if partitioning_active():
+        current = partition_for(timezone.now())
+        if start >= current.start_at:
+            ensure_partition(current)
+            return current.model.objects.all()
+    return AccessEvent.objects.all()
+
+
+def _on_connection_created(sender, connection, **kwargs) -> None:
+    if connection.alias == telemetry_db() and connection.vendor == "sqlite":
+        ensure_view(connection)
+
+
+def _on_pre_migrate(sender, using=None, **kwargs) -> None:
+    # O SQLite recusa refazer syshealth_accessevent enquanto a view depende dela.
+    if using == telemetry_db() and connections[using].vendor == "sqlite":
+        drop_view(using)
+
+
+def _on_post_migrate(sender, using=None, **kwargs) -> None:
+    if using != telemetry_db() or connections[using].vendor != "sqlite":
+        return
+    sync_partitions(using)
+    _known.clear()
+    if partitioning_active():
+        rebuild_view(using)
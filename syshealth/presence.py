@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .dimensions import value_key
+from .result_cache import cache_is_shared
+
+KIND_USER = "user"
+KIND_IP = "ip"
+DEFAULT_LOCAL_SIZE = 10_000
+SOURCE_PRESENCE = "presence"
+SOURCE_EVENTS = "events"
+
+# O marcador "já contado neste minuto" só precisa sobreviver ao próprio minuto.
+_MARKER_TIMEOUT = 120
+
+
+def online_source() -> str:
+    source = getattr(settings, "ACCESS_ONLINE_SOURCE", "")
+    if source in (SOURCE_PRESENCE, SOURCE_EVENTS):
+        return source
+    # Sem escolha explícita: presença só com cache compartilhado. No LocMemCache
+    # cada worker contaria apenas os próprios visitantes.
+    if cache_is_shared(getattr(settings, "ACCESS_PRESENCE_CACHE_ALIAS", "default")):
+        return SOURCE_PRESENCE
+    return SOURCE_EVENTS
+
+
+class PresenceTracker:
+    """Quem está online, guardado no cache do Django em vez de lido dos eventos.
+
+    Cada usuário (ou IP anônimo) fica contado em um único contador: o do minuto
+    em que foi visto por último. Ao reaparecer em outro minuto, sai do contador
+    antigo e entra no novo. O número de online é a soma dos contadores dos
+    últimos ``window`` minutos, um ``get_many`` de tamanho fixo. Um LRU local
+    evita ir ao cache mais de uma vez por minuto para a mesma pessoa.
+    """
+
+    def __init__(
+        self,
+        alias: str = "default",
+        prefix: str = "syshealth:presence",
+        local_size: int = DEFAULT_LOCAL_SIZE,
+    ):
+        self.alias = alias
+        self.prefix = prefix
+        self.local_size = max(local_size, 1)
+        self._seen: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def touch(self, kind: str, identity: str, window_minutes: int, now: Optional[float] = None) -> None:
+        minute = int((now if now is not None else time.time()) // 60)
+        local_key = (kind, identity)
+        with self._lock:
+            if self._seen.get(local_key) == minute:
+                self._seen.move_to_end(local_key)
+                return
+            self._seen[local_key] = minute
+            self._seen.move_to_end(local_key)
+            while len(self._seen) > self.local_size:
+                self._seen.popitem(last=False)
+
+        digest = value_key(identity)
+        # Só o primeiro worker a ver a pessoa neste minuto move o contador.
+        if not self.cache.add(f"{self.prefix}:seen:{kind}:{minute}:{digest}", 1, _MARKER_TIMEOUT):
+            return
+        timeout = (window_minutes + 2) * 60
+        last_key = f"{self.prefix}:last:{kind}:{digest}"
+        previous = self.cache.get(last_key)
+        self.cache.set(last_key, minute, timeout)
+        self._incr(self._counter_key(kind, minute), timeout)
+        if previous is not None and previous != minute:
+            self._decr(self._counter_key(kind, previous))
+
+    def count(self, kind: str, window_minutes: int, now: Optional[float] = None) -> int:
+        minute = int((now if now is not None else time.time()) // 60)
+        keys = [self._counter_key(kind, slot) for slot in range(minute - max(window_minutes, 1) + 1, minute + 1)]
+        return max(sum(self.cache.get_many(keys).values()), 0)
+
+    def clear_local(self) -> None:
+        with self._lock:
+            self._seen.clear()
+
+    def _counter_key(self, kind: str, minute: int) -> str:
+        return f"{self.prefix}:count:{kind}:{minute}"
+
+    def _incr(self, key: str, timeout: int) -> None:
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            if not self.cache.add(key, 1, timeout):
+                self.cache.incr(key)
+
+    def _decr(self, key: str) -> None:
+        try:
+            self.cache.decr(key)
+        except ValueError:
+            # O contador antigo já expirou: nada a descontar.
+            pass
+
+
+_tracker: Optional[PresenceTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_presence_tracker() -> PresenceTracker:
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = PresenceTracker(
+                    alias=getattr(settings, "ACCESS_PRESENCE_CACHE_ALIAS", "default"),
+                    local_size=getattr(settings, "ACCESS_PRESENCE_LOCAL_SIZE", DEFAULT_LOCAL_SIZE),
+                )
+    return _tracker
+
+
+def reset_presence_tracker() -> None:
+    global _tracker
+    with _tracker_lock:
+        _tracker = None
+
+
+def touch_presence(user_id: Optional[int], ip_address: str, window_minutes: int) -> None:
+    """Marca o usuário (ou, se anônimo, o IP) como visto agora."""
+    if online_source() != SOURCE_PRESENCE:
+        return
+    tracker = get_presence_tracker()
+    if user_id is not None:
+        tracker.touch(KIND_USER, str(user_id), window_minutes)
+    elif ip_address:
+        tracker.touch(KIND_IP, ip_address, window_minutes)
+
+
+def online_counts(window_minutes: int) -> Tuple[int, int]:
+    tracker = get_presence_tracker()
+    return tracker.count(KIND_USER, window_minutes), tracker.count(KIND_IP, window_minutes)
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Optional, TypeVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_TTL_SECONDS = 5.0
+DEFAULT_STALE_SECONDS = 30.0
+DEFAULT_LOCK_SECONDS = 10.0
+WAIT_STEP_SECONDS = 0.05
+
+
+def cache_is_shared(alias: str) -> bool:
+    """Se o cache do alias é visto por todos os workers (não é memória do processo)."""
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+@dataclass
+class ResultCacheStats:
+    hits: int = 0
+    stale: int = 0
+    misses: int = 0
+    waits: int = 0
+    recomputes: int = 0
+    compute_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        data: Dict[str, float] = asdict(self)
+        served = self.hits + self.stale + self.misses
+        data["hit_rate"] = round((self.hits + self.stale) / served * 100, 1) if served else 0.0
+        data["avg_compute_ms"] = (
+            round(self.compute_seconds / self.recomputes * 1000, 3) if self.recomputes else 0.0
+        )
+        return data
+
+
+class ResultCache:
+    """Resultados calculados compartilhados entre workers pelo cache do Django.
+
+    Cada entrada guarda o valor e o instante em que expira. Dentro do ``ttl`` é
+    servida direto; depois, por mais ``stale`` segundos, continua sendo servida
+    enquanto uma única requisição (a que conseguir o lock via ``cache.add``)
+    recalcula. Sem entrada nenhuma, quem não pega o lock espera o resultado de
+    quem pegou, em vez de repetir a consulta.
+    """
+
+    def __init__(
+        self,
+        alias: str = "default",
+        ttl: float = DEFAULT_TTL_SECONDS,
+        stale: float = DEFAULT_STALE_SECONDS,
+        lock_timeout: float = DEFAULT_LOCK_SECONDS,
+        prefix: str = "syshealth:result",
+    ):
+        self.alias = alias
+        self.ttl = ttl
+        self.stale = max(stale, 0.0)
+        self.lock_timeout = lock_timeout
+        self.prefix = prefix
+        self.shared = cache_is_shared(alias)
+        self.stats = ResultCacheStats()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._stats_lock:
+            data = self.stats.as_dict()
+        data["ttl"] = self.ttl
+        data["stale_ttl"] = self.stale
+        data["shared"] = self.shared
+        return data
+
+    def get_or_compute(self, key: str, compute: Callable[[], T]) -> T:
+        if self.ttl <= 0:
+            return self._compute(compute)
+        cache_key = f"{self.prefix}:{key}"
+        entry = self.cache.get(cache_key)
+        now = time.time()
+        if entry is not None and entry["expires_at"] > now:
+            self._count("hits")
+            return entry["value"]
+        if entry is not None:
+            # Expirado mas dentro da janela de stale: um recalcula, os demais seguem com o antigo.
+            token = self._acquire(cache_key)
+            if token is not None:
+                self._count("misses")
+                return self._refresh(cache_key, compute, token)
+            self._count("stale")
+            return entry["value"]
+
+        token = self._acquire(cache_key)
+        if token is not None:
+            self._count("misses")
+            return self._refresh(cache_key, compute, token)
+        value = self._wait(cache_key)
+        if value is not None:
+            self._count("waits")
+            self._count("hits")
+            return value["value"]
+        # Quem tinha o lock demorou demais (ou falhou): calcula aqui mesmo.
+        self._count("misses")
+        return self._refresh(cache_key, compute)
+
+    def _refresh(self, cache_key: str, compute: Callable[[], T], token: Optional[str] = None) -> T:
+        try:
+            value = self._compute(compute)
+            entry = {"value": value, "expires_at": time.time() + self.ttl}
+            self.cache.set(cache_key, entry, self.ttl + self.stale)
+            return value
+        finally:
+            if token is not None:
+                self._release(cache_key, token)
+
+    def _compute(self, compute: Callable[[], T]) -> T:
+        started = time.perf_counter()
+        value = compute()
+        with self._stats_lock:
+            self.stats.recomputes += 1
+            self.stats.compute_seconds += time.perf_counter() - started
+        return value
+
+    def _acquire(self, cache_key: str) -> Optional[str]:
+        token = uuid.uuid4().hex
+        if self.cache.add(f"{cache_key}:lock", token, self.lock_timeout):
+            return token
+        return None
+
+    def _release(self, cache_key: str, token: str) -> None:
+        # Um recálculo mais longo que lock_timeout perdeu o lock para outro worker:
+        # só apaga se o lock ainda for o seu. (A API de cache não tem um
+        # "compare-and-delete"; sobra a janela entre o get e o delete.)
+        lock_key = f"{cache_key}:lock"
+        if self.cache.get(lock_key) == token:
+            self.cache.delete(lock_key)
+
+    def _wait(self, cache_key: str) -> Optional[dict]:
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_STEP_SECONDS)
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                return entry
+            if self.cache.get(f"{cache_key}:lock") is None:
+                return None
+        return None
+
+    def _count(self, field: str) -> None:
+        with self._stats_lock:
+            setattr(self.stats, field, getattr(self.stats, field) + 1)
+
+
+_counter_cache: Optional[ResultCache] = None
+_counter_cache_lock = threading.Lock()
+
+
+def get_counter_cache() -> ResultCache:
+    """Cache dos contadores do dashboard de acessos, configurado pelos settings."""
+    global _counter_cache
+    if _counter_cache is None:
+        with _counter_cache_lock:
+            if _counter_cache is None:
+                _counter_cache = ResultCache(
+                    alias=getattr(settings, "ACCESS_COUNTERS_CACHE_ALIAS", "default"),
+                    ttl=getattr(settings, "ACCESS_COUNTERS_CACHE_TTL", DEFAULT_TTL_SECONDS),
+                    stale=getattr(settings, "ACCESS_COUNTERS_CACHE_STALE", DEFAULT_STALE_SECONDS),
+                    prefix="syshealth:counters",
+                )
+                if not _counter_cache.shared:
+                    logger.warning(
+                        "ACCESS_COUNTERS_CACHE_ALIAS aponta para um cache local ao processo: "
+                        "cada worker recalcula os contadores por conta própria (configure CACHE_REDIS_URL)."
+                    )
+    return _counter_cache
+
+
+def reset_counter_cache() -> None:
+    global _counter_cache
+    with _counter_cache_lock:
+        _counter_cache = None
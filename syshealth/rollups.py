@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, time as time_cls, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import AccessEvent, AccessRollup
+from .routers import telemetry_db
+
+UNKNOWN_ROUTE = "(sem rota)"
+DEFAULT_MINUTE_RETENTION_DAYS = 2
+DEFAULT_LAG_SECONDS = 60
+
+GRANULARITIES = (
+    AccessRollup.GRANULARITY_MINUTE,
+    AccessRollup.GRANULARITY_HOUR,
+    AccessRollup.GRANULARITY_DAY,
+)
+BUCKET_SIZES = {
+    AccessRollup.GRANULARITY_MINUTE: timedelta(minutes=1),
+    AccessRollup.GRANULARITY_HOUR: timedelta(hours=1),
+    AccessRollup.GRANULARITY_DAY: timedelta(days=1),
+}
+
+
+def truncate(moment: datetime, granularity: str) -> datetime:
+    """Início do bucket que contém ``moment``, no fuso local."""
+    local = timezone.localtime(moment) if timezone.is_aware(moment) else moment
+    if granularity == AccessRollup.GRANULARITY_MINUTE:
+        naive = local.replace(second=0, microsecond=0, tzinfo=None)
+    elif granularity == AccessRollup.GRANULARITY_HOUR:
+        naive = local.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+    else:
+        naive = local.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    return timezone.make_aware(naive)
+
+
+def minute_retention_days() -> int:
+    return max(int(getattr(settings, "ACCESS_ROLLUP_MINUTE_RETENTION_DAYS", DEFAULT_MINUTE_RETENTION_DAYS)), 1)
+
+
+def rolled_until(granularity: str) -> Optional[datetime]:
+    """Fim do último bucket consolidado (toda execução grava a linha total, mesmo vazia)."""
+    last = (
+        AccessRollup.objects.filter(granularity=granularity, route_name="")
+        .aggregate(last=Max("bucket_start"))["last"]
+    )
+    if last is None:
+        return None
+    return last + BUCKET_SIZES[granularity]
+
+
+@dataclass
+class _Bucket:
+    hits: float = 0.0
+    events: int = 0
+    admin_hits: float = 0.0
+    site_hits: float = 0.0
+    users: Set[int] = field(default_factory=set)
+    ips: Set[str] = field(default_factory=set)
+    anonymous_ips: Set[str] = field(default_factory=set)
+
+    def add(self, weight: float, is_admin: bool, user_id: Optional[int], ip_address: str) -> None:
+        self.hits += weight
+        self.events += 1
+        if is_admin:
+            self.admin_hits += weight
+        else:
+            self.site_hits += weight
+        if user_id is not None:
+            self.users.add(user_id)
+        if ip_address:
+            self.ips.add(ip_address)
+            if user_id is None:
+                self.anonymous_ips.add(ip_address)
+
+
+BucketKey = Tuple[str, datetime, str]
+
+
+def _scan(ranges: Dict[str, Tuple[datetime, datetime]]) -> Dict[BucketKey, _Bucket]:
+    buckets: Dict[BucketKey, _Bucket] = {}
+    rows = (
+        AccessEvent.objects.filter(
+            created_at__gte=min(start for start, _ in ranges.values()),
+            created_at__lt=max(end for _, end in ranges.values()),
+        )
+        .order_by()
+        .values_list("created_at", "route_name", "is_admin", "user_id", "ip_address", "sample_weight")
+    )
+    for moment, route_name, is_admin, user_id, ip_address, weight in rows.iterator(chunk_size=2000):
+        route = route_name or UNKNOWN_ROUTE
+        for granularity, (start, end) in ranges.items():
+            if not start <= moment < end:
+                continue
+            bucket_start = truncate(moment, granularity)
+            for key in ((granularity, bucket_start, ""), (granularity, bucket_start, route)):
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = _Bucket()
+                bucket.add(weight, is_admin, user_id, ip_address)
+    return buckets
+
+
+def _bucket_starts(start: datetime, end: datetime, granularity: str) -> Iterable[datetime]:
+    # Avança no horário local para que dias e horas sigam o relógio de parede.
+    step = BUCKET_SIZES[granularity]
+    current = timezone.localtime(start).replace(tzinfo=None)
+    stop = timezone.localtime(end).replace(tzinfo=None)
+    while current < stop:
+        yield timezone.make_aware(current)
+        current += step
+
+
+def rollup_range(start: datetime, end: datetime, granularities: Iterable[str] = GRANULARITIES) -> int:
+    """Recalcula os buckets completos entre ``start`` e ``end`` a partir dos eventos.
+
+    É idempotente: os buckets do intervalo são apagados e regravados dia a dia,
+    então pode ser repetido depois de um replay do journal.
+    """
+    written = 0
+    ranges_by_granularity = {
+        granularity: (truncate(start, granularity), truncate(end, granularity))
+        for granularity in granularities
+    }
+    scan_start = min(bounds[0] for bounds in ranges_by_granularity.values())
+    scan_end = max(bounds[1] for bounds in ranges_by_granularity.values())
+
+    day = timezone.localtime(scan_start).date()
+    last_day = timezone.localtime(scan_end).date()
+    while day <= last_day:
+        day_start = timezone.make_aware(datetime.combine(day, time_cls(0, 0)))
+        day_end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time_cls(0, 0)))
+        ranges = {}
+        for granularity, (start_at, end_at) in ranges_by_granularity.items():
+            lower, upper = max(start_at, day_start), min(end_at, day_end)
+            if lower < upper:
+                ranges[granularity] = (lower, upper)
+        if ranges:
+            written += _replace_buckets(ranges, _scan(ranges))
+        day += timedelta(days=1)
+    return written
+
+
+def _replace_buckets(ranges: Dict[str, Tuple[datetime, datetime]], buckets: Dict[BucketKey, _Bucket]) -> int:
+    rows: List[AccessRollup] = []
+    for granularity, (start, end) in ranges.items():
+        # A linha total existe mesmo sem acessos: marca até onde já foi consolidado.
+        for bucket_start in _bucket_starts(start, end, granularity):
+            buckets.setdefault((granularity, bucket_start, ""), _Bucket())
+
+    for (granularity, bucket_start, route), bucket in buckets.items():
+        rows.append(
+            AccessRollup(
+                granularity=granularity,
+                bucket_start=bucket_start,
+                route_name=route,
+                hits=bucket.hits,
+                events=bucket.events,
+                admin_hits=bucket.admin_hits,
+                site_hits=bucket.site_hits,
+                unique_users=len(bucket.users),
+                unique_ips=len(bucket.ips),
+            )
+        )
+
+    with transaction.atomic(using=telemetry_db()):
+        for granularity, (start, end) in ranges.items():
+            AccessRollup.objects.filter(
+                granularity=granularity, bucket_start__gte=start, bucket_start__lt=end
+            ).delete()
+        AccessRollup.objects.bulk_create(rows, batch_size=1000)
+
+    # Os sketches de distintos também recebem os eventos (ex.: históricos ou
+    # vindos do journal); combinar de novo o que já estava lá não muda nada.
+    from .sketches import merge_bucket_sets
+
+    for (granularity, bucket_start, route), bucket in buckets.items():
+        if not route and (bucket.users or bucket.anonymous_ips):
+            merge_bucket_sets(granularity, bucket_start, bucket.users, bucket.anonymous_ips)
+    return len(rows)
+
+
+def prune_minute_rollups(now: Optional[datetime] = None) -> int:
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=minute_retention_days())
+    deleted, _ = AccessRollup.objects.filter(
+        granularity=AccessRollup.GRANULARITY_MINUTE, bucket_start__lt=cutoff
+    ).delete()
+    return deleted
+
+
+def _raw_hits(start: datetime, end: datetime) -> float:
+    if start >= end:
+        return 0.0
+    qs = AccessEvent.objects.filter(created_at__gte=start, created_at__lt=end)
+    return qs.aggregate(total=Sum("sample_weight"))["total"] or 0.0
+
+
+def estimate_hits(start: datetime, end: datetime) -> int:
+    """Acessos estimados entre ``start`` e ``end``.
+
+    Os minutos completos já consolidados vêm de ``AccessRollup``; só as bordas
+    (o minuto parcial do início e o trecho ainda não consolidado) leem eventos.
+    """
+    covered_until = rolled_until(AccessRollup.GRANULARITY_MINUTE)
+    first_full = truncate(start, AccessRollup.GRANULARITY_MINUTE)
+    if first_full < start:
+        first_full += BUCKET_SIZES[AccessRollup.GRANULARITY_MINUTE]
+    if covered_until is None or covered_until <= first_full:
+        return int(round(_raw_hits(start, end)))
+
+    covered_until = min(covered_until, end)
+    rolled = (
+        AccessRollup.objects.filter(
+            granularity=AccessRollup.GRANULARITY_MINUTE,
+            route_name="",
+            bucket_start__gte=first_full,
+            bucket_start__lt=covered_until,
+        ).aggregate(total=Sum("hits"))["total"]
+        or 0.0
+    )
+    total = rolled + _raw_hits(start, first_full) + _raw_hits(covered_until, end)
+    return int(round(total))
+
+
+def history(granularity: str, buckets: int, now: Optional[datetime] = None) -> List[Dict[str, object]]:
+    """Série dos últimos ``buckets`` intervalos completos (linhas totais)."""
+    now = now or timezone.now()
+    end = truncate(now, granularity)
+    start_naive = timezone.localtime(end).replace(tzinfo=None) - BUCKET_SIZES[granularity] * buckets
+    start = timezone.make_aware(start_naive)
+    rows = {
+        row.bucket_start: row
+        for row in AccessRollup.objects.filter(
+            granularity=granularity, route_name="", bucket_start__gte=start, bucket_start__lt=end
+        )
+    }
+    series = []
+    for bucket_start in _bucket_starts(start, end, granularity):
+        row = rows.get(bucket_start)
+        series.append(
+            {
+                "bucket_start": timezone.localtime(bucket_start).isoformat(),
+                "rolled_up": row is not None,
+                "hits": int(round(row.hits)) if row else 0,
+                "admin_hits": int(round(row.admin_hits)) if row else 0,
+                "site_hits": int(round(row.site_hits)) if row else 0,
+                "unique_users": row.unique_users if row else 0,
+                "unique_ips": row.unique_ips if row else 0,
+            }
+        )
+    return series
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+TELEMETRY_DB_ALIAS = "telemetry"
+
+# Tabelas do monitoramento que vão para o banco de telemetria. AccessSeenUser
+# fica no default: as sugestões do filtro de usuário fazem join com auth_user.
+TELEMETRY_MODELS = frozenset(
+    {
+        "accessevent",
+        "accesspath",
+        "accessreferrer",
+        "accessuseragent",
+        "accessrollup",
+        "accesssketch",
+        "accessjournalsegment",
+        "accesssettings",
+    }
+)
+
+
+def telemetry_enabled() -> bool:
+    return TELEMETRY_DB_ALIAS in settings.DATABASES
+
+
+def telemetry_db() -> str:
+    """Alias dos eventos de acesso: ``telemetry`` quando configurado, senão ``default``."""
+    return TELEMETRY_DB_ALIAS if telemetry_enabled() else DEFAULT_DB_ALIAS
+
+
+def is_telemetry_model(model) -> bool:
+    opts = model._meta
+    if opts.app_label != "syshealth":
+        return False
+    # Inclui os modelos das partições (syshealth.partitions.table_model).
+    return opts.model_name in TELEMETRY_MODELS or opts.model_name.startswith("accesseventtable")
+
+
+class TelemetryRouter:
+    """Manda a telemetria de acessos para o alias ``telemetry``, se ele existir.
+
+    Sem o alias em ``DATABASES`` o roteador não opina e tudo fica no ``default``.
+    """
+
+    def _db_for(self, model, **hints):
+        if not telemetry_enabled():
+            return None
+        if is_telemetry_model(model):
+            return TELEMETRY_DB_ALIAS
+        instance = hints.get("instance")
+        if instance is not None and is_telemetry_model(type(instance)):
+            # Ex.: ``event.user``; sem isto o Django buscaria o usuário no banco do evento.
+            return DEFAULT_DB_ALIAS
+        return None
+
+    db_for_read = _db_for
+    db_for_write = _db_for
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_telemetry_model(type(obj1)) or is_telemetry_model(type(obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not telemetry_enabled():
+            return None
+        if app_label == "syshealth" and model_name is None:
+            # RunPython das migrações do syshealth: cada função checa os modelos que usa.
+            return None
+        if app_label == "syshealth" and model_name in TELEMETRY_MODELS:
+            return db == TELEMETRY_DB_ALIAS
+        return db != TELEMETRY_DB_ALIAS
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+MAX_TRACKED_KEYS = 5000
+STALE_KEY_SECONDS = 10.0
+
+
+def session_fraction(identity: str) -> float:
+    """Posição estável de uma sessão em [0, 1).
+
+    Não usa ``hash()``, que muda entre processos: todos os workers precisam
+    tomar a mesma decisão para a mesma sessão.
+    """
+    digest = hashlib.blake2b(identity.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64
+
+
+class AdaptiveSampler:
+    """Estima a taxa de chegada por rota e limita cada uma a ``max_rate`` eventos/s.
+
+    A taxa usa janela deslizante de um segundo (contagem da janela atual mais a
+    fração restante da anterior). Rotas abaixo do limite têm probabilidade 1;
+    rotas quentes recebem ``max_rate / taxa``.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        # chave -> [início da janela, contagem atual, contagem anterior]
+        self._windows: Dict[str, List[float]] = {}
+
+    def probability(self, key: str, max_rate: float) -> float:
+        now = self._clock()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                if len(self._windows) >= MAX_TRACKED_KEYS:
+                    self._prune(now)
+                window = self._windows[key] = [now, 0.0, 0.0]
+
+            elapsed = now - window[0]
+            if elapsed >= 1.0:
+                window[2] = window[1] if elapsed < 2.0 else 0.0
+                window[1] = 0.0
+                window[0] = now - (elapsed % 1.0) if elapsed < 2.0 else now
+                elapsed = now - window[0]
+
+            window[1] += 1
+            rate = window[1] + window[2] * (1.0 - elapsed)
+
+        if max_rate <= 0 or rate <= max_rate:
+            return 1.0
+        return max_rate / rate
+
+    def tracked_keys(self) -> int:
+        return len(self._windows)
+
+    def _prune(self, now: float) -> None:
+        stale = [key for key, window in self._windows.items() if now - window[0] > STALE_KEY_SECONDS]
+        for key in stale:
+            del self._windows[key]
+        if len(self._windows) >= MAX_TRACKED_KEYS:
+            self._windows.clear()
+
+
+def resolve_route_name(request) -> str:
+    """Nome da view resolvida ou, sem nome, o padrão da rota (sem os valores)."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return ""
+    view_name: Optional[str] = getattr(match, "view_name", None)
+    return view_name or getattr(match, "route", "") or ""
+
+
+def route_key(route_name: str, path: str) -> str:
+    if route_name:
+        return route_name
+    segment = path.strip("/").split("/", 1)[0]
+    return f"/{segment}/" if segment else "/"
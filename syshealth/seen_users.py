@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, router, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_SECONDS = 300
+DEFAULT_LOCAL_SIZE = 10_000
+DEFAULT_SUGGESTIONS = 20
+
+
+class SeenUsersIndex:
+    """Mantém :class:`~syshealth.models.AccessSeenUser` a partir dos lotes gravados.
+
+    Cada usuário entra na tabela uma vez (``bulk_create`` ignorando conflitos) e
+    o ``last_seen_at`` só é regravado depois de ``refresh_seconds``. Um LRU em
+    processo lembra quem já foi gravado recentemente, então o caso comum (o
+    mesmo usuário navegando) não toca no banco.
+    """
+
+    def __init__(self, refresh_seconds: float = DEFAULT_REFRESH_SECONDS, local_size: int = DEFAULT_LOCAL_SIZE):
+        self.refresh_seconds = max(refresh_seconds, 0)
+        self.local_size = max(local_size, 1)
+        self._recorded: "OrderedDict[int, datetime]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._error_count = 0
+
+    def record(self, events: Iterable) -> None:
+        latest: Dict[int, datetime] = {}
+        for event in events:
+            if event.user_id is None:
+                continue
+            moment = event.created_at or timezone.now()
+            if event.user_id not in latest or moment > latest[event.user_id]:
+                latest[event.user_id] = moment
+        stale = self._stale(latest)
+        if not stale:
+            return
+        from .models import AccessSeenUser
+
+        using = router.db_for_write(AccessSeenUser)
+        try:
+            # Savepoint próprio: dentro de um ``atomic`` no mesmo banco (replay do
+            # journal), só ele é desfeito e a transação dos eventos segue utilizável.
+            with transaction.atomic(using=using):
+                self._write(stale, using)
+        except DatabaseError:
+            # Os eventos já foram gravados (talvez em outro banco): uma falha aqui não
+            # pode fazer o writer tratar o lote como perdido e regravá-lo pelo journal.
+            self._error_count += 1
+            if self._error_count <= 3:
+                logger.exception("Erro ao atualizar usuários vistos de %s evento(s)", len(latest))
+            return
+        # Só lembra após o commit: se a transação for desfeita, a linha não existe.
+        transaction.on_commit(lambda: self._remember(stale), using=using)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._recorded.clear()
+
+    def _stale(self, latest: Dict[int, datetime]) -> Dict[int, datetime]:
+        with self._lock:
+            stale = {}
+            for user_id, moment in latest.items():
+                recorded = self._recorded.get(user_id)
+                if recorded is not None and (moment - recorded).total_seconds() < self.refresh_seconds:
+                    self._recorded.move_to_end(user_id)
+                    continue
+                stale[user_id] = moment
+            return stale
+
+    def _write(self, stale: Dict[int, datetime], using: str) -> None:
+        from .models import AccessSeenUser
+
+        AccessSeenUser.objects.using(using).bulk_create(
+            [
+                AccessSeenUser(user_id=user_id, first_seen_at=moment, last_seen_at=moment)
+                for user_id, moment in stale.items()
+            ],
+            ignore_conflicts=True,
+        )
+        # Um UPDATE por lote: todos recebem o momento mais recente do lote, e
+        # só avançam (replay de journal antigo não faz o último acesso voltar).
+        newest = max(stale.values())
+        AccessSeenUser.objects.using(using).filter(user_id__in=list(stale), last_seen_at__lt=newest).update(
+            last_seen_at=newest
+        )
+
+    def _remember(self, stale: Dict[int, datetime]) -> None:
+        with self._lock:
+            for user_id, moment in stale.items():
+                self._recorded[user_id] = moment
+                self._recorded.move_to_end(user_id)
+            while len(self._recorded) > self.local_size:
+                self._recorded.popitem(last=False)
+
+
+_index: Optional[SeenUsersIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_seen_users_index() -> SeenUsersIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SeenUsersIndex(
+                    refresh_seconds=getattr(settings, "ACCESS_SEEN_USERS_REFRESH_SECONDS", DEFAULT_REFRESH_SECONDS),
+                    local_size=getattr(settings, "ACCESS_SEEN_USERS_LOCAL_SIZE", DEFAULT_LOCAL_SIZE),
+                )
+    return _index
+
+
+def reset_seen_users_index() -> None:
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def suggest_users(term: str, limit: int = DEFAULT_SUGGESTIONS) -> List[dict]:
+    """Usuários vistos cujo login contém ``term``, dos acessos mais recentes."""
+    from .models import AccessSeenUser
+
+    username_field = get_user_model().USERNAME_FIELD
+    rows = AccessSeenUser.objects.select_related("user").order_by("-last_seen_at")
+    term = (term or "").strip()
+    if term:
+        rows = rows.filter(**{f"user__{username_field}__icontains": term})
+    return [
+        {
+            "id": row.user_id,
+            "username": row.user.get_username(),
+            "last_seen_at": timezone.localtime(row.last_seen_at).isoformat(),
+        }
+        for row in rows[: max(limit, 1)]
+    ]
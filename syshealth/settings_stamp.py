@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "syshealth:access_settings:stamp"
+
+
+def _stamp_path() -> Optional[Path]:
+    path = getattr(settings, "ACCESS_SETTINGS_STAMP_PATH", "")
+    return Path(path) if path else None
+
+
+def read_settings_stamp() -> Optional[str]:
+    """Versão publicada da configuração de acessos, compartilhada entre workers.
+
+    Usa um arquivo pequeno (``ACCESS_SETTINGS_STAMP_PATH``) ou, sem ele, o cache
+    padrão do Django. ``None`` quando nada foi publicado ainda.
+    """
+    path = _stamp_path()
+    if path is None:
+        return caches["default"].get(CACHE_KEY)
+    try:
+        return path.read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+    except OSError:
+        logger.warning("Não foi possível ler %s", path)
+        return None
+
+
+def publish_settings_stamp(stamp: str) -> None:
+    path = _stamp_path()
+    if path is None:
+        caches["default"].set(CACHE_KEY, stamp, None)
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Escrita atômica: os outros workers nunca leem um arquivo pela metade.
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(stamp)
+        os.replace(tmp_name, path)
+    except OSError:
+        logger.exception("Não foi possível publicar a versão da configuração em %s", path)
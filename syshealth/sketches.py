@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .hll import DEFAULT_PRECISION, HyperLogLog
+from .models import AccessEvent, AccessRollup, AccessSketch
+from .rollups import BUCKET_SIZES, GRANULARITIES, minute_retention_days, truncate
+from .routers import telemetry_db
+
+logger = logging.getLogger(__name__)
+
+MODE_HLL = "hll"
+MODE_EXACT = "exact"
+DEFAULT_FLUSH_SECONDS = 5.0
+# Com o banco fora do ar, um traceback por minuto basta.
+ERROR_LOG_INTERVAL = 60.0
+
+SketchKey = Tuple[str, datetime, str]
+
+
+def unique_count_mode() -> str:
+    mode = getattr(settings, "ACCESS_UNIQUE_COUNT_MODE", MODE_HLL)
+    return mode if mode in (MODE_HLL, MODE_EXACT) else MODE_HLL
+
+
+class SketchAccumulator:
+    """Sketches por minuto, hora e dia montados no processo e combinados no banco.
+
+    Cada acesso atualiza os três sketches do seu instante em memória; com
+    ``background``, uma thread do processo os combina a cada ``flush_seconds``
+    com as linhas de ``AccessSketch`` (máximo por registrador, sob
+    ``select_for_update``), fora das requisições e qualquer que seja o writer
+    dos eventos. Como a combinação é idempotente, vários workers podem gravar no
+    mesmo intervalo e um flush repetido não altera nada.
+    """
+
+    def __init__(
+        self,
+        flush_seconds: float = DEFAULT_FLUSH_SECONDS,
+        precision: int = DEFAULT_PRECISION,
+        background: bool = False,
+    ):
+        self.flush_seconds = max(flush_seconds, 0.1)
+        self.precision = precision
+        self.background = background
+        self._pending: Dict[SketchKey, HyperLogLog] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._last_error_log: Optional[float] = None
+        self._suppressed_errors = 0
+
+    def add(self, kind: str, value: str, moment: Optional[datetime] = None) -> None:
+        moment = moment or timezone.now()
+        with self._lock:
+            for granularity in GRANULARITIES:
+                key = (granularity, truncate(moment, granularity), kind)
+                sketch = self._pending.get(key)
+                if sketch is None:
+                    sketch = self._pending[key] = HyperLogLog(self.precision)
+                sketch.add(value)
+        if self.background:
+            self._ensure_started()
+
+    def pending(self, granularity: str, start: datetime, end: datetime, kind: str) -> Iterable[HyperLogLog]:
+        with self._lock:
+            return [
+                HyperLogLog(sketch.precision, bytes(sketch.registers))
+                for (key_granularity, bucket_start, key_kind), sketch in self._pending.items()
+                if key_granularity == granularity and key_kind == kind and start <= bucket_start < end
+            ]
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            for (granularity, bucket_start, kind), sketch in pending.items():
+                _merge_into_row(granularity, bucket_start, kind, sketch)
+        except DatabaseError:
+            self._log_error()
+            with self._lock:
+                for key, sketch in pending.items():
+                    current = self._pending.get(key)
+                    if current is None:
+                        self._pending[key] = sketch
+                    else:
+                        current.merge(sketch)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        thread = self._thread
+        self._stop.set()
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+
+    def _log_error(self) -> None:
+        now = time.monotonic()
+        if self._last_error_log is not None and now - self._last_error_log < ERROR_LOG_INTERVAL:
+            self._suppressed_errors += 1
+            return
+        suppressed, self._suppressed_errors = self._suppressed_errors, 0
+        self._last_error_log = now
+        logger.exception(
+            "Erro ao gravar sketches de distintos; tentando de novo no próximo flush "
+            "(%s falha(s) anteriores sem log)",
+            suppressed,
+        )
+
+    def _ensure_started(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            if self._stop.is_set():
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name="access-sketch-flush", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception:  # pragma: no cover - a thread não pode morrer
+                logger.exception("Falha inesperada na thread de gravação de sketches")
+            finally:
+                close_old_connections()
+
+
+def _merge_into_row(granularity: str, bucket_start: datetime, kind: str, sketch: HyperLogLog) -> None:
+    lookup = {"granularity": granularity, "bucket_start": bucket_start, "kind": kind}
+    using = telemetry_db()
+    for _ in range(2):
+        with transaction.atomic(using=using):
+            row = AccessSketch.objects.select_for_update().filter(**lookup).first()
+            if row is not None:
+                merged = HyperLogLog.from_bytes(row.registers)
+                merged.merge(sketch)
+                row.registers = merged.to_bytes()
+                row.save(update_fields=["registers"])
+                return
+            try:
+                with transaction.atomic(using=using):
+                    AccessSketch.objects.create(registers=sketch.to_bytes(), **lookup)
+                return
+            except IntegrityError:
+                # Outro worker criou a linha ao mesmo tempo: combina com a dele.
+                continue
+
+
+def merge_bucket_sets(granularity: str, bucket_start: datetime, user_ids: Iterable[int], ips: Iterable[str]) -> None:
+    for kind, values in ((AccessSketch.KIND_USER, user_ids), (AccessSketch.KIND_IP, ips)):
+        sketch = HyperLogLog()
+        sketch.update(str(value) for value in values)
+        if not sketch.is_empty():
+            _merge_into_row(granularity, bucket_start, kind, sketch)
+
+
+_accumulator: Optional[SketchAccumulator] = None
+_accumulator_lock = threading.Lock()
+
+
+def get_accumulator() -> SketchAccumulator:
+    global _accumulator
+    if _accumulator is None:
+        with _accumulator_lock:
+            if _accumulator is None:
+                _accumulator = SketchAccumulator(
+                    flush_seconds=getattr(settings, "ACCESS_SKETCH_FLUSH_SECONDS", DEFAULT_FLUSH_SECONDS),
+                    background=True,
+                )
+    return _accumulator
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    if _accumulator is not None:
+        _accumulator.stop()
+        _accumulator.flush()
+
+
+def record_visitor(user_id: Optional[int], ip_address: str, moment: Optional[datetime] = None) -> None:
+    """Conta um acesso nos sketches: pelo usuário ou, se anônimo, pelo IP."""
+    if unique_count_mode() != MODE_HLL:
+        return
+    accumulator = get_accumulator()
+    if user_id is not None:
+        accumulator.add(AccessSketch.KIND_USER, str(user_id), moment)
+    elif ip_address:
+        accumulator.add(AccessSketch.KIND_IP, ip_address, moment)
+
+
+def merged_sketch(granularity: str, start: datetime, end: datetime, kind: str) -> HyperLogLog:
+    """União dos sketches gravados e ainda pendentes neste processo em [start, end)."""
+    start = truncate(start, granularity)
+    rows = AccessSketch.objects.filter(
+        granularity=granularity, kind=kind, bucket_start__gte=start, bucket_start__lt=end
+    ).values_list("registers", flat=True)
+    sketches = [HyperLogLog.from_bytes(registers) for registers in rows]
+    if _accumulator is not None:
+        sketches.extend(_accumulator.pending(granularity, start, end, kind))
+    return HyperLogLog.union(sketches)
+
+
+def _exact_counts(start: datetime, end: datetime) -> Tuple[int, int]:
+    qs = AccessEvent.objects.filter(created_at__gte=start, created_at__lt=end)
+    users = qs.exclude(user_id__isnull=True).values_list("user_id", flat=True).distinct().count()
+    ips = (
+        qs.filter(user_id__isnull=True)
+        .exclude(ip_address="")
+        .values_list("ip_address", flat=True)
+        .distinct()
+        .count()
+    )
+    return users, ips
+
+
+def unique_counts(
+    start: datetime, end: datetime, granularity: str = AccessRollup.GRANULARITY_MINUTE
+) -> Tuple[int, int]:
+    """Usuários e IPs anônimos distintos entre ``start`` e ``end``.
+
+    No modo ``hll`` combina os sketches de ``granularity`` que tocam o
+    intervalo (o bucket parcial do início entra inteiro); no modo ``exact``
+    faz ``COUNT(DISTINCT)`` sobre os eventos.
+    """
+    if unique_count_mode() == MODE_EXACT:
+        return _exact_counts(start, end)
+    return (
+        merged_sketch(granularity, start, end, AccessSketch.KIND_USER).count(),
+        merged_sketch(granularity, start, end, AccessSketch.KIND_IP).count(),
+    )
+
+
+def unique_visitors(now: Optional[datetime] = None) -> Dict[str, int]:
+    """Visitantes distintos (usuários + IPs anônimos) de hoje e dos últimos 7 dias."""
+    now = now or timezone.now()
+    today = truncate(now, AccessRollup.GRANULARITY_DAY)
+    week_start = timezone.make_aware(timezone.localtime(today).replace(tzinfo=None) - timedelta(days=6))
+    end = today + BUCKET_SIZES[AccessRollup.GRANULARITY_DAY]
+    return {
+        "today": sum(unique_counts(today, end, AccessRollup.GRANULARITY_DAY)),
+        "week": sum(unique_counts(week_start, end, AccessRollup.GRANULARITY_DAY)),
+    }
+
+
+def prune_minute_sketches(now: Optional[datetime] = None) -> int:
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=minute_retention_days())
+    deleted, _ = AccessSketch.objects.filter(
+        granularity=AccessRollup.GRANULARITY_MINUTE, bucket_start__lt=cutoff
+    ).delete()
+    return deleted
+
+
+def reset_accumulator() -> None:
+    global _accumulator
+    with _accumulator_lock:
+        if _accumulator is not None:
+            _accumulator.stop()
+        _accumulator = None
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# PRAGMA -> setting, na ordem em que são aplicados: busy_timeout vem antes de
+# journal_mode, que precisa de um lock rápido no arquivo para mudar para WAL.
+PRAGMA_SETTINGS = (
+    ("busy_timeout", "SQLITE_BUSY_TIMEOUT_MS"),
+    ("journal_mode", "SQLITE_JOURNAL_MODE"),
+    ("synchronous", "SQLITE_SYNCHRONOUS"),
+    ("mmap_size", "SQLITE_MMAP_SIZE"),
+    ("cache_size", "SQLITE_CACHE_SIZE"),
+    ("temp_store", "SQLITE_TEMP_STORE"),
+)
+
+# Valores numéricos devolvidos pelo SQLite -> nomes aceitos na configuração.
+_NAMED_VALUES = {
+    "synchronous": {"0": "OFF", "1": "NORMAL", "2": "FULL", "3": "EXTRA"},
+    "temp_store": {"0": "DEFAULT", "1": "FILE", "2": "MEMORY"},
+}
+
+# PRAGMA não aceita parâmetros; só palavras e inteiros chegam ao SQL.
+_VALID_VALUE = re.compile(r"^-?\w+$")
+
+
+def configured_pragmas() -> List[Tuple[str, str]]:
+    """PRAGMAs configurados, em ordem; valores vazios mantêm o padrão do SQLite."""
+    pragmas = []
+    for name, setting in PRAGMA_SETTINGS:
+        value = str(getattr(settings, setting, "") or "").strip()
+        if not value:
+            continue
+        if not _VALID_VALUE.match(value):
+            raise ImproperlyConfigured(f"Valor inválido em {setting}: {value!r}")
+        pragmas.append((name, value))
+    return pragmas
+
+
+def apply_pragmas(connection) -> None:
+    with connection.cursor() as cursor:
+        for name, value in configured_pragmas():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def normalize(name: str, value) -> str:
+    value = str(value)
+    return _NAMED_VALUES.get(name, {}).get(value, value).upper()
+
+
+def effective_pragmas(connection) -> Dict[str, str]:
+    """Valores em vigor na conexão, com nomes no lugar dos códigos numéricos."""
+    values = {}
+    with connection.cursor() as cursor:
+        for name, _ in PRAGMA_SETTINGS:
+            cursor.execute(f"PRAGMA {name}")
+            row = cursor.fetchone()
+            values[name] = normalize(name, row[0]) if row else ""
+    return values
+
+
+def _on_connection_created(sender, connection, **kwargs) -> None:
+    if connection.vendor == "sqlite":
+        apply_pragmas(connection)
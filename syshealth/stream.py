@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = 2.0
+DEFAULT_MAX_STREAM_SECONDS = 300.0
+DEFAULT_QUEUE_SIZE = 16
+
+Message = Dict[str, object]
+Producer = Callable[[Optional[str]], Tuple[Message, Optional[str]]]
+
+
+def format_sse(message: Message, event_id: Optional[str] = None) -> bytes:
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(message, separators=(',', ':'))}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+class LiveFeed:
+    """Publicador em processo das novidades do dashboard de acessos.
+
+    Uma única tarefa por worker consulta o banco a cada ``interval`` segundos
+    (``producer`` recebe o último cursor e devolve a mensagem e o novo cursor)
+    e repassa o resultado, já serializado, para a fila de cada conexão aberta. O custo no banco
+    não depende de quantos dashboards estão conectados. Filas cheias descartam
+    a mensagem mais antiga: um cliente lento perde atualizações, não trava os
+    outros.
+    """
+
+    def __init__(
+        self,
+        producer: Producer,
+        interval: float = DEFAULT_INTERVAL_SECONDS,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ):
+        self.producer = producer
+        self.interval = interval
+        self.queue_size = max(queue_size, 1)
+        self.ticks = 0
+        self.dropped = 0
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._cursor: Optional[str] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, since: Optional[str] = None) -> asyncio.Queue:
+        """Registra uma conexão; ``since`` semeia o cursor de um feed parado."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Novo event loop (ex.: reinício do servidor ou testes): o estado antigo não vale mais.
+            self._subscribers = set()
+            self._task = None
+            self._loop = loop
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            if self._cursor is None:
+                self._cursor = since
+            self._task = loop.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def publish(self, message: Message) -> None:
+        # Serializa uma vez; todas as conexões recebem os mesmos bytes.
+        payload = format_sse(message, message.get("latest"))
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(payload)
+
+    async def _run(self) -> None:
+        while self._subscribers:
+            try:
+                message, self._cursor = await sync_to_async(self.producer)(self._cursor)
+            except Exception:  # pragma: no cover - mantém o feed vivo se uma consulta falhar
+                logger.exception("Erro ao montar a atualização do dashboard de acessos")
+            else:
+                self.ticks += 1
+                self.publish(message)
+            await asyncio.sleep(self.interval)
+
+
+_feeds: Dict[str, LiveFeed] = {}
+
+
+def get_live_feed(key: str, producer: Producer) -> LiveFeed:
+    """Feed compartilhado do processo para ``key`` (um por admin site)."""
+    feed = _feeds.get(key)
+    if feed is None:
+        interval = getattr(settings, "ACCESS_STREAM_INTERVAL_SECONDS", DEFAULT_INTERVAL_SECONDS)
+        feed = _feeds[key] = LiveFeed(producer, interval=interval)
+    return feed
+
+
+def reset_live_feeds() -> None:
+    _feeds.clear()
+
+
+async def stream_messages(
+    feed: LiveFeed,
+    since: Optional[str] = None,
+    catch_up: Optional[Callable[[], Message]] = None,
+    max_seconds: Optional[float] = None,
+):
+    """Corpo de uma resposta ``text/event-stream`` assinada em ``feed``.
+
+    ``catch_up`` produz a primeira mensagem (eventos desde ``since``, o cursor
+    do cliente). A assinatura vem antes dela para não perder o que o feed
+    publicar no meio; eventos repetidos são ignorados pelo cliente.
+
+    A conexão é encerrada após ``max_seconds``; o ``EventSource`` reconecta
+    sozinho enviando ``Last-Event-ID``, o que também limpa conexões cujo
+    cliente sumiu sem o servidor perceber.
+    """
+    if max_seconds is None:
+        max_seconds = getattr(settings, "ACCESS_STREAM_MAX_SECONDS", DEFAULT_MAX_STREAM_SECONDS)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+    queue = feed.subscribe(since)
+    try:
+        yield b"retry: 3000\n\n"
+        if catch_up is not None:
+            message = await sync_to_async(catch_up)()
+            yield format_sse(message, message.get("latest"))
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                payload = await asyncio.wait_for(queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            yield payload
+    finally:
+        feed.unsubscribe(queue)
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from django.utils import timezone
+
+from syshealth.models import AccessEvent
+
+
+def build_event(path: str = "/home/", moment: Optional[datetime] = None, **fields) -> AccessEvent:
+    """``AccessEvent`` ainda não gravado; ``moment`` (padrão: agora) preenche data, hora e ``created_at``."""
+    moment = moment or timezone.now()
+    local = timezone.localtime(moment)
+    values = {
+        "ip_address": "10.0.0.1",
+        "created_date": local.date(),
+        "created_time": local.time().replace(microsecond=0),
+        "created_at": moment,
+    }
+    values.update(fields)
+    return AccessEvent(path=path, **values)
+
+
+def create_event(path: str = "/home/", moment: Optional[datetime] = None, **fields) -> AccessEvent:
+    event = build_event(path, moment, **fields)
+    event.save()
+    return event
+
+
+class FakeClock:
+    """Relógio controlado pelo teste, no lugar de ``time.monotonic``."""
+
+    def __init__(self, value: float = 0.0):
+        self.value = value
+
+    def __call__(self) -> float:
+        return self.value
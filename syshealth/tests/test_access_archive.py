@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from syshealth.archive import AccessArchive
+from syshealth.models import AccessEvent, AccessSettings
+
+
+class AccessArchiveTests(TestCase):
+    def setUp(self):
+        AccessSettings.get_cached(force=True)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.archive = AccessArchive(self.directory)
+        self.user = get_user_model().objects.create_user(username="archived", password="x")
+        self.old = timezone.localtime().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=200)
+        self.day = self.old.date()
+
+    def create_old_events(self, count):
+        AccessEvent.objects.bulk_create(
+            AccessEvent(
+                user=self.user if index % 2 else None,
+                ip_address=f"10.0.0.{index}",
+                path=f"/antigo/{index}/",
+                referrer="https://example.com/\nquebra",
+                user_agent="Mozilla/5.0",
+                created_date=self.day,
+                created_at=self.old + timedelta(seconds=index),
+                status_code=200,
+                duration_ms=12.5,
+            )
+            for index in range(count)
+        )
+
+    def prune(self, *args):
+        out = StringIO()
+        call_command("ops_prune_access_events", "--archive", self.directory, *args, stdout=out)
+        return out.getvalue()
+
+    def test_archives_expired_days_before_deleting(self):
+        self.create_old_events(3)
+        AccessEvent.objects.create(
+            ip_address="10.0.1.1", path="/legado/", created_date=self.day - timedelta(days=1), created_time=None
+        )
+        AccessEvent.objects.filter(path_ref__value="/legado/").update(created_at=None)
+        AccessEvent.objects.create(ip_address="10.0.1.2", path="/novo/", created_date=timezone.localdate())
+
+        output = self.prune()
+
+        self.assertIn("eventos arquivados", output)
+        self.assertEqual(list(AccessEvent.objects.values_list("path_ref__value", flat=True)), ["/novo/"])
+        self.assertEqual(self.archive.days(), [self.day - timedelta(days=1), self.day])
+        self.assertEqual(
+            [row["path"] for row in self.archive.rows(columns=["path"])],
+            ["/legado/", "/antigo/0/", "/antigo/1/", "/antigo/2/"],
+        )
+        row = next(self.archive.rows(start=self.day, columns=["user_id", "referrer", "duration_ms"]))
+        self.assertEqual(row, {"user_id": None, "referrer": "https://example.com/\nquebra", "duration_ms": 12.5})
+
+    def test_interrupted_prune_resumes_without_duplicates(self):
+        self.create_old_events(5)
+        sleep = "syshealth.management.commands.ops_prune_access_events.time.sleep"
+        with mock.patch(sleep, side_effect=KeyboardInterrupt):
+            self.assertIn("Interrompido", self.prune("--batch-size", "2", "--sleep", "1"))
+        self.assertEqual(AccessEvent.objects.count(), 3)
+
+        self.prune("--batch-size", "2")
+        self.assertFalse(AccessEvent.objects.exists())
+        self.assertEqual(len(self.archive.parts(self.day)), 1)
+        self.assertEqual(len(list(self.archive.rows())), 5)
+
+    def test_restore_reimports_archived_events(self):
+        self.create_old_events(4)
+        self.prune()
+
+        for _ in range(2):
+            call_command("restore_access_archive", self.directory, stdout=StringIO())
+
+        events = AccessEvent.objects.order_by("created_at")
+        self.assertEqual(events.count(), 4)
+        self.assertEqual(events[1].path, "/antigo/1/")
+        self.assertEqual(events[1].user_id, self.user.pk)
+        self.assertEqual(events[0].created_at, self.old)
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from django.db import transaction
+from django.test import TestCase
+
+from syshealth.dimensions import clear_caches, get_cache
+from syshealth.models import AccessEvent, AccessPath, AccessReferrer
+from syshealth.tests.helpers import build_event
+from syshealth.writer import persist_events
+
+
+class AccessDimensionTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.addCleanup(clear_caches)
+
+    def test_batch_interns_each_value_once(self):
+        agent = "Mozilla/5.0"
+        persist_events(
+            [
+                build_event("/a/", user_agent=agent),
+                build_event("/a/", user_agent=agent),
+                build_event("/b/", referrer="https://x.test/", user_agent=agent),
+            ]
+        )
+
+        self.assertEqual(AccessPath.objects.count(), 2)
+        self.assertEqual(AccessReferrer.objects.count(), 1)
+        events = list(AccessEvent.objects.with_dimensions().order_by("pk"))
+        self.assertEqual([event.path for event in events], ["/a/", "/a/", "/b/"])
+        self.assertIsNone(events[0].referrer_ref_id)
+        self.assertEqual(events[0].referrer, "")
+        self.assertEqual(events[2].referrer, "https://x.test/")
+        self.assertEqual(events[0].user_agent, "Mozilla/5.0")
+
+    def test_cached_values_skip_queries(self):
+        cache = get_cache(AccessPath)
+        with self.captureOnCommitCallbacks(execute=True):
+            first = cache.resolve(["/cached/"])
+        with self.assertNumQueries(0):
+            self.assertEqual(cache.resolve(["/cached/"]), first)
+        self.assertEqual(cache.hits, 1)
+
+    def test_rolled_back_ids_are_not_cached(self):
+        cache = get_cache(AccessPath)
+        try:
+            with transaction.atomic():
+                cache.resolve(["/rollback/"])
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertIsNone(cache.get("/rollback/"))
+        self.assertFalse(AccessPath.objects.filter(value="/rollback/").exists())
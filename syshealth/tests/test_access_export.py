@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import tracemalloc
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import caches
+from django.http import StreamingHttpResponse
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from syshealth.export import CSV_HEADER, csv_export_response
+from syshealth.models import AccessEvent
+from syshealth.presence import reset_presence_tracker
+from syshealth.result_cache import reset_counter_cache
+from syshealth.sketches import reset_accumulator
+from syshealth.tests.helpers import create_event
+
+User = get_user_model()
+
+
+def read_csv(response) -> list:
+    return list(csv.reader(StringIO(b"".join(response.streaming_content).decode("utf-8"))))
+
+
+class CsvExportTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        reset_counter_cache()
+        reset_accumulator()
+        reset_presence_tracker()
+        self.addCleanup(reset_accumulator)
+        self.client = Client()
+        self.user = User.objects.create_user(username="viewer", password="x", is_staff=True)
+        self.user.user_permissions.add(
+            Permission.objects.get(content_type__app_label="ops", codename="view_access_dashboard"),
+            Permission.objects.get(content_type__app_label="ops", codename="view_access_event"),
+        )
+        self.client.force_login(self.user)
+        self.url = reverse("admin:ops_access_dashboard")
+        self.now = timezone.now()
+
+    def create_event(self, moment, path, user=None):
+        return create_event(
+            path, moment, user=user, referrer="https://example.com/", is_admin=path.startswith("/admin/")
+        )
+
+    def test_streams_window_without_instantiating_events(self):
+        self.create_event(self.now, "/admin/", user=self.user)
+        self.create_event(self.now - timedelta(days=3), "/antigo/")
+
+        with mock.patch.object(AccessEvent, "from_db", side_effect=AssertionError("instanciou AccessEvent")):
+            response = self.client.get(self.url, {"export": "csv"})
+            rows = read_csv(response)
+
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(rows[0], list(CSV_HEADER))
+        self.assertEqual(rows[1][1:], ["viewer", "10.0.0.1", "/admin/", "admin", "https://example.com/"])
+        self.assertEqual(len(rows), 2)
+
+    def test_date_range_beyond_online_window(self):
+        old = self.now - timedelta(days=3)
+        self.create_event(old, "/antigo/")
+        self.create_event(self.now - timedelta(days=10), "/fora/")
+        day = timezone.localtime(old).date()
+
+        response = self.client.get(self.url, {"export": "csv", "start": day.isoformat(), "end": day.isoformat()})
+        self.assertEqual([row[3] for row in read_csv(response)[1:]], ["/antigo/"])
+
+        invalid = self.client.get(self.url, {"export": "csv", "start": "2024-05-02", "end": "2024-05-01"})
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_gzip_on_the_fly(self):
+        self.create_event(self.now, "/site/")
+        response = self.client.get(self.url, {"export": "csv", "gzip": "on"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertTrue(response["Content-Disposition"].endswith(".csv.gz"))
+        content = gzip.decompress(b"".join(response.streaming_content)).decode("utf-8")
+        self.assertEqual(content.splitlines()[1].split(",")[3], "/site/")
+
+    def test_memory_does_not_grow_with_rows(self):
+        path = "/catalogo/produtos/" + "x" * 200
+
+        def export_peak(rows):
+            AccessEvent.objects.bulk_create(
+                AccessEvent(ip_address="10.0.0.1", path=path, created_date=self.now.date(), created_at=self.now)
+                for _ in range(rows)
+            )
+            response = csv_export_response(AccessEvent.objects.all(), self.now, chunk_size=500)
+            tracemalloc.start()
+            try:
+                total = sum(len(chunk) for chunk in response.streaming_content)
+                return total, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        small_total, small_peak = export_peak(1000)
+        large_total, large_peak = export_peak(9000)
+
+        self.assertGreater(large_total, small_total * 9)
+        self.assertLess(large_peak, small_peak + 256 * 1024)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase
+
+from syshealth.journal import AccessJournal, fcntl, read_segment, seal_stale_segments, sealed_segments
+from syshealth.models import AccessEvent, AccessJournalSegment
+from syshealth.tests.helpers import build_event
+from syshealth.writer import AccessEventWriter
+
+
+class AccessJournalTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = Path(tmp.name)
+
+    def test_roundtrip_after_seal(self):
+        journal = AccessJournal(self.directory)
+        journal.append([build_event("/a/"), build_event("/b/")])
+        self.assertEqual(sealed_segments(self.directory), [])
+
+        journal.seal()
+        segments = sealed_segments(self.directory)
+        self.assertEqual(len(segments), 1)
+        self.assertEqual([record["path"] for record in read_segment(segments[0])], ["/a/", "/b/"])
+
+    def test_rotates_by_size(self):
+        journal = AccessJournal(self.directory, segment_bytes=1024)
+        for index in range(20):
+            journal.append([build_event(f"/page/{index}/" + "x" * 100)])
+        journal.seal()
+
+        segments = sealed_segments(self.directory)
+        self.assertGreater(len(segments), 1)
+        total = sum(1 for path in segments for _ in read_segment(path))
+        self.assertEqual(total, 20)
+
+    def test_ignores_truncated_tail(self):
+        journal = AccessJournal(self.directory)
+        journal.append([build_event("/ok/"), build_event("/partial/")])
+        journal.seal()
+        segment = sealed_segments(self.directory)[0]
+        data = segment.read_bytes()
+        segment.write_bytes(data[:-5])
+
+        with self.assertLogs("syshealth.journal", level="WARNING"):
+            records = list(read_segment(segment))
+        self.assertEqual([record["path"] for record in records], ["/ok/"])
+
+    @unittest.skipIf(fcntl is None, "sem fcntl")
+    def test_stale_segments_follow_the_lock_not_the_pid(self):
+        # O PID do pai está vivo, como se tivesse sido reaproveitado por outro processo.
+        orphan = self.directory / f"access-{os.getppid()}-1.open"
+        orphan.write_bytes(b"")
+        held = self.directory / f"access-{os.getppid()}-2.open"
+        held.write_bytes(b"")
+        with open(held, "rb") as handle:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            sealed = seal_stale_segments(self.directory)
+
+        self.assertEqual(sealed, [orphan.with_suffix(".seg")])
+        self.assertTrue(held.exists())
+
+    def test_own_open_segment_is_locked(self):
+        journal = AccessJournal(self.directory)
+        journal.append([build_event("/a/")])
+        self.addCleanup(journal.seal)
+        path = journal._path
+        self.assertEqual(path.suffix, ".open")
+        if fcntl is not None:
+            with open(path, "rb") as handle, self.assertRaises(BlockingIOError):
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def test_writer_spills_failed_batch(self):
+        def failing(batch):
+            raise OperationalError("database is locked")
+
+        journal = AccessJournal(self.directory)
+        writer = AccessEventWriter(persist=failing, journal=journal)
+        writer.write(build_event("/spilled/"))
+        journal.seal()
+
+        self.assertEqual(writer.stats.spilled, 1)
+        self.assertEqual(writer.stats.failed, 0)
+        segment = sealed_segments(self.directory)[0]
+        self.assertEqual(next(read_segment(segment))["path"], "/spilled/")
+
+
+class ReplayAccessJournalCommandTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = Path(tmp.name)
+        self.user = get_user_model().objects.create_user(username="journal", password="x")
+
+    def _replay(self, *args) -> str:
+        out = StringIO()
+        call_command("replay_access_journal", "--dir", str(self.directory), *args, stdout=out)
+        return out.getvalue()
+
+    def test_replay_loads_segments_once(self):
+        journal = AccessJournal(self.directory)
+        journal.append([build_event("/a/", user=self.user), build_event("/b/")])
+        journal.seal()
+
+        output = self._replay("--keep")
+        self.assertIn("2 eventos carregados", output)
+        self.assertEqual(AccessEvent.objects.count(), 2)
+        self.assertEqual(AccessEvent.objects.get(path_ref__value="/a/").user, self.user)
+
+        output = self._replay()
+        self.assertIn("já carregado", output)
+        self.assertEqual(AccessEvent.objects.count(), 2)
+        self.assertEqual(AccessJournalSegment.objects.get().records, 2)
+        self.assertEqual(sealed_segments(self.directory), [])
+
+    def test_replay_drops_unknown_users(self):
+        journal = AccessJournal(self.directory)
+        event = build_event("/ghost/")
+        event.user_id = 999999
+        journal.append([event])
+        journal.seal()
+
+        self._replay()
+        self.assertIsNone(AccessEvent.objects.get(path_ref__value="/ghost/").user_id)
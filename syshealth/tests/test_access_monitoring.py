@@ -1,22 +1,34 @@
 from __future__ import annotations
 
+import asyncio
+import tempfile
 from datetime import timedelta
 from io import StringIO
+from unittest import mock
 
-from django.contrib.auth import get_user_model
+from django.contrib.auth import get_user, get_user_model
 from django.contrib.auth.models import AnonymousUser, Permission
 from django.core.management import call_command
 from django.http import HttpResponse
-from django.test import Client, RequestFactory, TestCase
+from django.core.cache import caches
+from django.test import AsyncRequestFactory, Client, RequestFactory, TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject, empty
 
-from syshealth.middleware import AccessLogMiddleware
-from syshealth.models import AccessEvent, AccessSettings
+from syshealth.dimensions import clear_caches, get_cache
+from syshealth.middleware import AccessLogMiddleware, RequestRecord
+from syshealth.models import AccessEvent, AccessPath, AccessReferrer, AccessSettings, AccessUserAgent
+from syshealth.presence import reset_presence_tracker
+from syshealth.result_cache import reset_counter_cache
+from syshealth.settings_stamp import publish_settings_stamp, read_settings_stamp
+from syshealth.sketches import reset_accumulator
+from syshealth.writer import AccessEventWriter, persist_events
 
 
 class AccessLogMiddlewareTests(TestCase):
     def setUp(self):
+        self.addCleanup(reset_accumulator)
         AccessSettings.get_cached(force=True)
         AccessEvent.objects.all().delete()
         self.factory = RequestFactory()
@@ -62,10 +74,140 @@ class AccessLogMiddlewareTests(TestCase):
         self.middleware(request)
         self.assertFalse(AccessEvent.objects.exists())
 
+    def test_records_response_metrics(self):
+        middleware = AccessLogMiddleware(lambda request: HttpResponse("missing", status=404))
+        request = self.factory.get("/admin/")
+        request.user = self.user
+        request.META["REMOTE_ADDR"] = "127.0.0.1"
+
+        middleware(request)
+        event = AccessEvent.objects.get()
+        self.assertEqual(event.status_code, 404)
+        self.assertEqual(event.response_bytes, len(b"missing"))
+        self.assertIsNotNone(event.duration_ms)
+        self.assertGreaterEqual(event.duration_ms, 0)
+
+
+class AsyncAccessLogMiddlewareTests(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_accumulator)
+        AccessSettings.get_cached(force=True)
+        self.factory = AsyncRequestFactory()
+        self.persisted = []
+        self.writer = AccessEventWriter(persist=self.persisted.extend)
+        self.user = get_user_model().objects.create_user(
+            username="async-tester", password="123456", is_staff=True
+        )
+
+    async def test_async_call_logs_after_response(self):
+        async def get_response(request):
+            return HttpResponse("ok")
+
+        middleware = AccessLogMiddleware(get_response, writer=self.writer)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+
+        request = self.factory.get("/admin/")
+        request.user = self.user
+        request.META["REMOTE_ADDR"] = "127.0.0.9"
+
+        response = await middleware(request)
+        self.assertEqual(response.status_code, 200)
+        await middleware._async_queue.join()
+
+        self.assertEqual(len(self.persisted), 1)
+        self.assertEqual(self.persisted[0].ip_address, "127.0.0.9")
+        self.assertTrue(self.persisted[0].is_admin)
+
+    async def test_full_queue_drops_and_counts(self):
+        async def get_response(request):
+            return HttpResponse("x" * 10_000)
+
+        middleware = AccessLogMiddleware(get_response, writer=self.writer)
+        middleware.async_queue_size = 1
+        for index in range(3):
+            request = self.factory.get("/fila/")
+            request.user = self.user
+            request.META["REMOTE_ADDR"] = f"127.0.0.{index + 1}"
+            await middleware(request)
+
+        # Na fila fica só o que o registro usa, não a requisição e a resposta.
+        queued = list(middleware._async_queue._queue)
+        self.assertEqual([type(item) for item in queued], [RequestRecord])
+        self.assertEqual(queued[0].response_bytes, 10_000)
+        await middleware._async_queue.join()
+
+        self.assertEqual(len(self.persisted), 1)
+        self.assertEqual(self.writer.stats.dropped_newest, 2)
+
+    def test_lazy_user_is_resolved_from_the_session_only(self):
+        self.client.force_login(self.user)
+        request = self.factory.get("/")
+        request.session = self.client.session
+        request.user = SimpleLazyObject(lambda: get_user(request))
+
+        middleware = AccessLogMiddleware(lambda request: HttpResponse("ok"), writer=self.writer)
+        record = middleware._build_record(request, HttpResponse("ok"), 1.0, detach_user=True)
+        self.assertIs(request.user._wrapped, empty)
+        self.assertEqual(record.user.pk, self.user.pk)
+
+    def test_sync_get_response_keeps_sync_path(self):
+        middleware = AccessLogMiddleware(lambda request: HttpResponse("ok"), writer=self.writer)
+        self.assertFalse(asyncio.iscoroutinefunction(middleware))
+
+
+class AccessSettingsCacheTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        stamp_override = override_settings(ACCESS_SETTINGS_STAMP_PATH=f"{tmp.name}/stamp")
+        stamp_override.enable()
+        self.addCleanup(stamp_override.disable)
+        self.settings_obj = AccessSettings.get_cached(force=True)
+
+    def _expire_stamp_check(self):
+        AccessSettings._stamp_checked_at -= AccessSettings._STAMP_CHECK_SECONDS
+
+    def test_save_bumps_version_and_publishes_stamp(self):
+        version = self.settings_obj.version
+        self.settings_obj.sampling_ratio = 3
+        self.settings_obj.save()
+        self.assertEqual(self.settings_obj.version, version + 1)
+        self.assertEqual(read_settings_stamp(), f"{self.settings_obj.pk}:{version + 1}")
+
+    def test_concurrent_saves_get_distinct_versions(self):
+        # Duas cópias carregadas com a mesma versão, como em dois workers.
+        first = AccessSettings.objects.get(pk=self.settings_obj.pk)
+        second = AccessSettings.objects.get(pk=self.settings_obj.pk)
+        first.save()
+        second.save(update_fields=["sampling_ratio"])
+        self.assertEqual(second.version, first.version + 1)
+        self.assertEqual(AccessSettings.objects.get(pk=first.pk).version, second.version)
+
+    def test_reloads_when_another_worker_publishes(self):
+        AccessSettings.objects.filter(pk=self.settings_obj.pk).update(sampling_ratio=7, version=99)
+        publish_settings_stamp(f"{self.settings_obj.pk}:99")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(AccessSettings.get_cached().sampling_ratio, 1)
+
+        self._expire_stamp_check()
+        self.assertEqual(AccessSettings.get_cached().sampling_ratio, 7)
+
+    def test_unchanged_stamp_skips_database(self):
+        self.settings_obj.save()
+        self._expire_stamp_check()
+        AccessSettings._cached_at -= AccessSettings._CACHE_SECONDS * 10
+        with self.assertNumQueries(0):
+            self.assertIs(AccessSettings.get_cached(), self.settings_obj)
+
 
 class AccessDashboardViewTests(TestCase):
     def setUp(self):
         AccessSettings.get_cached(force=True)
+        caches["default"].clear()
+        reset_counter_cache()
+        reset_accumulator()
+        reset_presence_tracker()
         self.client = Client()
         self.user = get_user_model().objects.create_user(
             username="viewer",
@@ -133,6 +275,89 @@ class AccessDashboardViewTests(TestCase):
         self.assertGreaterEqual(data["access_count"], 1)
         self.assertEqual(len(data["events"]), 1)
         self.assertEqual(data["events"][0]["source"], "Site")
+        self.assertFalse(data["page"]["has_older"])
+        self.assertIsNone(data["page"]["before"])
+        self.assertFalse(data["delta"])
+        self.assertTrue(data["latest"])
+
+    def test_dashboard_json_since_returns_only_new_events(self):
+        now = timezone.localtime()
+        url = reverse("admin:ops_access_dashboard_data")
+        AccessEvent.objects.create(ip_address="10.0.0.1", path="/old/", created_date=now.date(), created_at=now)
+        latest = self.client.get(url).json()["latest"]
+
+        AccessEvent.objects.create(ip_address="10.0.0.1", path="/new/", created_date=now.date(), created_at=now)
+        data = self.client.get(url, {"since": latest}).json()
+        self.assertTrue(data["delta"])
+        self.assertFalse(data["reset"])
+        self.assertNotIn("page", data)
+        self.assertEqual([event["path"] for event in data["events"]], ["/new/"])
+        self.assertEqual(data["counters_cache"]["hits"], 1)
+
+        unchanged = self.client.get(url, {"since": data["latest"]}).json()
+        self.assertEqual(unchanged["events"], [])
+        self.assertEqual(unchanged["latest"], data["latest"])
+
+    def test_dashboard_json_since_resets_when_too_far_behind(self):
+        now = timezone.localtime()
+        url = reverse("admin:ops_access_dashboard_data")
+        AccessEvent.objects.create(ip_address="10.0.0.1", path="/old/", created_date=now.date(), created_at=now)
+        latest = self.client.get(url).json()["latest"]
+        persist_events(
+            [AccessEvent(ip_address="10.0.0.1", path=f"/{index}/", created_date=now.date(), created_at=now) for index in range(60)]
+        )
+
+        data = self.client.get(url, {"since": latest}).json()
+        self.assertTrue(data["reset"])
+        self.assertEqual(len(data["events"]), 50)
+
+        fallback = self.client.get(url, {"since": "invalido"}).json()
+        self.assertFalse(fallback["delta"])
+        self.assertIn("page", fallback)
+
+    def test_route_stats_percentiles_and_errors(self):
+        now = timezone.localtime()
+        for index in range(1, 101):
+            AccessEvent.objects.create(
+                ip_address="10.0.0.2",
+                path="/home/",
+                route_name="home",
+                status_code=500 if index <= 5 else (404 if index <= 15 else 200),
+                duration_ms=float(index),
+                created_date=now.date(),
+                created_time=now.time().replace(microsecond=0),
+            )
+
+        response = self.client.get(reverse("admin:ops_access_dashboard_data"))
+        route = response.json()["routes"][0]
+        self.assertEqual(route["route"], "home")
+        self.assertEqual(route["hits"], 100)
+        self.assertEqual(route["p50_ms"], 50.0)
+        self.assertEqual(route["p95_ms"], 95.0)
+        self.assertEqual(route["p99_ms"], 99.0)
+        self.assertEqual(route["server_error_pct"], 5.0)
+        self.assertEqual(route["client_error_pct"], 10.0)
+
+    def test_route_stats_weight_sampled_events(self):
+        now = timezone.localtime()
+        rows = [("lista", 1.0, 10.0, 200)] * 6 + [("busca", 4.0, 30.0, 200)] * 2 + [("busca", 4.0, 90.0, 500)]
+        for route_name, weight, duration_ms, status_code in rows:
+            AccessEvent.objects.create(
+                ip_address="10.0.0.3",
+                path=f"/{route_name}/",
+                route_name=route_name,
+                sample_weight=weight,
+                status_code=status_code,
+                duration_ms=duration_ms,
+                created_date=now.date(),
+                created_at=now,
+            )
+
+        routes = self.client.get(reverse("admin:ops_access_dashboard_data")).json()["routes"]
+        self.assertEqual([(route["route"], route["hits"]) for route in routes], [("busca", 12), ("lista", 6)])
+        self.assertEqual(routes[0]["p50_ms"], 30.0)
+        self.assertEqual(routes[0]["p95_ms"], 90.0)
+        self.assertEqual(routes[0]["server_error_pct"], 33.3)
 
 
 class AccessEventPruneCommandTests(TestCase):
@@ -177,8 +402,43 @@ class AccessEventPruneCommandTests(TestCase):
         call_command("ops_prune_access_events", stdout=out)
         output = out.getvalue()
         self.assertIn("Removidos", output)
-        self.assertEqual(AccessEvent.objects.filter(path="/old/").count(), 0)
-        self.assertEqual(AccessEvent.objects.filter(path="/keep/").count(), 1)
+        self.assertEqual(AccessEvent.objects.filter(path_ref__value="/old/").count(), 0)
+        self.assertEqual(AccessEvent.objects.filter(path_ref__value="/keep/").count(), 1)
+
+    def test_prune_sweeps_orphan_dimensions(self):
+        clear_caches()
+        self.addCleanup(clear_caches)
+        old = timezone.now() - timedelta(days=200)
+        with self.captureOnCommitCallbacks(execute=True):
+            AccessEvent.objects.bulk_create(
+                [
+                    AccessEvent(
+                        ip_address="10.0.0.2",
+                        path="/old/",
+                        referrer="https://shared.example/",
+                        user_agent="OldAgent/1.0",
+                        created_date=old.date(),
+                        created_at=old,
+                    ),
+                    AccessEvent(
+                        ip_address="10.0.0.3",
+                        path="/keep/",
+                        referrer="https://shared.example/",
+                        created_date=timezone.localdate(),
+                        created_at=timezone.now(),
+                    ),
+                ]
+            )
+        self.assertIsNotNone(get_cache(AccessPath).get("/old/"))
+
+        out = StringIO()
+        call_command("ops_prune_access_events", stdout=out)
+
+        self.assertIn("2 valores sem eventos removidos", out.getvalue())
+        self.assertEqual(list(AccessPath.objects.values_list("value", flat=True)), ["/keep/"])
+        self.assertEqual(list(AccessReferrer.objects.values_list("value", flat=True)), ["https://shared.example/"])
+        self.assertFalse(AccessUserAgent.objects.exists())
+        self.assertIsNone(get_cache(AccessPath).get("/old/"))
 
     def test_prune_dry_run(self):
         today = timezone.localdate()
@@ -198,4 +458,68 @@ class AccessEventPruneCommandTests(TestCase):
         call_command("ops_prune_access_events", "--dry-run", stdout=out)
         output = out.getvalue()
         self.assertIn("Dry-run", output)
-        self.assertEqual(AccessEvent.objects.filter(path="/maybe/").count(), 1)
+        self.assertEqual(AccessEvent.objects.filter(path_ref__value="/maybe/").count(), 1)
+
+    def test_prune_in_batches_reports_progress(self):
+        old = timezone.now() - timedelta(days=200)
+        AccessEvent.objects.bulk_create(
+            AccessEvent(ip_address="10.0.0.5", path="/old/", created_date=old.date(), created_at=old)
+            for _ in range(7)
+        )
+
+        out = StringIO()
+        call_command("ops_prune_access_events", "--batch-size", "3", stdout=out)
+        output = out.getvalue()
+        self.assertIn("3/7 eventos removidos", output)
+        self.assertIn("7/7 eventos removidos", output)
+        self.assertIn("eventos/s", output)
+        self.assertFalse(AccessEvent.objects.exists())
+
+    def test_prune_resumes_after_interruption(self):
+        old = timezone.now() - timedelta(days=200)
+        AccessEvent.objects.bulk_create(
+            AccessEvent(ip_address="10.0.0.6", path="/old/", created_date=old.date(), created_at=old)
+            for _ in range(5)
+        )
+
+        out = StringIO()
+        sleep = "syshealth.management.commands.ops_prune_access_events.time.sleep"
+        with mock.patch(sleep, side_effect=KeyboardInterrupt):
+            call_command("ops_prune_access_events", "--batch-size", "2", "--sleep", "1", stdout=out)
+        self.assertIn("Interrompido após 2 eventos", out.getvalue())
+        self.assertEqual(AccessEvent.objects.count(), 3)
+
+        call_command("ops_prune_access_events", "--batch-size", "2", stdout=StringIO())
+        self.assertFalse(AccessEvent.objects.exists())
+
+
+class BackfillCreatedAtCommandTests(TestCase):
+    def test_backfill_fills_missing_timestamps(self):
+        day = timezone.localdate() - timedelta(days=3)
+        AccessEvent.objects.bulk_create(
+            [
+                AccessEvent(ip_address="10.0.0.5", path=f"/legacy/{index}/", created_date=day, created_time=None)
+                for index in range(7)
+            ]
+        )
+        # Simula eventos gravados antes da coluna existir.
+        AccessEvent.objects.update(created_at=None)
+
+        out = StringIO()
+        call_command("backfill_access_created_at", "--batch-size", "3", stdout=out)
+        self.assertIn("7 eventos", out.getvalue())
+        self.assertFalse(AccessEvent.objects.filter(created_at__isnull=True).exists())
+        event = AccessEvent.objects.first()
+        self.assertEqual(timezone.localtime(event.created_at).date(), day)
+
+    def test_since_uses_created_at(self):
+        now = timezone.now()
+        AccessEvent.objects.create(ip_address="10.0.0.6", path="/new/", created_date=now.date(), created_at=now)
+        AccessEvent.objects.create(
+            ip_address="10.0.0.7",
+            path="/old/",
+            created_date=now.date(),
+            created_at=now - timedelta(minutes=30),
+        )
+        paths = list(AccessEvent.objects.since(now - timedelta(minutes=5)).values_list("path_ref__value", flat=True))
+        self.assertEqual(paths, ["/new/"])
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from syshealth import partitions
+from syshealth.models import AccessEvent, AccessPath, AccessSettings
+from syshealth.result_cache import reset_counter_cache
+from syshealth.routers import telemetry_db
+
+
+def table_names():
+    return set(connections[telemetry_db()].introspection.table_names(include_views=True))
+
+
+class AccessPartitionTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        AccessSettings.get_cached(force=True)
+        self.now = timezone.localtime().replace(hour=12, minute=0, second=0, microsecond=0)
+        self.today = partitions.partition_for(self.now, partitions.MODE_DAY)
+        # Evento gravado antes de ligar o particionamento: fica na tabela original.
+        self.legacy = AccessEvent.objects.create(
+            ip_address="10.0.0.1", path="/legado/", created_date=self.now.date(), created_at=self.now
+        )
+        partitions.activate(partitions.MODE_DAY)
+        self.addCleanup(partitions.deactivate)
+
+    def create(self, moment, **kwargs):
+        return AccessEvent.objects.create(
+            ip_address="10.0.0.2", path="/p/", created_date=timezone.localdate(moment), created_at=moment, **kwargs
+        )
+
+    def test_events_land_in_their_day_partition(self):
+        yesterday = self.now - timedelta(days=1)
+        old = self.create(yesterday)
+        new = AccessEvent.objects.bulk_create(
+            [AccessEvent(ip_address="10.0.0.3", path="/a/", created_date=self.now.date(), created_at=self.now)]
+        )[0]
+
+        previous = partitions.partition_for(yesterday)
+        self.assertLessEqual({previous.table, self.today.table}, table_names())
+        self.assertEqual(list(previous.model.objects.values_list("pk", flat=True)), [old.pk])
+        self.assertEqual(list(self.today.model.objects.values_list("pk", flat=True)), [new.pk])
+        self.assertLess(self.legacy.pk, old.pk)
+        self.assertLess(old.pk, new.pk)
+        self.assertEqual(AccessEvent.objects.count(), 3)
+        self.assertEqual(AccessEvent.objects.get(pk=new.pk).path, "/a/")
+
+    def test_update_and_delete_reach_the_partition(self):
+        user = get_user_model().objects.create_user(username="particionado", password="x")
+        event = self.create(self.now, user=user)
+        event.status_code = 404
+        event.save()
+        self.assertEqual(self.today.model.objects.get(pk=event.pk).status_code, 404)
+
+        user.delete()
+        self.assertIsNone(AccessEvent.objects.get(pk=event.pk).user_id)
+
+        AccessEvent.objects.filter(pk=event.pk).delete()
+        self.assertFalse(self.today.model.objects.exists())
+
+    def test_window_queryset_reads_only_current_partition(self):
+        sql = str(partitions.window_queryset(timezone.now() - timedelta(minutes=5)).query)
+        self.assertIn(self.today.table, sql)
+        self.assertNotIn(partitions.VIEW_NAME, sql)
+
+        older = partitions.window_queryset(self.today.start_at - timedelta(minutes=5))
+        self.assertIn(partitions.VIEW_NAME, str(older.query))
+
+    def test_prune_drops_expired_partitions(self):
+        old = self.now - timedelta(days=200)
+        self.create(old)
+        self.create(self.now)
+        partitions.base_event_model().objects.filter(pk=self.legacy.pk).update(
+            created_at=old, created_date=old.date()
+        )
+
+        out = StringIO()
+        call_command("ops_prune_access_events", stdout=out)
+
+        self.assertIn("DROP TABLE", out.getvalue())
+        self.assertNotIn(partitions.partition_for(old).table, table_names())
+        self.assertEqual(AccessEvent.objects.count(), 1)
+        self.assertEqual(list(partitions.existing_partitions()), [self.today])
+        # "/legado/" saiu com o evento da tabela base; "/p/" segue em uso na partição de hoje.
+        self.assertEqual(list(AccessPath.objects.values_list("value", flat=True)), ["/p/"])
+
+    def test_migrations_reach_existing_partitions(self):
+        event = self.create(self.now)
+        partitions._on_pre_migrate(None, using=telemetry_db())
+        self.assertNotIn(partitions.VIEW_NAME, table_names())
+
+        # Simula uma migração que acrescenta uma coluna à tabela base.
+        with connections[telemetry_db()].cursor() as cursor:
+            cursor.execute(f'ALTER TABLE "{partitions.BASE_TABLE}" ADD COLUMN "extra" integer NULL')
+        with self.assertRaises(ImproperlyConfigured):
+            partitions.ensure_partition(self.today)
+
+        partitions._on_post_migrate(None, using=telemetry_db())
+        with connections[telemetry_db()].cursor() as cursor:
+            cursor.execute(f'PRAGMA table_info("{self.today.table}")')
+            self.assertIn("extra", [row[1] for row in cursor.fetchall()])
+        self.assertIn(partitions.VIEW_NAME, table_names())
+        self.assertEqual(AccessEvent.objects.get(pk=event.pk).ip_address, "10.0.0.2")
+        self.assertGreater(self.create(self.now).pk, event.pk)
+
+    def test_month_partitions(self):
+        partition = partitions.partition_for(date(2024, 12, 15), partitions.MODE_MONTH)
+        self.assertEqual(partition.table, "syshealth_accessevent_p202412")
+        self.assertEqual(partition.end, date(2025, 1, 1))
+        self.assertEqual(len(partition.days()), 31)
+
+    def test_dashboard_json_with_partitions(self):
+        caches["default"].clear()
+        reset_counter_cache()
+        viewer = get_user_model().objects.create_user(username="viewer", password="x", is_staff=True)
+        viewer.user_permissions.add(
+            Permission.objects.get(content_type__app_label="ops", codename="view_access_dashboard"),
+            Permission.objects.get(content_type__app_label="ops", codename="view_access_event"),
+        )
+        self.client.force_login(viewer)
+        event = self.create(timezone.now())
+
+        data = self.client.get(reverse("admin:ops_access_dashboard_data")).json()
+        self.assertIn(event.pk, [item["id"] for item in data["events"]])
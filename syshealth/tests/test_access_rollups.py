@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from datetime import datetime, time as time_cls, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from syshealth.models import AccessRollup
+from syshealth.rollups import estimate_hits, rolled_until, rollup_range
+from syshealth.tests.helpers import create_event
+
+
+class AccessRollupTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="rollup", password="x")
+        yesterday = timezone.localdate() - timedelta(days=1)
+        self.day_start = timezone.make_aware(datetime.combine(yesterday, time_cls(10, 0)))
+
+    def _seed(self):
+        create_event(moment=self.day_start + timedelta(seconds=5), route_name="home", user=self.user, is_admin=True)
+        create_event(moment=self.day_start + timedelta(seconds=40), route_name="home", user=self.user, is_admin=True)
+        create_event(
+            moment=self.day_start + timedelta(minutes=1, seconds=3),
+            route_name="home",
+            ip_address="10.0.0.2",
+            sample_weight=4.0,
+        )
+        create_event("/x/", self.day_start + timedelta(minutes=61), ip_address="10.0.0.3")
+
+    def test_rollup_buckets_by_granularity(self):
+        self._seed()
+        rollup_range(self.day_start, self.day_start + timedelta(hours=2))
+
+        first_minute = AccessRollup.objects.get(
+            granularity=AccessRollup.GRANULARITY_MINUTE, bucket_start=self.day_start, route_name=""
+        )
+        self.assertEqual(first_minute.hits, 2)
+        self.assertEqual(first_minute.admin_hits, 2)
+        self.assertEqual(first_minute.unique_users, 1)
+        self.assertEqual(first_minute.unique_ips, 1)
+
+        hour = AccessRollup.objects.get(
+            granularity=AccessRollup.GRANULARITY_HOUR, bucket_start=self.day_start, route_name=""
+        )
+        self.assertEqual(hour.hits, 6)
+        self.assertEqual(hour.events, 3)
+        self.assertEqual(hour.site_hits, 4)
+        self.assertEqual(hour.unique_ips, 2)
+
+        self.assertTrue(
+            AccessRollup.objects.filter(
+                granularity=AccessRollup.GRANULARITY_HOUR,
+                bucket_start=self.day_start + timedelta(hours=1),
+                route_name="(sem rota)",
+            ).exists()
+        )
+        # Minutos sem acesso também ganham a linha total, marcando o progresso.
+        self.assertEqual(
+            AccessRollup.objects.filter(granularity=AccessRollup.GRANULARITY_MINUTE, route_name="").count(),
+            120,
+        )
+        self.assertEqual(
+            rolled_until(AccessRollup.GRANULARITY_MINUTE), self.day_start + timedelta(hours=2)
+        )
+
+    def test_rollup_is_idempotent(self):
+        self._seed()
+        window_end = self.day_start + timedelta(hours=2)
+        rollup_range(self.day_start, window_end)
+        before = AccessRollup.objects.count()
+
+        create_event(moment=self.day_start + timedelta(seconds=50), route_name="home", ip_address="10.0.0.9")
+        rollup_range(self.day_start, window_end)
+
+        self.assertEqual(AccessRollup.objects.count(), before)
+        hour = AccessRollup.objects.get(
+            granularity=AccessRollup.GRANULARITY_HOUR, bucket_start=self.day_start, route_name=""
+        )
+        self.assertEqual(hour.hits, 7)
+
+    def test_estimate_combines_rollups_and_raw_tail(self):
+        self._seed()
+        start = self.day_start - timedelta(seconds=30)
+        end = self.day_start + timedelta(hours=3)
+        raw = estimate_hits(start, end)
+
+        rollup_range(self.day_start, self.day_start + timedelta(minutes=30))
+        self.assertEqual(estimate_hits(start, end), raw)
+        self.assertEqual(raw, 7)
+
+
+class RollupAccessEventsCommandTests(TestCase):
+    def test_command_rolls_up_complete_buckets(self):
+        moment = timezone.now() - timedelta(hours=3)
+        create_event(moment=moment, route_name="home")
+        out = StringIO()
+
+        call_command("rollup_access_events", stdout=out)
+        self.assertIn("Consolidação concluída", out.getvalue())
+        total = sum(
+            AccessRollup.objects.filter(
+                granularity=AccessRollup.GRANULARITY_MINUTE, route_name=""
+            ).values_list("hits", flat=True)
+        )
+        self.assertEqual(total, 1)
+
+        out = StringIO()
+        call_command("rollup_access_events", stdout=out)
+        self.assertEqual(
+            AccessRollup.objects.filter(granularity=AccessRollup.GRANULARITY_MINUTE, hits__gt=0).count(),
+            2,
+        )
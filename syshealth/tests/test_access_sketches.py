@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from syshealth.hll import HyperLogLog
+from syshealth.models import AccessEvent, AccessRollup, AccessSketch
+from syshealth.rollups import rollup_range, truncate
+from syshealth.sketches import (
+    SketchAccumulator,
+    reset_accumulator,
+    unique_counts,
+    unique_visitors,
+)
+
+
+class HyperLogLogTests(SimpleTestCase):
+    def test_estimate_within_error(self):
+        for total in (10, 1000, 50_000):
+            sketch = HyperLogLog()
+            sketch.update(f"10.0.{index // 256}.{index % 256}-{index}" for index in range(total))
+            self.assertAlmostEqual(sketch.count(), total, delta=max(total * 0.05, 1))
+
+    def test_merge_is_union_and_idempotent(self):
+        first, second = HyperLogLog(), HyperLogLog()
+        first.update(str(index) for index in range(0, 6000))
+        second.update(str(index) for index in range(3000, 9000))
+        first.merge(second)
+        once = first.count()
+        first.merge(second)
+        self.assertEqual(first.count(), once)
+        self.assertAlmostEqual(once, 9000, delta=9000 * 0.05)
+
+    def test_serialization_is_compact(self):
+        sketch = HyperLogLog()
+        sketch.update(["a", "b", "c"])
+        data = sketch.to_bytes()
+        self.assertLess(len(data), 100)
+        self.assertEqual(HyperLogLog.from_bytes(data).count(), 3)
+
+
+class SketchAccumulatorFlushTests(SimpleTestCase):
+    def test_requests_never_flush_and_background_thread_does(self):
+        merged = threading.Event()
+        threads = []
+
+        def merge(*args):
+            threads.append(threading.current_thread())
+            merged.set()
+
+        accumulator = SketchAccumulator(flush_seconds=0.1, background=True)
+        self.addCleanup(accumulator.stop)
+        with mock.patch("syshealth.sketches._merge_into_row", side_effect=merge):
+            accumulator.add(AccessSketch.KIND_IP, "10.0.0.1")
+            self.assertTrue(merged.wait(5))
+        self.assertNotIn(threading.current_thread(), threads)
+
+    def test_database_errors_are_logged_once_per_interval(self):
+        accumulator = SketchAccumulator()
+        with mock.patch("syshealth.sketches._merge_into_row", side_effect=DatabaseError("fora do ar")):
+            with self.assertLogs("syshealth.sketches", "ERROR") as logs:
+                for _ in range(3):
+                    accumulator.add(AccessSketch.KIND_IP, "10.0.0.1")
+                    accumulator.flush()
+        self.assertEqual(len(logs.records), 1)
+        # Minuto, hora e dia continuam pendentes para o próximo flush.
+        self.assertEqual(len(accumulator._pending), 3)
+
+
+class AccessSketchTests(TestCase):
+    def setUp(self):
+        reset_accumulator()
+        self.addCleanup(reset_accumulator)
+        self.now = timezone.now()
+
+    def test_workers_merge_into_same_rows(self):
+        workers = [SketchAccumulator(flush_seconds=3600) for _ in range(2)]
+        for index in range(200):
+            workers[index % 2].add(AccessSketch.KIND_IP, f"10.0.0.{index % 150}", self.now)
+            workers[index % 2].add(AccessSketch.KIND_USER, str(index % 7), self.now)
+        for worker in workers:
+            worker.flush()
+        workers[0].flush()
+
+        self.assertEqual(AccessSketch.objects.filter(granularity=AccessRollup.GRANULARITY_MINUTE).count(), 2)
+        users, ips = unique_counts(self.now - timedelta(minutes=5), self.now + timedelta(seconds=1))
+        self.assertEqual(users, 7)
+        self.assertAlmostEqual(ips, 150, delta=5)
+        self.assertEqual(unique_visitors(self.now)["today"], users + ips)
+
+    def test_rollup_backfills_sketches_from_events(self):
+        moment = self.now - timedelta(hours=3)
+        for index in range(5):
+            AccessEvent.objects.create(
+                ip_address=f"10.1.0.{index}",
+                path="/",
+                created_date=timezone.localtime(moment).date(),
+                created_at=moment,
+            )
+        rollup_range(moment - timedelta(hours=1), self.now, granularities=[AccessRollup.GRANULARITY_HOUR])
+
+        bucket = truncate(moment, AccessRollup.GRANULARITY_HOUR)
+        row = AccessSketch.objects.get(granularity=AccessRollup.GRANULARITY_HOUR, bucket_start=bucket, kind="ip")
+        self.assertEqual(HyperLogLog.from_bytes(row.registers).count(), 5)
+
+    @override_settings(ACCESS_UNIQUE_COUNT_MODE="exact")
+    def test_exact_mode_counts_events(self):
+        for ip in ("10.2.0.1", "10.2.0.1", "10.2.0.2"):
+            AccessEvent.objects.create(ip_address=ip, path="/", created_date=self.now.date(), created_at=self.now)
+        self.assertEqual(unique_counts(self.now - timedelta(minutes=5), self.now + timedelta(seconds=1)), (0, 2))
+        self.assertFalse(AccessSketch.objects.exists())
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from syshealth.models import AccessEvent, AccessSettings
+from syshealth.presence import reset_presence_tracker
+from syshealth.result_cache import reset_counter_cache
+from syshealth.sketches import reset_accumulator
+from syshealth.stream import LiveFeed, format_sse, reset_live_feeds
+
+
+class LiveFeedTests(SimpleTestCase):
+    async def test_one_query_per_tick_for_all_subscribers(self):
+        calls = []
+
+        def producer(cursor):
+            calls.append(cursor)
+            return {"tick": len(calls)}, f"c{len(calls)}"
+
+        feed = LiveFeed(producer, interval=0.01)
+        queues = [feed.subscribe() for _ in range(3)]
+        messages = [await asyncio.wait_for(queue.get(), 1) for queue in queues]
+
+        self.assertEqual(messages, [format_sse({"tick": 1})] * 3)
+        self.assertEqual(calls[0], None)
+        self.assertLessEqual(len(calls), 2)
+        for queue in queues:
+            feed.unsubscribe(queue)
+        await asyncio.sleep(0.05)
+        self.assertTrue(feed._task.done())
+
+    async def test_slow_subscriber_drops_oldest(self):
+        feed = LiveFeed(lambda cursor: ({}, cursor), queue_size=2)
+        feed._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=2)
+        feed._subscribers.add(queue)
+        for index in range(3):
+            feed.publish({"n": index})
+        self.assertEqual([queue.get_nowait(), queue.get_nowait()], [format_sse({"n": 1}), format_sse({"n": 2})])
+        self.assertEqual(feed.dropped, 1)
+
+
+@override_settings(ACCESS_STREAM_INTERVAL_SECONDS=0.01, ACCESS_STREAM_MAX_SECONDS=2)
+class AccessDashboardStreamTests(TestCase):
+    def setUp(self):
+        AccessSettings.get_cached(force=True)
+        caches["default"].clear()
+        reset_counter_cache()
+        reset_accumulator()
+        reset_presence_tracker()
+        reset_live_feeds()
+        self.addCleanup(reset_live_feeds)
+        self.user = get_user_model().objects.create_user(username="streamer", password="x", is_staff=True)
+        self.user.user_permissions.add(
+            Permission.objects.get(content_type__app_label="ops", codename="view_access_dashboard")
+        )
+        self.async_client.force_login(self.user)
+        self.client.force_login(self.user)
+        self.url = reverse("admin:ops_access_dashboard_stream")
+
+    async def _messages(self, response, count):
+        messages = []
+        async for chunk in response.streaming_content:
+            for block in chunk.decode().split("\n\n"):
+                for line in block.splitlines():
+                    if line.startswith("data: "):
+                        messages.append(json.loads(line[len("data: "):]))
+            if len(messages) >= count:
+                break
+        await response.streaming_content.aclose()
+        return messages
+
+    async def test_streams_events_and_counters(self):
+        now = timezone.now()
+        await AccessEvent.objects.acreate(
+            ip_address="10.0.0.1", path="/stream/", created_date=now.date(), created_at=now
+        )
+
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        first = (await self._messages(response, 1))[0]
+        self.assertTrue(first["reset"])
+        self.assertEqual([event["path"] for event in first["events"]], ["/stream/"])
+        self.assertIn("online", first)
+
+    async def test_since_sends_catch_up_first(self):
+        now = timezone.now()
+        await AccessEvent.objects.acreate(ip_address="10.0.0.1", path="/a/", created_date=now.date(), created_at=now)
+        first = await self.async_client.get(reverse("admin:ops_access_dashboard_data"))
+        latest = first.json()["latest"]
+        await AccessEvent.objects.acreate(ip_address="10.0.0.1", path="/b/", created_date=now.date(), created_at=now)
+
+        response = await self.async_client.get(self.url, {"since": latest})
+        catch_up = (await self._messages(response, 1))[0]
+        self.assertFalse(catch_up["reset"])
+        self.assertEqual([event["path"] for event in catch_up["events"]], ["/b/"])
+
+    def test_wsgi_falls_back_to_polling(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 204)
+        dashboard = self.client.get(reverse("admin:ops_access_dashboard"))
+        self.assertEqual(dashboard.context["stream_url"], "")
+
+    def test_requires_permission(self):
+        self.client.force_login(get_user_model().objects.create_user(username="nope", password="x", is_staff=True))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
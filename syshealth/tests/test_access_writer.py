@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from django.db import IntegrityError, OperationalError
+from django.test import SimpleTestCase, TestCase
+
+from syshealth.dimensions import get_cache
+from syshealth.models import AccessEvent, AccessPath
+from syshealth.tests.helpers import FakeClock, build_event
+from syshealth.writer import (
+    AccessEventWriter,
+    BufferedAccessEventWriter,
+    ThreadedAccessEventWriter,
+)
+
+
+class BufferedAccessEventWriterTests(SimpleTestCase):
+    def setUp(self):
+        self.batches = []
+        self.clock = FakeClock()
+
+    def _writer(self, **kwargs) -> BufferedAccessEventWriter:
+        kwargs.setdefault("persist", lambda batch: self.batches.append(list(batch)))
+        kwargs.setdefault("clock", self.clock)
+        return BufferedAccessEventWriter(**kwargs)
+
+    def test_flushes_when_batch_size_reached(self):
+        writer = self._writer(batch_size=3, max_age=60)
+        writer.write(build_event())
+        writer.write(build_event())
+        self.assertEqual(self.batches, [])
+
+        writer.write(build_event())
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(len(self.batches[0]), 3)
+        self.assertEqual(writer.stats.flushed, 3)
+        self.assertEqual(writer.pending(), 0)
+
+    def test_flushes_when_oldest_event_expires(self):
+        writer = self._writer(batch_size=100, max_age=2)
+        writer.write(build_event())
+        self.clock.value = 2.5
+        writer.write(build_event())
+        self.assertEqual([len(batch) for batch in self.batches], [2])
+
+    def test_timer_flushes_old_events_without_new_requests(self):
+        writer = self._writer(batch_size=100, max_age=0.1, clock=time.monotonic)
+        self.addCleanup(writer.close)
+        writer.write(build_event())
+        deadline = time.monotonic() + 5
+        while not self.batches and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual([len(batch) for batch in self.batches], [1])
+
+    def test_drops_events_above_buffer_limit(self):
+        writer = self._writer(batch_size=2, max_age=60, buffer_limit=2)
+        writer._flush_lock.acquire()
+        try:
+            for _ in range(4):
+                writer.write(build_event())
+        finally:
+            writer._flush_lock.release()
+        self.assertEqual(writer.stats.dropped, 2)
+        self.assertEqual(writer.pending(), 2)
+
+    def test_counts_failed_batches(self):
+        def failing(batch):
+            raise OperationalError("database is locked")
+
+        writer = self._writer(batch_size=2, max_age=60, persist=failing)
+        with self.assertLogs("syshealth.writer", level="ERROR"):
+            writer.write(build_event())
+            writer.write(build_event())
+        self.assertEqual(writer.stats.failed, 2)
+        self.assertEqual(writer.stats.flushed, 0)
+
+    def test_integrity_errors_forget_cached_dimension_ids(self):
+        def failing(batch):
+            raise IntegrityError("FOREIGN KEY constraint failed")
+
+        cache = get_cache(AccessPath)
+        cache._remember({"/removido/": 999})
+        self.addCleanup(cache.clear)
+        writer = self._writer(batch_size=1, max_age=60, persist=failing)
+        with self.assertLogs("syshealth.writer", level="ERROR"):
+            writer.write(build_event("/removido/"))
+        self.assertIsNone(cache.get("/removido/"))
+
+    def test_close_flushes_pending_events(self):
+        writer = self._writer(batch_size=10, max_age=60)
+        writer.write(build_event())
+        writer.close()
+        self.assertEqual([len(batch) for batch in self.batches], [1])
+        snapshot = writer.snapshot()
+        self.assertEqual(snapshot["mode"], "buffered")
+        self.assertEqual(snapshot["flushed"], 1)
+
+
+class ThreadedAccessEventWriterTests(SimpleTestCase):
+    def setUp(self):
+        self.batches = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def _blocking_persist(self, batch):
+        self.entered.set()
+        self.release.wait(5)
+        self.batches.append([event.path for event in batch])
+
+    def _writer(self, **kwargs) -> ThreadedAccessEventWriter:
+        writer = ThreadedAccessEventWriter(persist=self._blocking_persist, **kwargs)
+        self.addCleanup(writer.close)
+        self.addCleanup(self.release.set)
+        # O primeiro evento fica preso na thread para que a fila possa encher.
+        writer.write(build_event("/first/"))
+        self.assertTrue(self.entered.wait(5))
+        return writer
+
+    def test_drop_newest_discards_incoming_event(self):
+        writer = self._writer(queue_size=2, overflow="drop_newest")
+        for path in ("/a/", "/b/", "/c/"):
+            writer.write(build_event(path))
+
+        self.assertEqual(writer.stats.dropped_newest, 1)
+        self.release.set()
+        writer.close()
+        self.assertEqual(sum(self.batches, []), ["/first/", "/a/", "/b/"])
+
+    def test_drop_oldest_discards_queued_event(self):
+        writer = self._writer(queue_size=2, overflow="drop_oldest")
+        for path in ("/a/", "/b/", "/c/"):
+            writer.write(build_event(path))
+
+        self.assertEqual(writer.stats.dropped_oldest, 1)
+        self.release.set()
+        writer.close()
+        self.assertEqual(sum(self.batches, []), ["/first/", "/b/", "/c/"])
+
+    def test_block_waits_then_drops(self):
+        writer = self._writer(queue_size=1, overflow="block", block_timeout=0.01)
+        writer.write(build_event("/a/"))
+        writer.write(build_event("/b/"))
+
+        snapshot = writer.snapshot()
+        self.assertEqual(snapshot["dropped"], 1)
+        self.assertEqual(snapshot["queue_size"], 1)
+        self.assertEqual(snapshot["overflow"], "block")
+
+    def test_rejects_unknown_overflow_policy(self):
+        with self.assertRaises(ValueError):
+            ThreadedAccessEventWriter(overflow="random")
+
+
+class AccessEventWriterPersistTests(TestCase):
+    def test_sync_writer_saves_immediately(self):
+        writer = AccessEventWriter()
+        writer.write(build_event("/sync/"))
+        self.assertTrue(AccessEvent.objects.filter(path_ref__value="/sync/").exists())
+
+    def test_buffered_writer_uses_bulk_create(self):
+        writer = BufferedAccessEventWriter(batch_size=2, max_age=60)
+        writer.write(build_event("/a/"))
+        self.assertFalse(AccessEvent.objects.exists())
+        writer.write(build_event("/b/"))
+        self.assertEqual(AccessEvent.objects.count(), 2)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase
+
+from syshealth.matching import PathMatcher, UserAgentMatcher
+from syshealth.models import AccessSettings
+
+
+class PathMatcherTests(SimpleTestCase):
+    def test_prefix_entries(self):
+        matcher = PathMatcher(["/static/", "/media/*", "/admin/jsi18n/"])
+        self.assertTrue(matcher.matches("/static/app.css"))
+        self.assertTrue(matcher.matches("/media/photo.webp"))
+        self.assertTrue(matcher.matches("/admin/jsi18n/"))
+        self.assertFalse(matcher.matches("/admin/"))
+        self.assertFalse(matcher.matches("/site/static/"))
+
+    def test_shorter_prefix_wins_over_longer(self):
+        matcher = PathMatcher(["/admin/ops/access-dashboard", "/admin/ops/"])
+        self.assertTrue(matcher.matches("/admin/ops/other"))
+        self.assertTrue(matcher.matches("/admin/ops/access-dashboard.json"))
+
+    def test_glob_entries_match_whole_path(self):
+        matcher = PathMatcher(["/media/*.jpg", "/api/?/ping"])
+        self.assertTrue(matcher.matches("/media/a/b.jpg"))
+        self.assertFalse(matcher.matches("/media/a/b.jpg.html"))
+        self.assertTrue(matcher.matches("/api/1/ping"))
+        self.assertFalse(matcher.matches("/api/12/ping"))
+
+    def test_regex_entries(self):
+        matcher = PathMatcher(["re:/api/v[0-9]+/health", "re:[invalid"])
+        self.assertTrue(matcher.matches("/api/v2/health/"))
+        self.assertFalse(matcher.matches("/x/api/v2/health"))
+        self.assertEqual(matcher.invalid, ["re:[invalid"])
+
+    def test_regex_flags_and_backreferences_stay_per_entry(self):
+        matcher = PathMatcher(["/static/", "re:(?i)/admin", r"re:/(\w+)/\1/"])
+        self.assertEqual(matcher.invalid, [])
+        self.assertTrue(matcher.matches("/ADMIN/login/"))
+        self.assertTrue(matcher.matches("/eco/eco/"))
+        self.assertFalse(matcher.matches("/eco/outro/"))
+
+    def test_star_alone_ignores_everything(self):
+        self.assertTrue(PathMatcher(["*"]).matches("/anything/"))
+
+    def test_empty_matcher(self):
+        self.assertFalse(PathMatcher([]).matches("/"))
+
+
+class UserAgentMatcherTests(SimpleTestCase):
+    def test_matches_any_substring_case_insensitive(self):
+        matcher = UserAgentMatcher(["GoogleBot", "ahrefs", "curl/"])
+        self.assertTrue(matcher.matches("Mozilla/5.0 (compatible; Googlebot/2.1)"))
+        self.assertTrue(matcher.matches("Mozilla/5.0 (compatible; AhrefsBot/7.0)"))
+        self.assertTrue(matcher.matches("curl/8.4.0"))
+        self.assertFalse(matcher.matches("Mozilla/5.0 (X11; Linux x86_64) Firefox/128.0"))
+        self.assertFalse(matcher.matches(""))
+
+    def test_overlapping_patterns(self):
+        matcher = UserAgentMatcher(["bot", "robot", "abcd"])
+        self.assertTrue(matcher.matches("xxrobo-bot"))
+        self.assertTrue(matcher.matches("abcabcd"))
+        self.assertFalse(matcher.matches("abcab"))
+
+    def test_verdicts_are_cached(self):
+        matcher = UserAgentMatcher(["spider"])
+        for _ in range(3):
+            matcher.matches("Some Spider 1.0")
+        info = matcher.cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 2)
+
+    def test_empty_matcher(self):
+        self.assertFalse(UserAgentMatcher([]).matches("googlebot"))
+
+
+class AccessSettingsMatcherTests(SimpleTestCase):
+    def test_matcher_is_compiled_once(self):
+        settings = AccessSettings(ignore_paths=["/static/"])
+        matcher = settings.path_matcher
+        self.assertTrue(settings.should_ignore_path("/static/x.css"))
+        self.assertIs(settings.path_matcher, matcher)
+
+        settings.ignore_paths = ["/other/"]
+        settings.compile_matchers()
+        self.assertFalse(settings.should_ignore_path("/static/x.css"))
+        self.assertTrue(settings.should_ignore_path("/other/"))
+
+    def test_clean_rejects_invalid_regex(self):
+        settings = AccessSettings(ignore_paths=["re:(unclosed"])
+        with self.assertRaises(ValidationError):
+            settings.clean()
+
+    def test_known_crawlers_toggle(self):
+        settings = AccessSettings(ignored_user_agents=["MyMonitor"], ignore_known_crawlers=True)
+        self.assertTrue(settings.should_ignore_user_agent("Mozilla/5.0 (compatible; bingbot/2.0)"))
+        self.assertTrue(settings.should_ignore_user_agent("MyMonitor/1.0"))
+
+        settings.ignore_known_crawlers = False
+        settings.compile_matchers()
+        self.assertFalse(settings.should_ignore_user_agent("Mozilla/5.0 (compatible; bingbot/2.0)"))
+        self.assertTrue(settings.should_ignore_user_agent("MyMonitor/1.0"))
+
+    def test_known_crawlers_spare_real_browsers_and_apps(self):
+        settings = AccessSettings(ignore_known_crawlers=True)
+        for user_agent in (
+            "Mozilla/5.0 (Linux; Android 13; SM-A546E) AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/120.0 Mobile Safari/537.36 NAVER(inapp; search; 1000; 11.23.5)",
+            "WhatsApp/2.23.20.0 A",
+            "okhttp/4.12.0",
+            "Java/17.0.2",
+            "MyApp/3.1 (+https://example.com/app; iPhone)",
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/120.0 Safari/537.36 SE 2.X MetaSr 1.0 Sogou",
+        ):
+            self.assertFalse(settings.should_ignore_user_agent(user_agent), user_agent)
+        self.assertTrue(settings.should_ignore_user_agent("Sogou web spider/4.0"))
+
+    def test_known_crawlers_are_opt_in(self):
+        self.assertFalse(AccessSettings().ignore_known_crawlers)
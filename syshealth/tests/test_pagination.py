@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from syshealth.models import AccessEvent
+from syshealth.pagination import decode_cursor, encode_cursor, events_since, keyset_page
+
+
+class CursorTokenTests(SimpleTestCase):
+    def test_roundtrip(self):
+        moment = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(moment, 42)), (moment, 42))
+
+    def test_invalid_tokens_are_ignored(self):
+        for token in ("", "???", "bm90LWEtY3Vyc29y", None):
+            self.assertIsNone(decode_cursor(token))
+
+
+class KeysetPageTests(TestCase):
+    def setUp(self):
+        base = timezone.now() - timedelta(minutes=1)
+        # Vários eventos no mesmo instante: o desempate é pelo pk.
+        for index in range(23):
+            moment = base + timedelta(seconds=index // 3)
+            AccessEvent.objects.create(
+                ip_address="10.0.0.1",
+                path=f"/{index}/",
+                created_date=timezone.localtime(moment).date(),
+                created_at=moment,
+            )
+        self.expected = list(AccessEvent.objects.order_by("-created_at", "-pk").values_list("pk", flat=True))
+
+    def test_walks_older_and_back(self):
+        qs = AccessEvent.objects.all()
+        seen, pages, before = [], [], None
+        while True:
+            page = keyset_page(qs, before=before, size=5)
+            seen.extend(event.pk for event in page)
+            pages.append(page)
+            if not page.has_older:
+                break
+            before = page.before
+        self.assertEqual(seen, self.expected)
+        self.assertFalse(pages[0].has_newer)
+        self.assertTrue(pages[-1].has_newer)
+
+        previous = keyset_page(qs, after=pages[-1].after, size=5)
+        self.assertEqual([event.pk for event in previous], [event.pk for event in pages[-2]])
+
+    def test_deep_pages_skip_count_and_offset(self):
+        page = keyset_page(AccessEvent.objects.all(), size=5)
+        for _ in range(3):
+            page = keyset_page(AccessEvent.objects.all(), before=page.before, size=5)
+
+        with CaptureQueriesContext(connection) as queries:
+            keyset_page(AccessEvent.objects.all(), before=page.before, size=5)
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]["sql"].upper()
+        self.assertNotIn("OFFSET", sql)
+        self.assertNotIn("COUNT(", sql)
+
+    def test_delta_includes_events_written_late(self):
+        head = keyset_page(AccessEvent.objects.all(), size=5).head
+        # Gravado agora (pk maior) com o instante de um acesso de um minuto atrás,
+        # como um lote do writer em buffer.
+        old_moment = timezone.now() - timedelta(minutes=2)
+        late = AccessEvent.objects.create(
+            ip_address="10.0.0.2",
+            path="/atrasado/",
+            created_date=timezone.localtime(old_moment).date(),
+            created_at=old_moment,
+        )
+
+        events, reset, latest = events_since(AccessEvent.objects.all(), head)
+        self.assertEqual([event.pk for event in events], [late.pk])
+        self.assertFalse(reset)
+        self.assertEqual(events_since(AccessEvent.objects.all(), latest)[0], [])
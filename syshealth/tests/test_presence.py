@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from syshealth.middleware import AccessLogMiddleware
+from syshealth.models import AccessEvent, AccessSettings
+from syshealth.presence import (
+    KIND_IP,
+    KIND_USER,
+    SOURCE_EVENTS,
+    SOURCE_PRESENCE,
+    PresenceTracker,
+    online_counts,
+    online_source,
+    reset_presence_tracker,
+)
+from syshealth.sketches import reset_accumulator
+from syshealth.writer import DisabledAccessEventWriter
+
+MINUTE = 60.0
+START = 1_700_000_000.0
+
+
+class PresenceTrackerTests(SimpleTestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.addCleanup(caches["default"].clear)
+        self.tracker = PresenceTracker()
+
+    def test_each_identity_counted_once_in_window(self):
+        for offset in range(4):
+            self.tracker.touch(KIND_USER, "1", 5, now=START + offset * MINUTE)
+        self.tracker.touch(KIND_USER, "2", 5, now=START + 2 * MINUTE)
+        self.assertEqual(self.tracker.count(KIND_USER, 5, now=START + 3 * MINUTE), 2)
+
+    def test_identity_leaves_after_window(self):
+        self.tracker.touch(KIND_IP, "10.0.0.1", 5, now=START)
+        self.assertEqual(self.tracker.count(KIND_IP, 5, now=START + 4 * MINUTE), 1)
+        self.assertEqual(self.tracker.count(KIND_IP, 5, now=START + 5 * MINUTE), 0)
+
+    def test_workers_share_the_cache(self):
+        other_worker = PresenceTracker()
+        self.tracker.touch(KIND_USER, "7", 5, now=START)
+        other_worker.touch(KIND_USER, "7", 5, now=START + 1)
+        other_worker.touch(KIND_USER, "7", 5, now=START + MINUTE)
+        self.tracker.touch(KIND_USER, "8", 5, now=START + MINUTE)
+        self.assertEqual(other_worker.count(KIND_USER, 5, now=START + MINUTE), 2)
+
+    def test_count_reads_fixed_number_of_keys(self):
+        for index in range(500):
+            self.tracker.touch(KIND_IP, f"10.0.{index // 250}.{index % 250}", 5, now=START)
+        with mock.patch.object(caches["default"], "get_many", wraps=caches["default"].get_many) as get_many:
+            self.assertEqual(self.tracker.count(KIND_IP, 5, now=START), 500)
+        get_many.assert_called_once()
+        self.assertEqual(len(get_many.call_args.args[0]), 5)
+
+
+class OnlineSourceTests(SimpleTestCase):
+    @override_settings(ACCESS_ONLINE_SOURCE="")
+    def test_default_needs_a_shared_cache(self):
+        # Os testes usam o LocMemCache padrão, que é por processo.
+        self.assertEqual(online_source(), SOURCE_EVENTS)
+        with mock.patch("syshealth.presence.cache_is_shared", return_value=True):
+            self.assertEqual(online_source(), SOURCE_PRESENCE)
+
+    @override_settings(ACCESS_ONLINE_SOURCE="presence")
+    def test_explicit_choice_wins(self):
+        self.assertEqual(online_source(), SOURCE_PRESENCE)
+
+
+@override_settings(ACCESS_ONLINE_SOURCE="presence")
+class PresenceMiddlewareTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        reset_presence_tracker()
+        self.addCleanup(reset_presence_tracker)
+        self.addCleanup(reset_accumulator)
+        self.settings = AccessSettings.get_cached(force=True)
+        self.factory = RequestFactory()
+
+    def test_counts_online_with_sampling_and_persistence_disabled(self):
+        self.settings.sampling_ratio = 50
+        self.settings.save()
+        middleware = AccessLogMiddleware(lambda request: HttpResponse("ok"), writer=DisabledAccessEventWriter())
+        for index in range(30):
+            request = self.factory.get("/site/")
+            request.user = AnonymousUser()
+            request.META["REMOTE_ADDR"] = f"10.9.0.{index}"
+            middleware(request)
+
+        self.assertFalse(AccessEvent.objects.exists())
+        self.assertEqual(online_counts(self.settings.online_window_minutes), (0, 30))
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from syshealth.result_cache import ResultCache
+
+
+class ResultCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.addCleanup(caches["default"].clear)
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return {"value": self.calls}
+
+    def test_hit_within_ttl(self):
+        cache = ResultCache(ttl=60)
+        self.assertEqual(cache.get_or_compute("k", self.compute), {"value": 1})
+        self.assertEqual(cache.get_or_compute("k", self.compute), {"value": 1})
+        self.assertEqual(self.calls, 1)
+        stats = cache.snapshot()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 50.0)
+
+    def test_serves_stale_while_another_worker_recomputes(self):
+        cache = ResultCache(ttl=60, stale=60)
+        cache.get_or_compute("k", self.compute)
+        with mock.patch("syshealth.result_cache.time.time", return_value=time.time() + 61):
+            # Outro worker está com o lock: este responde com o valor antigo.
+            caches["default"].add("syshealth:result:k:lock", 1)
+            self.assertEqual(cache.get_or_compute("k", self.compute), {"value": 1})
+            caches["default"].delete("syshealth:result:k:lock")
+            self.assertEqual(cache.get_or_compute("k", self.compute), {"value": 2})
+        self.assertEqual(cache.snapshot()["stale"], 1)
+
+    def test_single_flight_on_cold_cache(self):
+        cache = ResultCache(ttl=60)
+        started = threading.Event()
+
+        def slow_compute():
+            started.set()
+            time.sleep(0.2)
+            return self.compute()
+
+        results = []
+        first = threading.Thread(target=lambda: results.append(cache.get_or_compute("k", slow_compute)))
+        first.start()
+        started.wait(1)
+        results.append(cache.get_or_compute("k", slow_compute))
+        first.join()
+
+        self.assertEqual(results, [{"value": 1}, {"value": 1}])
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(cache.snapshot()["waits"], 1)
+
+    def test_zero_ttl_disables_cache(self):
+        cache = ResultCache(ttl=0)
+        cache.get_or_compute("k", self.compute)
+        cache.get_or_compute("k", self.compute)
+        self.assertEqual(self.calls, 2)
+
+    def test_slow_recompute_keeps_the_lock_of_another_worker(self):
+        cache = ResultCache(ttl=60)
+        lock_key = "syshealth:result:k:lock"
+
+        def slow_compute():
+            # O lock deste worker expirou e outro worker pegou um novo.
+            caches["default"].set(lock_key, "outro-worker")
+            return self.compute()
+
+        cache.get_or_compute("k", slow_compute)
+        self.assertEqual(caches["default"].get(lock_key), "outro-worker")
+
+    def test_reports_process_local_cache(self):
+        self.assertFalse(ResultCache().snapshot()["shared"])
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.utils import timezone
+
+from syshealth.middleware import AccessLogMiddleware
+from syshealth.models import AccessEvent, AccessSettings
+from syshealth.sampling import AdaptiveSampler, session_fraction
+from syshealth.rollups import estimate_hits
+from syshealth.sketches import reset_accumulator
+from syshealth.tests.helpers import FakeClock
+from syshealth.writer import AccessEventWriter
+
+
+class AdaptiveSamplerTests(SimpleTestCase):
+    def test_rare_routes_are_always_kept(self):
+        sampler = AdaptiveSampler(clock=FakeClock())
+        for _ in range(5):
+            self.assertEqual(sampler.probability("admin:index", max_rate=5), 1.0)
+
+    def test_hot_routes_are_capped(self):
+        clock = FakeClock()
+        sampler = AdaptiveSampler(clock=clock)
+        probabilities = [sampler.probability("home", max_rate=10) for _ in range(100)]
+        self.assertEqual(probabilities[9], 1.0)
+        self.assertAlmostEqual(probabilities[-1], 0.1)
+        self.assertEqual(sampler.probability("other", max_rate=10), 1.0)
+
+    def test_previous_window_decays(self):
+        clock = FakeClock()
+        sampler = AdaptiveSampler(clock=clock)
+        for _ in range(100):
+            sampler.probability("home", max_rate=10)
+
+        clock.value += 1.5
+        # Metade da janela anterior ainda conta: 50 + 1 eventos/s estimados.
+        self.assertAlmostEqual(sampler.probability("home", max_rate=10), 10 / 51)
+
+        clock.value += 5
+        self.assertEqual(sampler.probability("home", max_rate=10), 1.0)
+
+    def test_session_fraction_is_stable(self):
+        self.assertEqual(session_fraction("s:abc"), session_fraction("s:abc"))
+        self.assertNotEqual(session_fraction("s:abc"), session_fraction("s:abd"))
+        self.assertTrue(0 <= session_fraction("ip:10.0.0.1") < 1)
+
+
+class SampledLoggingTests(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_accumulator)
+        self.settings = AccessSettings.get_cached(force=True)
+        self.factory = RequestFactory()
+        self.persisted = []
+        self.middleware = AccessLogMiddleware(
+            lambda request: HttpResponse("ok"),
+            writer=AccessEventWriter(persist=self.persisted.extend),
+        )
+
+    def _hit(self, ip: str) -> None:
+        request = self.factory.get("/site/")
+        request.user = AnonymousUser()
+        request.META["REMOTE_ADDR"] = ip
+        self.middleware(request)
+
+    def test_ratio_keeps_whole_sessions_with_weight(self):
+        self.settings.sampling_ratio = 4
+        self.settings.save()
+
+        ips = [f"10.0.{index // 250}.{index % 250}" for index in range(400)]
+        for ip in ips:
+            self._hit(ip)
+            self._hit(ip)
+
+        kept = {event.ip_address for event in self.persisted}
+        self.assertEqual(len(self.persisted), 2 * len(kept))
+        self.assertTrue(60 < len(kept) < 140)
+        self.assertTrue(all(event.sample_weight == 4.0 for event in self.persisted))
+
+    def test_adaptive_sampling_caps_hot_route(self):
+        self.settings.adaptive_sampling = True
+        self.settings.sampling_max_events_per_second = 10
+        self.settings.save()
+
+        for index in range(300):
+            self._hit(f"10.1.{index // 250}.{index % 250}")
+
+        self.assertLess(len(self.persisted), 100)
+        estimate = sum(event.sample_weight for event in self.persisted)
+        self.assertTrue(150 < estimate < 600)
+
+    def test_dashboard_count_uses_weights(self):
+        now = timezone.localtime()
+        AccessEvent.objects.create(
+            ip_address="10.0.0.1",
+            path="/",
+            created_date=now.date(),
+            created_time=now.time().replace(microsecond=0),
+            sample_weight=2.5,
+        )
+        AccessEvent.objects.create(
+            ip_address="10.0.0.2",
+            path="/",
+            created_date=now.date(),
+            created_time=now.time().replace(microsecond=0),
+            sample_weight=2.5,
+        )
+        window = timedelta(minutes=1)
+        self.assertEqual(estimate_hits(now - window, now + window), 5)
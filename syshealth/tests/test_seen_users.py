@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import caches
+from django.db import DatabaseError, connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from syshealth.models import AccessEvent, AccessSeenUser
+from syshealth.presence import reset_presence_tracker
+from syshealth.result_cache import reset_counter_cache
+from syshealth.seen_users import SeenUsersIndex, reset_seen_users_index, suggest_users
+from syshealth.sketches import reset_accumulator
+from syshealth.tests.helpers import build_event
+from syshealth.writer import AccessEventWriter, persist_events
+
+User = get_user_model()
+
+
+class SeenUsersIndexTests(TestCase):
+    def setUp(self):
+        reset_seen_users_index()
+        self.addCleanup(reset_seen_users_index)
+        self.now = timezone.now()
+        self.alice = User.objects.create_user(username="alice", password="x")
+        self.bob = User.objects.create_user(username="bob", password="x")
+
+    def test_writer_records_users_of_each_batch(self):
+        persist_events([build_event(moment=self.now, user=self.alice), build_event(moment=self.now)])
+        persist_events(
+            [
+                build_event(moment=self.now, user=self.bob),
+                build_event(moment=self.now + timedelta(minutes=1), user=self.alice),
+            ]
+        )
+
+        rows = {row.user_id: row for row in AccessSeenUser.objects.all()}
+        self.assertEqual(set(rows), {self.alice.pk, self.bob.pk})
+        self.assertEqual(rows[self.alice.pk].first_seen_at, self.now)
+        self.assertEqual(rows[self.alice.pk].last_seen_at, self.now + timedelta(minutes=1))
+
+    def test_recent_users_skip_the_database(self):
+        index = SeenUsersIndex(refresh_seconds=300)
+        with self.captureOnCommitCallbacks(execute=True):
+            index.record([build_event(moment=self.now, user=self.alice)])
+        with self.assertNumQueries(0):
+            index.record([build_event(moment=self.now + timedelta(seconds=30), user=self.alice)])
+        # INSERT e UPDATE, entre SAVEPOINT e RELEASE (o TestCase já roda numa transação).
+        with self.assertNumQueries(4):
+            index.record([build_event(moment=self.now + timedelta(minutes=10), user=self.alice)])
+        self.assertEqual(AccessSeenUser.objects.get().last_seen_at, self.now + timedelta(minutes=10))
+
+    def test_replayed_old_events_do_not_move_last_seen_back(self):
+        index = SeenUsersIndex(refresh_seconds=0)
+        index.record([build_event(moment=self.now, user=self.alice)])
+        index.record([build_event(moment=self.now - timedelta(days=2), user=self.alice)])
+        self.assertEqual(AccessSeenUser.objects.get().last_seen_at, self.now)
+
+    def test_seen_user_errors_do_not_fail_the_event_batch(self):
+        writer = AccessEventWriter()
+        writer.journal = mock.Mock()
+        with mock.patch.object(SeenUsersIndex, "_write", side_effect=DatabaseError("locked")):
+            with self.assertLogs("syshealth.seen_users", "ERROR"):
+                writer.write(build_event(moment=self.now, user=self.alice))
+
+        self.assertEqual(AccessEvent.objects.count(), 1)
+        self.assertEqual(writer.stats.flushed, 1)
+        writer.journal.append.assert_not_called()
+
+    def test_seen_user_errors_keep_the_enclosing_transaction_usable(self):
+        AccessSeenUser.objects.create(user=self.bob, first_seen_at=self.now, last_seen_at=self.now)
+
+        def fail_in_the_database(stale, using):
+            # Viola o NOT NULL no próprio banco, como um lock ou disco cheio faria.
+            AccessSeenUser.objects.using(using).update(last_seen_at=None)
+
+        with transaction.atomic():
+            with mock.patch.object(SeenUsersIndex, "_write", side_effect=fail_in_the_database):
+                with self.assertLogs("syshealth.seen_users", "ERROR"):
+                    AccessEvent.objects.bulk_create([build_event(moment=self.now, user=self.alice)])
+            self.assertEqual(AccessEvent.objects.count(), 1)
+
+    def test_suggestions_match_username_most_recent_first(self):
+        persist_events(
+            [
+                build_event(moment=self.now - timedelta(hours=1), user=self.alice),
+                build_event(moment=self.now, user=self.bob),
+            ]
+        )
+        self.assertEqual([row["username"] for row in suggest_users("")], ["bob", "alice"])
+        self.assertEqual([row["username"] for row in suggest_users("LIC")], ["alice"])
+
+
+class SeenUsersDashboardTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        reset_counter_cache()
+        reset_accumulator()
+        reset_presence_tracker()
+        reset_seen_users_index()
+        self.addCleanup(reset_seen_users_index)
+        self.client = Client()
+        self.viewer = User.objects.create_user(username="viewer", password="x", is_staff=True)
+        self.viewer.user_permissions.add(
+            Permission.objects.get(content_type__app_label="ops", codename="view_access_dashboard"),
+            Permission.objects.get(content_type__app_label="ops", codename="view_access_event"),
+        )
+        self.client.force_login(self.viewer)
+        self.now = timezone.now()
+        self.alice = User.objects.create_user(username="alice", password="x")
+        persist_events([build_event("/alice/", self.now, user=self.alice), build_event("/anon/", self.now)])
+
+    def test_autocomplete_returns_seen_users(self):
+        response = self.client.get(reverse("admin:ops_access_dashboard_users"), {"q": "ali"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["username"] for row in response.json()["results"]], ["alice"])
+
+    def test_autocomplete_requires_permission(self):
+        outsider = User.objects.create_user(username="outsider", password="x", is_staff=True)
+        self.client.force_login(outsider)
+        response = self.client.get(reverse("admin:ops_access_dashboard_users"))
+        self.assertEqual(response.status_code, 403)
+
+    def test_endpoints_do_not_scan_events_for_users(self):
+        for name in ("admin:ops_access_dashboard", "admin:ops_access_dashboard_data"):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse([query["sql"] for query in queries if "DISTINCT" in query["sql"].upper()])
+
+    def test_filter_by_username(self):
+        data = self.client.get(reverse("admin:ops_access_dashboard_data"), {"user": "alice"}).json()
+        self.assertEqual([event["path"] for event in data["events"]], ["/alice/"])
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from io import StringIO
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+
+from syshealth.sqlite_tuning import apply_pragmas, configured_pragmas, effective_pragmas
+
+
+class ConfiguredPragmasTests(SimpleTestCase):
+    @override_settings(SQLITE_JOURNAL_MODE="", SQLITE_MMAP_SIZE="", SQLITE_TEMP_STORE="memory")
+    def test_empty_values_keep_sqlite_default(self):
+        names = [name for name, _ in configured_pragmas()]
+        self.assertEqual(names, ["busy_timeout", "synchronous", "cache_size", "temp_store"])
+
+    @override_settings(SQLITE_SYNCHRONOUS="NORMAL; DROP TABLE x")
+    def test_rejects_values_that_are_not_a_single_word(self):
+        with self.assertRaises(ImproperlyConfigured):
+            configured_pragmas()
+
+
+class ApplyPragmasTests(SimpleTestCase):
+    # Fora de transação: PRAGMA synchronous não muda dentro de uma.
+    databases = {"default"}
+
+    @override_settings(SQLITE_BUSY_TIMEOUT_MS="1234", SQLITE_CACHE_SIZE="-4000", SQLITE_TEMP_STORE="FILE")
+    def test_applied_values_are_reported(self):
+        self.addCleanup(apply_pragmas, connection)
+        apply_pragmas(connection)
+
+        effective = effective_pragmas(connection)
+        self.assertEqual(effective["busy_timeout"], "1234")
+        self.assertEqual(effective["cache_size"], "-4000")
+        self.assertEqual(effective["temp_store"], "FILE")
+        self.assertEqual(effective["synchronous"], "NORMAL")
+
+    def test_command_reports_and_checks_pragmas(self):
+        out = StringIO()
+        call_command("ops_sqlite_pragmas", stdout=out)
+        self.assertIn("busy_timeout", out.getvalue())
+        self.assertIn("SQLITE_JOURNAL_MODE", out.getvalue())
+
+        # O banco de testes fica em memória, onde WAL não se aplica.
+        with self.assertRaisesMessage(CommandError, "journal_mode"):
+            call_command("ops_sqlite_pragmas", "--check", stdout=StringIO())
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.db import connections
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from syshealth.export import export_rows
+from syshealth.models import AccessEvent, AccessSeenUser, AccessSettings
+from syshealth.routers import TELEMETRY_DB_ALIAS, TelemetryRouter
+
+
+class TelemetryRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = TelemetryRouter()
+        patcher = mock.patch("syshealth.routers.telemetry_enabled", return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_routes_telemetry_models(self):
+        self.assertEqual(self.router.db_for_write(AccessEvent), TELEMETRY_DB_ALIAS)
+        self.assertEqual(self.router.db_for_read(AccessSettings), TELEMETRY_DB_ALIAS)
+        self.assertIsNone(self.router.db_for_read(AccessSeenUser))
+        self.assertIsNone(self.router.db_for_read(get_user_model()))
+
+    def test_related_user_is_read_from_default(self):
+        event = AccessEvent()
+        self.assertEqual(self.router.db_for_read(get_user_model(), instance=event), "default")
+        self.assertTrue(self.router.allow_relation(event, get_user_model()()))
+
+    def test_migrations_follow_the_router(self):
+        self.assertTrue(self.router.allow_migrate(TELEMETRY_DB_ALIAS, "syshealth", "accessevent"))
+        self.assertFalse(self.router.allow_migrate("default", "syshealth", "accessrollup"))
+        self.assertTrue(self.router.allow_migrate("default", "syshealth", "accessseenuser"))
+        self.assertFalse(self.router.allow_migrate(TELEMETRY_DB_ALIAS, "auth", "user"))
+        self.assertFalse(self.router.allow_migrate(TELEMETRY_DB_ALIAS, "contenttypes"))
+        self.assertIsNone(self.router.allow_migrate(TELEMETRY_DB_ALIAS, "syshealth"))
+
+    def test_disabled_without_alias(self):
+        with mock.patch("syshealth.routers.telemetry_enabled", return_value=False):
+            self.assertIsNone(self.router.db_for_write(AccessEvent))
+            self.assertIsNone(self.router.allow_migrate("default", "syshealth", "accessevent"))
+
+
+class UserWithoutJoinTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        AccessSettings.get_cached(force=True)
+        self.user = get_user_model().objects.create_user(username="telemetria", email="t@example.com", password="x")
+        now = timezone.localtime()
+        self.event = AccessEvent.objects.create(
+            user=self.user, ip_address="10.0.0.1", path="/t/", created_date=now.date(), created_at=now
+        )
+
+    def test_deleting_user_detaches_events(self):
+        self.user.delete()
+        self.event.refresh_from_db()
+        self.assertIsNone(self.event.user_id)
+
+    def test_export_resolves_usernames(self):
+        rows = list(export_rows(AccessEvent.objects.all()))
+        self.assertEqual(rows[0][1], "telemetria")
+
+    def test_admin_searches_events_by_user(self):
+        admin_user = get_user_model().objects.create_superuser(username="root", password="x")
+        self.client.force_login(admin_user)
+        url = reverse("admin:syshealth_accessevent_changelist")
+
+        response = self.client.get(url, {"q": "t@example"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context["cl"].result_list), [self.event])
+        response = self.client.get(url, {"q": "ninguem"})
+        self.assertEqual(list(response.context["cl"].result_list), [])
+
+
+@skipUnless(TELEMETRY_DB_ALIAS in settings.DATABASES, "ACCESS_TELEMETRY_DB_NAME não configurado")
+class TelemetryDatabaseTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        AccessSettings.get_cached(force=True)
+
+    def test_events_live_in_the_telemetry_database(self):
+        viewer = get_user_model().objects.create_user(username="viewer", password="x", is_staff=True)
+        viewer.user_permissions.add(
+            Permission.objects.get(content_type__app_label="ops", codename="view_access_dashboard"),
+            Permission.objects.get(content_type__app_label="ops", codename="view_access_event"),
+        )
+        now = timezone.localtime()
+        AccessEvent.objects.create(
+            user=viewer, ip_address="10.0.0.1", path="/t/", created_date=now.date(), created_at=now
+        )
+
+        self.assertNotIn("syshealth_accessevent", connections["default"].introspection.table_names())
+        with connections[TELEMETRY_DB_ALIAS].cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM syshealth_accessevent")
+            self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertTrue(AccessSeenUser.objects.filter(user=viewer).exists())
+
+        self.client.force_login(viewer)
+        data = self.client.get(reverse("admin:ops_access_dashboard_data")).json()
+        self.assertEqual(data["events"][0]["user"], "viewer")
+
+        viewer.delete()
+        self.assertIsNone(AccessEvent.objects.get().user_id)
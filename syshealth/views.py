@@ -1,25 +1,35 @@
 from __future__ import annotations
 
-import csv
-from datetime import datetime, time as time_cls, timedelta
-from io import StringIO
-from typing import Dict, Iterable, Tuple
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Dict, List, Sequence, Tuple
 
+from asgiref.sync import sync_to_async
 from django.contrib import admin
 from django.contrib.admin.views.decorators import staff_member_required
-from django.contrib.auth import get_user_model
 from django.core.exceptions import PermissionDenied
-from django.core.paginator import EmptyPage, Paginator
-from django.db.models import QuerySet
-from django.http import HttpResponse, JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Case, QuerySet, Sum, When
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.timesince import timesince
 
 from .metrics import get_system_health_snapshot
-from .models import AccessEvent, AccessSettings, SystemHealthConfig
-from .forms import AccessEventFilterForm
+from .models import AccessEvent, AccessRollup, AccessSettings, SystemHealthConfig, event_timestamp
+from .export import csv_export_response
+from .forms import AccessEventExportForm, AccessEventFilterForm
+from .pagination import events_since, keyset_page
+from .partitions import window_queryset
+from .presence import SOURCE_PRESENCE, online_counts, online_source
+from .result_cache import get_counter_cache
+from .seen_users import suggest_users
+from .rollups import UNKNOWN_ROUTE, estimate_hits, history
+from .sketches import unique_count_mode, unique_counts, unique_visitors
+from .stream import get_live_feed, stream_messages
+from .writer import get_writer
 
 
 def _admin_namespace(request) -> str:
@@ -38,11 +48,9 @@ def _user_can_view_events(user) -> bool:
 
 
 def _combine_event_datetime(event) -> datetime:
-    event_time = event.created_time or time_cls(0, 0, 0)
-    naive = datetime.combine(event.created_date, event_time)
-    if timezone.is_naive(naive):
-        return timezone.make_aware(naive, timezone.get_current_timezone())
-    return naive
+    if event.created_at is not None:
+        return timezone.localtime(event.created_at)
+    return event_timestamp(event.created_date, event.created_time)
 
 
 def _relative_time_display(moment: datetime, now: datetime) -> str:
@@ -66,7 +74,8 @@ def _window_start(now: datetime, minutes: int) -> datetime:
 
 
 def _build_base_queryset(start: datetime) -> QuerySet:
-    return AccessEvent.objects.select_related("user").since(start)
+    # prefetch e não select_related: os usuários podem estar em outro banco.
+    return window_queryset(start).prefetch_related("user").with_dimensions().since(start)
 
 
 def _apply_filters(qs, filters: Dict[str, object]):
@@ -75,21 +84,62 @@ def _apply_filters(qs, filters: Dict[str, object]):
     return qs.filter(**filters)
 
 
-def _compute_online_counts(qs: QuerySet) -> Tuple[int, int]:
-    authenticated = (
-        qs.exclude(user_id__isnull=True)
-        .values_list("user_id", flat=True)
-        .distinct()
-        .count()
+ROUTE_STATS_LIMIT = 10
+HISTORY_HOURS = 24
+
+
+def _weighted_percentile(sorted_values: Sequence[Tuple[float, float]], total: float, fraction: float) -> float:
+    """Percentil de pares (duração, peso) ordenados; com pesos iguais é o percentil usual."""
+    target = fraction * total
+    accumulated = 0.0
+    for value, weight in sorted_values:
+        accumulated += weight
+        if accumulated >= target - 1e-9:
+            return value
+    return sorted_values[-1][0]
+
+
+def _compute_route_stats(qs: QuerySet, limit: int = ROUTE_STATS_LIMIT) -> List[Dict[str, object]]:
+    # Contagens e erros somam ``sample_weight`` no banco (com amostragem, cada evento
+    # vale por vários acessos); só as durações das rotas exibidas vêm para o Python.
+    timed = qs.order_by().exclude(duration_ms__isnull=True)
+    totals = list(
+        timed.values("route_name")
+        .annotate(
+            hits=Sum("sample_weight"),
+            client_errors=Sum(
+                Case(When(status_code__gte=400, status_code__lt=500, then="sample_weight"), default=0.0)
+            ),
+            server_errors=Sum(Case(When(status_code__gte=500, then="sample_weight"), default=0.0)),
+        )
+        .order_by("-hits", "route_name")[:limit]
     )
-    anonymous = (
-        qs.filter(user_id__isnull=True)
-        .exclude(ip_address="")
-        .values_list("ip_address", flat=True)
-        .distinct()
-        .count()
+    if not totals:
+        return []
+
+    durations: Dict[str, List[Tuple[float, float]]] = defaultdict(list)
+    rows = timed.filter(route_name__in=[row["route_name"] for row in totals]).values_list(
+        "route_name", "duration_ms", "sample_weight"
     )
-    return authenticated, anonymous
+    for route_name, duration_ms, weight in rows.iterator():
+        durations[route_name].append((duration_ms, weight))
+
+    stats = []
+    for row in totals:
+        values = sorted(durations[row["route_name"]])
+        hits = row["hits"]
+        stats.append(
+            {
+                "route": row["route_name"] or UNKNOWN_ROUTE,
+                "hits": int(round(hits)),
+                "p50_ms": round(_weighted_percentile(values, hits, 0.50), 1),
+                "p95_ms": round(_weighted_percentile(values, hits, 0.95), 1),
+                "p99_ms": round(_weighted_percentile(values, hits, 0.99), 1),
+                "client_error_pct": round(row["client_errors"] / hits * 100, 1),
+                "server_error_pct": round(row["server_errors"] / hits * 100, 1),
+            }
+        )
+    return stats
 
 
 def _serialize_event(event, admin_namespace: str) -> Dict[str, object]:
@@ -114,30 +164,94 @@ def _serialize_event(event, admin_namespace: str) -> Dict[str, object]:
         "path": event.path,
         "referrer": event.referrer,
         "source": "Admin" if event.is_admin else "Site",
+        "status_code": event.status_code,
+        "duration_ms": round(event.duration_ms, 1) if event.duration_ms is not None else None,
     }
 
 
-def _generate_csv_response(events: Iterable[AccessEvent], now: datetime) -> HttpResponse:
-    buffer = StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(["timestamp", "usuario", "ip", "path", "origem", "referrer"])
-    for event in events:
-        dt = _combine_event_datetime(event)
-        username = event.user.get_username() if event.user else "Visitante"
-        writer.writerow(
-            [
-                dt.isoformat(),
-                username,
-                event.ip_address,
-                event.path,
-                "admin" if event.is_admin else "site",
-                event.referrer,
-            ]
-        )
+def _export_csv(request, filters: Dict[str, object], window_qs: QuerySet, now: datetime):
+    # Sem período, exporta a janela do dashboard; com ``start``/``end``, qualquer intervalo.
+    export_form = AccessEventExportForm(request.GET)
+    if not export_form.is_valid():
+        return JsonResponse({"errors": export_form.errors}, status=400)
+    queryset = window_qs
+    if export_form.has_range():
+        queryset = _apply_filters(AccessEvent.objects.filter(**export_form.range_filters()), filters)
+    return csv_export_response(queryset, now, compress=export_form.cleaned_data["gzip"])
 
-    response = HttpResponse(buffer.getvalue(), content_type="text/csv")
-    response["Content-Disposition"] = f"attachment; filename=access-events-{now:%Y%m%d%H%M%S}.csv"
-    return response
+
+def _compute_counters(base_qs: QuerySet, settings_obj, window_start: datetime, now: datetime) -> Dict[str, object]:
+    if online_source() == SOURCE_PRESENCE:
+        online_authenticated, online_anonymous = online_counts(settings_obj.online_window_minutes)
+    else:
+        online_authenticated, online_anonymous = unique_counts(window_start, now)
+    return {
+        "online": {
+            "total": online_authenticated + online_anonymous,
+            "authenticated": online_authenticated,
+            "anonymous": online_anonymous,
+            "window_minutes": settings_obj.online_window_minutes,
+        },
+        "access_count": estimate_hits(window_start, now),
+        "routes": _compute_route_stats(base_qs),
+        "unique_visitors": unique_visitors(now),
+        "unique_mode": unique_count_mode(),
+    }
+
+
+def _live_counters(base_qs: QuerySet, settings_obj, window_start: datetime, now: datetime) -> Dict[str, object]:
+    # Os contadores cobrem a janela inteira (os filtros só afetam a lista de
+    # eventos), então a chave é apenas a janela.
+    counter_cache = get_counter_cache()
+    counters = counter_cache.get_or_compute(
+        f"window:{settings_obj.online_window_minutes}",
+        lambda: _compute_counters(base_qs, settings_obj, window_start, now),
+    )
+    return {
+        **counters,
+        "writer": get_writer().snapshot(),
+        "counters_cache": counter_cache.snapshot(),
+        "generated_at": now.isoformat(),
+    }
+
+
+def _events_delta(qs: QuerySet, since, admin_namespace: str):
+    delta = events_since(qs, since)
+    if delta is None:
+        return None
+    new_events, reset, latest = delta
+    return {
+        "delta": True,
+        "reset": reset,
+        "events": [_serialize_event(event, admin_namespace) for event in new_events],
+        "latest": latest,
+    }
+
+
+def _live_update(admin_namespace: str, cursor):
+    """Mensagem do stream: contadores e eventos após ``cursor`` (sem filtros)."""
+    settings_obj = AccessSettings.get_cached()
+    now = timezone.localtime()
+    window_start = _window_start(now, settings_obj.online_window_minutes)
+    base_qs = _build_base_queryset(window_start)
+    message = _live_counters(base_qs, settings_obj, window_start, now)
+    delta = _events_delta(base_qs, cursor, admin_namespace)
+    if delta is None:
+        # Sem cursor: a primeira mensagem traz a página mais recente inteira.
+        page_obj = keyset_page(base_qs)
+        delta = {
+            "delta": True,
+            "reset": True,
+            "events": [_serialize_event(event, admin_namespace) for event in page_obj.object_list],
+            "latest": page_obj.head,
+        }
+    message.update(delta)
+    return message, message["latest"]
+
+
+def _stream_allowed(request) -> bool:
+    user = request.user
+    return bool(user.is_active and user.is_staff and _user_can_view_dashboard(user))
 
 
 @staff_member_required
@@ -177,41 +291,35 @@ def access_dashboard(request):
     window_start = _window_start(now, settings_obj.online_window_minutes)
 
     base_qs = _build_base_queryset(window_start)
-    online_authenticated, online_anonymous = _compute_online_counts(base_qs)
-    online_total = online_authenticated + online_anonymous
-    access_count = base_qs.count()
-
-    user_ids = (
-        AccessEvent.objects.exclude(user_id__isnull=True)
-        .values_list("user_id", flat=True)
-        .distinct()
-    )
-    user_queryset = get_user_model().objects.filter(id__in=user_ids)
-
-    filter_form = AccessEventFilterForm(request.GET or None, user_queryset=user_queryset)
+    filter_form = AccessEventFilterForm(request.GET or None)
     filters = filter_form.cleaned_filters()
     filtered_qs = _apply_filters(base_qs, filters)
 
-    paginator = Paginator(filtered_qs, 50)
-    page_number = request.GET.get("page") or 1
-    try:
-        page_obj = paginator.page(page_number)
-    except EmptyPage:
-        page_obj = paginator.page(1)
+    # A exportação é transmitida direto do cursor: nada da página é calculado.
+    if request.GET.get("export") == "csv":
+        if not _user_can_view_events(request.user):
+            raise PermissionDenied
+        return _export_csv(request, filters, filtered_qs, now)
+
+    counters = _live_counters(base_qs, settings_obj, window_start, now)
+    hourly_history = history(AccessRollup.GRANULARITY_HOUR, HISTORY_HOURS, now=now)
+    history_peak = max([bucket["hits"] for bucket in hourly_history] + [1])
+
+    page_obj = keyset_page(filtered_qs, before=request.GET.get("before"), after=request.GET.get("after"))
 
     admin_namespace = _admin_namespace(request)
     data_url = reverse(f"{admin_namespace}:ops_access_dashboard_data")
+    users_url = reverse(f"{admin_namespace}:ops_access_dashboard_users")
+    stream_url = ""
+    if isinstance(request, ASGIRequest) and not filters and not page_obj.has_newer:
+        stream_url = reverse(f"{admin_namespace}:ops_access_dashboard_stream")
 
     health_snapshot = get_system_health_snapshot(force_refresh=False)
 
-    if request.GET.get("export") == "csv":
-        if not _user_can_view_events(request.user):
-            raise PermissionDenied
-        return _generate_csv_response(filtered_qs, now)
-
     query_params = request.GET.copy()
     full_query_string = query_params.urlencode()
-    query_params.pop("page", None)
+    for key in ("before", "after", "page"):
+        query_params.pop(key, None)
     query_string = query_params.urlencode()
 
     events_payload = [_serialize_event(event, admin_namespace) for event in page_obj.object_list]
@@ -222,18 +330,29 @@ def access_dashboard(request):
     context = {
         **admin_context,
         # "title": "Monitoramento de acessos",
-        "online_count": online_total,
-        "access_count": access_count,
-        "online_authenticated": online_authenticated,
-        "online_anonymous": online_anonymous,
+        "online_count": counters["online"]["total"],
+        "access_count": counters["access_count"],
+        "route_stats": counters["routes"],
+        "hourly_history": hourly_history,
+        "history_peak": history_peak,
+        "online_authenticated": counters["online"]["authenticated"],
+        "online_anonymous": counters["online"]["anonymous"],
+        "unique_visitors": counters["unique_visitors"],
+        "unique_mode": counters["unique_mode"],
         "online_window_minutes": settings_obj.online_window_minutes,
         "auto_refresh_seconds": settings_obj.auto_refresh_seconds,
         "page_obj": page_obj,
+        "latest_cursor": page_obj.head if not page_obj.has_newer else "",
         "events": page_obj.object_list,
         "events_payload": events_payload,
         "filter_form": filter_form,
+        "export_form": AccessEventExportForm(),
         "data_url": data_url,
+        "users_url": users_url,
+        "stream_url": stream_url,
         "health_snapshot": health_snapshot,
+        "writer_stats": counters["writer"],
+        "counters_cache_stats": counters["counters_cache"],
         "now": now,
         "settings": settings_obj,
         "query_string": query_string,
@@ -253,44 +372,65 @@ def access_dashboard_data(request):
     window_start = _window_start(now, settings_obj.online_window_minutes)
     base_qs = _build_base_queryset(window_start)
 
-    user_ids = (
-        AccessEvent.objects.exclude(user_id__isnull=True)
-        .values_list("user_id", flat=True)
-        .distinct()
-    )
-    user_queryset = get_user_model().objects.filter(id__in=user_ids)
-    filter_form = AccessEventFilterForm(request.GET or None, user_queryset=user_queryset)
+    filter_form = AccessEventFilterForm(request.GET or None)
     filters = filter_form.cleaned_filters()
     filtered_qs = _apply_filters(base_qs, filters)
 
-    paginator = Paginator(filtered_qs, 50)
-    page_number = request.GET.get("page") or 1
-    try:
-        page_obj = paginator.page(page_number)
-    except EmptyPage:
-        page_obj = paginator.page(1)
-
     admin_namespace = _admin_namespace(request)
-    events_payload = [_serialize_event(event, admin_namespace) for event in page_obj.object_list]
-    online_authenticated, online_anonymous = _compute_online_counts(base_qs)
-    online_total = online_authenticated + online_anonymous
-    access_count = base_qs.count()
-
-    response_data = {
-        "online": {
-            "total": online_total,
-            "authenticated": online_authenticated,
-            "anonymous": online_anonymous,
-            "window_minutes": settings_obj.online_window_minutes,
-        },
-        "access_count": access_count,
-        "events": events_payload,
-        "page": {
-            "number": page_obj.number,
-            "num_pages": paginator.num_pages,
-            "has_next": page_obj.has_next(),
-            "has_previous": page_obj.has_previous(),
-        },
-        "generated_at": now.isoformat(),
-    }
+    response_data = _live_counters(base_qs, settings_obj, window_start, now)
+
+    # Atualização incremental: só os eventos mais novos que o último exibido.
+    delta = _events_delta(filtered_qs, request.GET.get("since"), admin_namespace)
+    if delta is not None:
+        response_data.update(delta)
+        return JsonResponse(response_data)
+
+    page_obj = keyset_page(filtered_qs, before=request.GET.get("before"), after=request.GET.get("after"))
+    response_data.update(
+        {
+            "delta": False,
+            "history": history(AccessRollup.GRANULARITY_HOUR, HISTORY_HOURS, now=now),
+            "events": [_serialize_event(event, admin_namespace) for event in page_obj.object_list],
+            "latest": page_obj.head,
+            "page": {
+                "size": len(page_obj),
+                "has_older": page_obj.has_older,
+                "has_newer": page_obj.has_newer,
+                "before": page_obj.before,
+                "after": page_obj.after,
+            },
+        }
+    )
     return JsonResponse(response_data)
+
+
+@staff_member_required
+def access_dashboard_users(request):
+    """Sugestões para o filtro de usuário, lidas do índice de usuários vistos."""
+    if not _user_can_view_dashboard(request.user):
+        raise PermissionDenied
+    return JsonResponse({"results": suggest_users(request.GET.get("q", ""))})
+
+
+async def access_dashboard_stream(request):
+    """Server-Sent Events com as novidades do dashboard (só sob ASGI).
+
+    Todas as conexões do worker leem do mesmo :class:`~syshealth.stream.LiveFeed`;
+    fora do ASGI responde 204 e o dashboard continua no polling.
+    """
+    if not await sync_to_async(_stream_allowed)(request):
+        raise PermissionDenied
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    admin_namespace = _admin_namespace(request)
+    feed = get_live_feed(admin_namespace, partial(_live_update, admin_namespace))
+    since = request.headers.get("Last-Event-ID") or request.GET.get("since") or None
+    catch_up = (lambda: _live_update(admin_namespace, since)[0]) if since else None
+    response = StreamingHttpResponse(
+        stream_messages(feed, since=since, catch_up=catch_up),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
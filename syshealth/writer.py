@@ -0,0 +1,495 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections
+
+from .dimensions import clear_caches
+from .journal import AccessJournal, get_journal
+from .models import AccessEvent
+
+logger = logging.getLogger(__name__)
+
+WRITER_SYNC = "sync"
+WRITER_BUFFERED = "buffered"
+WRITER_THREAD = "thread"
+WRITER_JOURNAL = "journal"
+WRITER_NONE = "none"
+
+OVERFLOW_DROP_NEWEST = "drop_newest"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_BLOCK = "block"
+OVERFLOW_POLICIES = (OVERFLOW_DROP_NEWEST, OVERFLOW_DROP_OLDEST, OVERFLOW_BLOCK)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_BATCH_MAX_AGE = 2.0
+DEFAULT_BUFFER_LIMIT = 1000
+DEFAULT_QUEUE_SIZE = 5000
+DEFAULT_BLOCK_TIMEOUT = 0.05
+
+PersistCallable = Callable[[Sequence[AccessEvent]], None]
+
+
+def persist_events(events: Sequence[AccessEvent]) -> None:
+    if len(events) == 1:
+        events[0].save(force_insert=True)
+        return
+    AccessEvent.objects.bulk_create(events, batch_size=DEFAULT_BUFFER_LIMIT)
+
+
+@dataclass
+class WriterStats:
+    written: int = 0
+    flushed: int = 0
+    dropped: int = 0
+    failed: int = 0
+    spilled: int = 0
+    dropped_newest: int = 0
+    dropped_oldest: int = 0
+    flushes: int = 0
+    write_seconds: float = 0.0
+    flush_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        data: Dict[str, float] = asdict(self)
+        data["avg_write_ms"] = (
+            round(self.write_seconds / self.written * 1000, 3) if self.written else 0.0
+        )
+        data["avg_flush_ms_per_event"] = (
+            round(self.flush_seconds / self.flushed * 1000, 3) if self.flushed else 0.0
+        )
+        return data
+
+
+class AccessEventWriter:
+    """Persiste eventos de acesso; a implementação padrão grava um a um.
+
+    Com ``journal`` configurado, lotes que falham no banco são gravados no
+    journal local em vez de perdidos.
+    """
+
+    mode = WRITER_SYNC
+
+    def __init__(
+        self,
+        persist: Optional[PersistCallable] = None,
+        journal: Optional[AccessJournal] = None,
+    ):
+        self.persist = persist or persist_events
+        self.journal = journal
+        self.stats = WriterStats()
+        self._stats_lock = threading.Lock()
+        self._error_count = 0
+
+    def write(self, event: AccessEvent) -> None:
+        started = time.perf_counter()
+        try:
+            self._write(event)
+        finally:
+            with self._stats_lock:
+                self.stats.written += 1
+                self.stats.write_seconds += time.perf_counter() - started
+
+    def _write(self, event: AccessEvent) -> None:
+        self._flush_batch([event])
+
+    def flush(self) -> None:
+        return None
+
+    def close(self) -> None:
+        self.flush()
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._stats_lock:
+            data: Dict[str, object] = self.stats.as_dict()
+        data["mode"] = self.mode
+        return data
+
+    def count_drop(self, field: str = "dropped_newest") -> None:
+        with self._stats_lock:
+            self.stats.dropped += 1
+            setattr(self.stats, field, getattr(self.stats, field) + 1)
+
+    def _flush_batch(self, batch: List[AccessEvent]) -> None:
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            self.persist(batch)
+        except (DatabaseError, IntegrityError) as exc:
+            if isinstance(exc, IntegrityError):
+                # Um id de dimensão em cache pode ter sido apagado pela limpeza
+                # (valores órfãos); o próximo lote volta a resolvê-lo no banco.
+                clear_caches()
+            if self._spill(batch):
+                return
+            with self._stats_lock:
+                self.stats.failed += len(batch)
+            self._error_count += 1
+            if self._error_count <= 3:
+                logger.exception("Erro ao salvar %s evento(s) de acesso", len(batch))
+            return
+
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self.stats.flushed += len(batch)
+            self.stats.flushes += 1
+            self.stats.flush_seconds += elapsed
+
+    def _spill(self, batch: List[AccessEvent]) -> bool:
+        if self.journal is None:
+            return False
+        try:
+            self.journal.append(batch)
+        except OSError:
+            logger.exception("Falha ao gravar eventos de acesso no journal")
+            return False
+        with self._stats_lock:
+            self.stats.spilled += len(batch)
+        return True
+
+
+class JournalAccessEventWriter(AccessEventWriter):
+    """Grava cada evento apenas no journal local (um append sequencial).
+
+    Os segmentos são carregados no banco pelo comando ``replay_access_journal``.
+    """
+
+    mode = WRITER_JOURNAL
+
+    def __init__(self, journal: AccessJournal):
+        super().__init__(journal=journal)
+
+    def _write(self, event: AccessEvent) -> None:
+        if self._spill([event]):
+            return
+        with self._stats_lock:
+            self.stats.failed += 1
+
+    def close(self) -> None:
+        self.journal.seal()
+
+
+class DisabledAccessEventWriter(AccessEventWriter):
+    """Não grava eventos; presença e sketches de distintos continuam no middleware."""
+
+    mode = WRITER_NONE
+
+    def _write(self, event: AccessEvent) -> None:
+        return None
+
+
+class BufferedAccessEventWriter(AccessEventWriter):
+    """Acumula eventos em memória e grava em lote via ``bulk_create``.
+
+    O lote é gravado quando atinge ``batch_size`` eventos ou quando o evento
+    mais antigo ultrapassa ``max_age`` segundos, o que uma thread do processo
+    verifica mesmo sem novas requisições; o restante é gravado no encerramento
+    do processo.
+    """
+
+    mode = WRITER_BUFFERED
+
+    def __init__(
+        self,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_age: float = DEFAULT_BATCH_MAX_AGE,
+        buffer_limit: int = DEFAULT_BUFFER_LIMIT,
+        persist: Optional[PersistCallable] = None,
+        clock: Callable[[], float] = time.monotonic,
+        journal: Optional[AccessJournal] = None,
+    ):
+        super().__init__(persist=persist, journal=journal)
+        self.batch_size = max(batch_size, 1)
+        self.max_age = max(max_age, 0.0)
+        self.buffer_limit = max(buffer_limit, self.batch_size)
+        self._clock = clock
+        self._buffer: List[AccessEvent] = []
+        self._oldest_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def _write(self, event: AccessEvent) -> None:
+        self._ensure_timer()
+        now = self._clock()
+        with self._lock:
+            if len(self._buffer) >= self.buffer_limit:
+                with self._stats_lock:
+                    self.stats.dropped += 1
+                    self.stats.dropped_newest += 1
+                return
+            if not self._buffer:
+                self._oldest_at = now
+            self._buffer.append(event)
+            due = len(self._buffer) >= self.batch_size or (
+                self._oldest_at is not None and now - self._oldest_at >= self.max_age
+            )
+
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        # Só uma gravação por vez; quem chegar depois segue acumulando no buffer.
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            batch = self._drain()
+            self._flush_batch(batch)
+        finally:
+            self._flush_lock.release()
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._flush_lock:
+            self._flush_batch(self._drain())
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def _is_due(self) -> bool:
+        with self._lock:
+            return self._oldest_at is not None and self._clock() - self._oldest_at >= self.max_age
+
+    def _ensure_timer(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid and self._timer is not None and self._timer.is_alive():
+            return
+        with self._start_lock:
+            if self._stop.is_set() or (self._pid == pid and self._timer is not None and self._timer.is_alive()):
+                return
+            self._pid = pid
+            self._timer = threading.Thread(target=self._run_timer, name="access-event-flush", daemon=True)
+            self._timer.start()
+
+    def _run_timer(self) -> None:
+        # Meia idade máxima entre verificações: nenhum evento espera mais que 1,5 x max_age.
+        interval = max(self.max_age / 2, 0.05)
+        while not self._stop.wait(interval):
+            if not self._is_due():
+                continue
+            try:
+                self.flush()
+            except Exception:  # pragma: no cover - a thread não pode morrer
+                logger.exception("Falha inesperada na gravação periódica de acessos")
+            finally:
+                close_old_connections()
+
+    def _drain(self) -> List[AccessEvent]:
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+            self._oldest_at = None
+        return batch
+
+
+_STOP = object()
+
+
+class ThreadedAccessEventWriter(AccessEventWriter):
+    """Enfileira eventos e grava em uma thread dedicada por processo.
+
+    A fila é limitada em ``queue_size``; quando cheia, ``overflow`` decide entre
+    descartar o evento novo, descartar o mais antigo ou aguardar até
+    ``block_timeout`` segundos antes de descartar.
+    """
+
+    mode = WRITER_THREAD
+
+    def __init__(
+        self,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        overflow: str = OVERFLOW_DROP_NEWEST,
+        block_timeout: float = DEFAULT_BLOCK_TIMEOUT,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_age: float = DEFAULT_BATCH_MAX_AGE,
+        persist: Optional[PersistCallable] = None,
+        journal: Optional[AccessJournal] = None,
+    ):
+        super().__init__(persist=persist, journal=journal)
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de overflow inválida: {overflow}")
+        self.queue_size = max(queue_size, 1)
+        self.overflow = overflow
+        self.block_timeout = max(block_timeout, 0.0)
+        self.batch_size = max(batch_size, 1)
+        self.max_age = max(max_age, 0.1)
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=self.queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+
+    def _write(self, event: AccessEvent) -> None:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event)
+            return
+        except queue.Full:
+            pass
+
+        if self.overflow == OVERFLOW_BLOCK:
+            try:
+                self._queue.put(event, timeout=self.block_timeout)
+                return
+            except queue.Full:
+                self.count_drop("dropped_newest")
+                return
+
+        if self.overflow == OVERFLOW_DROP_OLDEST:
+            try:
+                self._queue.get_nowait()
+                self.count_drop("dropped_oldest")
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                pass
+
+        self.count_drop("dropped_newest")
+
+    def flush(self) -> None:
+        self._flush_batch(self._drain_nowait(self._queue.qsize()))
+
+    def close(self, timeout: float = 5.0) -> None:
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            else:
+                thread.join(timeout)
+        self.flush()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def snapshot(self) -> Dict[str, object]:
+        data = super().snapshot()
+        data["queue_size"] = self._queue.qsize()
+        data["queue_max"] = self.queue_size
+        data["overflow"] = self.overflow
+        return data
+
+    def _ensure_started(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != pid:
+                # Processo filho (fork do gunicorn): fila e thread do pai não valem aqui.
+                self._queue = queue.Queue(maxsize=self.queue_size)
+            self._pid = pid
+            self._thread = threading.Thread(
+                target=self._run,
+                name="access-event-writer",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _drain_nowait(self, limit: int) -> List[AccessEvent]:
+        batch: List[AccessEvent] = []
+        while len(batch) < limit:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                continue
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self.max_age)
+            except queue.Empty:
+                continue
+
+            stop = item is _STOP
+            batch: List[AccessEvent] = [] if stop else [item]
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+
+            try:
+                self._flush_batch(batch)
+            except Exception:  # pragma: no cover - a thread não pode morrer
+                logger.exception("Falha inesperada na thread de gravação de acessos")
+            finally:
+                close_old_connections()
+            if stop:
+                return
+
+
+_writer: Optional[AccessEventWriter] = None
+_writer_lock = threading.Lock()
+
+
+def build_writer() -> AccessEventWriter:
+    mode = getattr(settings, "ACCESS_LOG_WRITER", WRITER_SYNC)
+    if mode == WRITER_NONE:
+        return DisabledAccessEventWriter()
+    journal = get_journal()
+    if mode == WRITER_JOURNAL:
+        if journal is not None:
+            return JournalAccessEventWriter(journal)
+        logger.warning("ACCESS_LOG_WRITER=journal exige ACCESS_LOG_JOURNAL_DIR; usando gravação síncrona.")
+        return AccessEventWriter()
+    if mode == WRITER_BUFFERED:
+        return BufferedAccessEventWriter(
+            batch_size=getattr(settings, "ACCESS_LOG_BATCH_SIZE", DEFAULT_BATCH_SIZE),
+            max_age=getattr(settings, "ACCESS_LOG_BATCH_MAX_AGE", DEFAULT_BATCH_MAX_AGE),
+            buffer_limit=getattr(settings, "ACCESS_LOG_BUFFER_LIMIT", DEFAULT_BUFFER_LIMIT),
+            journal=journal,
+        )
+    if mode == WRITER_THREAD:
+        return ThreadedAccessEventWriter(
+            queue_size=getattr(settings, "ACCESS_LOG_QUEUE_SIZE", DEFAULT_QUEUE_SIZE),
+            overflow=getattr(settings, "ACCESS_LOG_OVERFLOW", OVERFLOW_DROP_NEWEST),
+            block_timeout=getattr(settings, "ACCESS_LOG_BLOCK_TIMEOUT", DEFAULT_BLOCK_TIMEOUT),
+            batch_size=getattr(settings, "ACCESS_LOG_BATCH_SIZE", DEFAULT_BATCH_SIZE),
+            max_age=getattr(settings, "ACCESS_LOG_BATCH_MAX_AGE", DEFAULT_BATCH_MAX_AGE),
+            journal=journal,
+        )
+    if mode != WRITER_SYNC:
+        logger.warning("ACCESS_LOG_WRITER desconhecido (%s); usando gravação síncrona.", mode)
+    return AccessEventWriter(journal=journal)
+
+
+def get_writer() -> AccessEventWriter:
+    global _writer
+    if _writer is not None:
+        return _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = build_writer()
+            atexit.register(_shutdown_writer, _writer)
+    return _writer
+
+
+def _shutdown_writer(writer: AccessEventWriter) -> None:
+    writer.close()
+    if writer.journal is not None:
+        writer.journal.seal()